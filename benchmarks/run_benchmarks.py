@@ -0,0 +1,264 @@
+"""
+Benchmarks of the single file, folder and streaming paths of the client.
+Each benchmark is timed end to end and per stage (scene init, set_root_path, set_track, emotion keys, export,
+gRPC send). Results are appended as one json line per run to the history file and compared with the previous run
+against the same endpoint, so regressions of the client show up on identical hardware.
+
+Against a running headless server:
+    python benchmarks/run_benchmarks.py --api-url http://localhost:8011 --grpc-port 50051
+Against the bundled fake server (measures the client overhead only):
+    python benchmarks/run_benchmarks.py --fake --fake-latency 0.001
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.settings import ASSETS_DIR, DEFAULT_AUDIO_STREAM_GRPC_PORT
+
+DEFAULT_HISTORY_FILE = os.path.join(ROOT_DIR, "benchmarks", "results", "history.jsonl")
+SINGLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+FOLDER_AUDIO = os.path.join(ROOT_DIR, "test_files")
+
+# client methods which are timed as stages. Nested calls (e.g. load_scene inside init_a2f) count to the outer stage.
+STAGES = {
+    "init_a2f": "scene_init",
+    "set_root_path": "set_root_path",
+    "set_track": "set_track",
+    "generate_emotion_keys": "emotion_keys",
+    "export_blend_shape": "export",
+}
+
+
+class StageTimer:
+    """ Wraps the stage methods of a client instance and accumulates their wall time """
+    def __init__(self, client: Audio2Face, stages: dict = None):
+        self.stages = stages or STAGES
+        self.durations = {}
+        self._depth = 0
+        for method, stage in self.stages.items():
+            setattr(client, method, self._wrap(getattr(client, method), stage))
+
+    def _wrap(self, fn, stage: str):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if self._depth > 0:
+                return fn(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.durations[stage] = self.durations.get(stage, 0.0) + time.perf_counter() - start
+                self._depth -= 1
+        return wrapper
+
+    def add(self, stage: str, duration: float):
+        self.durations[stage] = self.durations.get(stage, 0.0) + duration
+
+    def reset(self):
+        self.durations = {}
+
+
+def read_wav(file_path: str):
+    """ returns (float32 mono samples, samplerate) of a PCM16/PCM32/float32 wav file """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    pos, fmt, samples = 12, None, None
+    while pos + 8 <= len(data):
+        chunk_id, size = struct.unpack("<4sI", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", body[:16])
+        elif chunk_id == b"data":
+            samples = body
+        pos += 8 + size + size % 2
+
+    audio_format, channels, samplerate, _, _, bits = fmt
+    if audio_format == 3:
+        audio = np.frombuffer(samples, dtype=np.float32)
+    else:
+        dtype = {16: np.int16, 32: np.int32}[bits]
+        audio = np.frombuffer(samples, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+    return audio.reshape(-1, channels).mean(axis=1).astype(np.float32), samplerate
+
+
+def bench_single(client: Audio2Face, timer: StageTimer, output_dir: str, emotion: bool):
+    client.audio2face_single(SINGLE_AUDIO, os.path.join(output_dir, "single"), emotion_auto_detect=emotion)
+
+
+def bench_folder(client: Audio2Face, timer: StageTimer, output_dir: str, emotion: bool):
+    # not incremental, otherwise every repetition after the first only checks the manifest
+    client.audio2face_folder(FOLDER_AUDIO, os.path.join(output_dir, "folder"), emotion=emotion, incremental=False)
+
+
+def bench_stream(client: Audio2Face, timer: StageTimer, grpc_port: int, chunk_size: int):
+    audio, samplerate = read_wav(SINGLE_AUDIO)
+    client.init_a2f(streaming=True)  # timed as scene_init, not as part of the send
+    chunks = (audio[i:i + chunk_size] for i in range(0, len(audio), chunk_size))
+    start = time.perf_counter()
+    client.stream_audio(chunks, samplerate=samplerate, block_until_playback_is_finished=False, grpc_port=grpc_port)
+    timer.add("grpc_send", time.perf_counter() - start)
+    timer.add("grpc_first_chunk", client.last_stream_stats.first_chunk_s)
+
+
+def bench_short(client: Audio2Face, timer: StageTimer, grpc_port: int, mode: str, seconds: float):
+    """ one short clip, e.g. an acknowledgement, sent unary or streamed. Compare both to tune unary_max_seconds. """
+    audio, samplerate = read_wav(SINGLE_AUDIO)
+    clip = audio[:int(seconds * samplerate)]
+    client.init_a2f(streaming=True)
+    start = time.perf_counter()
+    client.send_audio(clip, samplerate=samplerate, mode=mode, block_until_playback_is_finished=False, grpc_port=grpc_port)
+    timer.add("grpc_send", time.perf_counter() - start)
+
+
+def run_benchmark(name: str, fn, client: Audio2Face, timer: StageTimer, repeat: int, warmup: int) -> dict:
+    walls, stages = [], {}
+    for i in range(warmup + repeat):
+        timer.reset()
+        start = time.perf_counter()
+        fn()
+        wall = time.perf_counter() - start
+        if i < warmup:
+            continue
+        walls.append(wall)
+        for stage, duration in timer.durations.items():
+            stages.setdefault(stage, []).append(duration)
+
+    def summarize(values):
+        return {"min": min(values), "median": statistics.median(values), "mean": statistics.mean(values)}
+
+    result = {"wall_s": summarize(walls), "stages_s": {s: summarize(v) for s, v in stages.items()}}
+    print(f"{name:<10} median {result['wall_s']['median'] * 1000:9.2f} ms  " + "  ".join(
+        f"{s}={v['median'] * 1000:.2f}ms" for s, v in result["stages_s"].items()
+    ))
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def load_previous(history_file: str, endpoint: str):
+    if not os.path.isfile(history_file):
+        return None
+    previous = None
+    with open(history_file) as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("endpoint") == endpoint:
+                previous = record
+    return previous
+
+
+def compare(previous: dict, current: dict, threshold: float) -> list:
+    """ returns the benchmarks whose median wall time grew by more than threshold (relative) """
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        before = previous["benchmarks"].get(name)
+        if before is None:
+            continue
+        old, new = before["wall_s"]["median"], result["wall_s"]["median"]
+        change = (new - old) / old if old > 0 else 0.0
+        print(f"{name:<10} {old * 1000:9.2f} ms -> {new * 1000:9.2f} ms ({change:+.1%}) vs {previous['revision']}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8011")
+    parser.add_argument("--grpc-port", type=int, default=DEFAULT_AUDIO_STREAM_GRPC_PORT)
+    parser.add_argument("--a2f-install-path", default=None)
+    parser.add_argument("--fake", action="store_true", help="run against the bundled fake server")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="latency per request of the fake server")
+    parser.add_argument("--fake-processing-factor", type=float, default=0.0)
+    parser.add_argument(
+        "--benchmarks", nargs="+", default=["single", "folder", "stream", "short_unary", "short_stream"]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--emotion", action="store_true", help="generate emotion keys in single/folder")
+    parser.add_argument("--chunk-size", type=int, default=4410, help="samples per streamed chunk")
+    parser.add_argument("--short-seconds", type=float, default=1.0, help="clip length of short_unary/short_stream")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="json lines file the results are appended to")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as regression")
+    args = parser.parse_args()
+
+    server = None
+    if args.fake:
+        from py_audio2face.fake_server import FakeAudio2FaceServer
+        server = FakeAudio2FaceServer(
+            latency=args.fake_latency, processing_factor=args.fake_processing_factor
+        ).start()
+        args.api_url, args.grpc_port = server.api_url, server.grpc_port
+        endpoint = f"fake(latency={args.fake_latency},processing_factor={args.fake_processing_factor})"
+    else:
+        endpoint = args.api_url
+
+    client = Audio2Face(api_url=args.api_url, a2f_install_path=args.a2f_install_path or "unused")
+    timer = StageTimer(client)
+
+    output_dir = tempfile.mkdtemp(prefix="a2f_bench_")
+    benchmarks = {
+        "single": lambda: bench_single(client, timer, output_dir, args.emotion),
+        "folder": lambda: bench_folder(client, timer, output_dir, args.emotion),
+        "stream": lambda: bench_stream(client, timer, args.grpc_port, args.chunk_size),
+        "short_unary": lambda: bench_short(client, timer, args.grpc_port, "unary", args.short_seconds),
+        "short_stream": lambda: bench_short(client, timer, args.grpc_port, "stream", args.short_seconds),
+    }
+
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "endpoint": endpoint,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("history", "threshold")},
+        "benchmarks": {}
+    }
+    try:
+        for name in args.benchmarks:
+            record["benchmarks"][name] = run_benchmark(
+                name, benchmarks[name], client, timer, repeat=args.repeat, warmup=args.warmup
+            )
+    finally:
+        client.close()
+        if server is not None:
+            server.stop()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    previous = load_previous(args.history, endpoint)
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    if previous is not None:
+        regressions = compare(previous, record, args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,30 @@
 from py_audio2face.audio2face import Audio2Face
+from py_audio2face.modules.clients._transport import A2FTransport
+from py_audio2face.async_audio2face import AsyncAudio2Face
+from py_audio2face.audio2face_pool import Audio2FacePool
+from py_audio2face.modules._animation_cache import AnimationCache
+from py_audio2face.modules.clients._supervisor import HeadlessServerSupervisor
+
+try:
+    from py_audio2face.modules._stream_processing import AudioNormalizer, VoiceActivityGate, RealtimePacer
+    from py_audio2face.modules.clients._grpc_channel_pool import GrpcChannelPool, AsyncGrpcChannelPool
+    from py_audio2face.modules._stream_session import StreamSession
+    from py_audio2face.modules._stream_stats import StreamStats
+    from py_audio2face.modules._stream_recorder import StreamRecorder, AnimationSegment
+except ImportError:  # numpy and grpc are part of py_audio2face[streaming]
+    pass
+
+try:
+    from py_audio2face.animation import (
+        BlendshapeAnimation, load_animation, resample_animation, save_animation, resample_file, write_weights
+    )
+except ImportError:  # numpy is part of py_audio2face[animation]
+    pass
+
+try:
+    from py_audio2face import emotion_curves
+    from py_audio2face.animation_pipeline import (
+        AnimationPipeline, PipelineStage, Gain, Clamp, Smooth, Retarget, BlinkInjection
+    )
+except ImportError:  # numpy is part of py_audio2face[animation]
+    pass
@@ -0,0 +1,278 @@
+"""
+Read the blendshape animations exported by Audio2Face back into numpy.
+The weights of an animation are a float32 array of shape (frames, blendshapes) with the blendshape names and fps.
+Parsing json or usd is slow, so the weights are stored next to the export in a .npy sidecar on the first load.
+Later loads memory-map the sidecar, which makes random access into thousands of clips almost free.
+The sidecar is rebuilt automatically when the export changes.
+
+Other frame rates are derived locally from one export with resample_animation instead of running the solver again.
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+SIDECAR_SUFFIX = ".weights.npy"
+SIDECAR_META_SUFFIX = ".weights.json"
+
+
+class BlendshapeAnimation:
+    def __init__(self, weights: np.ndarray, names: list, fps: float, source: str = None):
+        """
+        weights (np.ndarray): float32 array of shape (frames, blendshapes). Can be a read only memory map.
+        names (list): Names of the blendshapes in the order of the columns.
+        fps (float): Frames per second of the animation.
+        source (str): The file the animation was loaded from.
+        """
+        self.weights = weights
+        self.names = list(names)
+        self.fps = fps
+        self.source = source
+
+    @property
+    def n_frames(self) -> int:
+        return self.weights.shape[0]
+
+    @property
+    def n_shapes(self) -> int:
+        return self.weights.shape[1]
+
+    @property
+    def duration(self) -> float:
+        """ length in seconds """
+        return (self.n_frames - 1) / self.fps if self.n_frames > 0 else 0.0
+
+    def index(self, name: str) -> int:
+        return self.names.index(name)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """ the curve of one blendshape e.g. animation["jawOpen"] """
+        return self.weights[:, self.index(name)]
+
+    def __repr__(self):
+        return f"BlendshapeAnimation({self.n_frames} frames x {self.n_shapes} shapes @ {self.fps} fps, {self.source})"
+
+
+def load_animation(file_path: str, cache: bool = True) -> BlendshapeAnimation:
+    """
+    Loads an exported blendshape animation (.json or .usd/.usda/.usdc).
+    :param file_path: Path of the export e.g. the output of Audio2Face.export_blend_shape.
+    :param cache: Read from / write to the .npy sidecar. The weights of a cached animation are memory-mapped
+        read only. Copy them before modifying.
+    """
+    if cache:
+        animation = _load_sidecar(file_path)
+        if animation is not None:
+            return animation
+
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".json":
+        weights, names, fps = _read_json(file_path)
+    elif ext in (".usd", ".usda", ".usdc"):
+        weights, names, fps = _read_usd(file_path)
+    else:
+        raise ValueError(f"Unsupported animation format {ext}. Use json or usd.")
+
+    if cache:
+        try:
+            _write_sidecar(file_path, weights, names, fps)
+        except OSError as e:
+            print(f"Could not write the animation cache of {file_path}: {e}")
+    return BlendshapeAnimation(weights, names, fps, source=file_path)
+
+
+def _read_json(file_path: str) -> tuple:
+    """ the json layout of the A2F blendshape exporter: exportFps, facsNames, weightMat (frames x poses) """
+    with open(file_path) as f:
+        data = json.load(f)
+    names = data["facsNames"]
+    weights = np.asarray(data["weightMat"], dtype=np.float32).reshape(-1, len(names))
+    return weights, names, float(data["exportFps"])
+
+
+def _read_usd(file_path: str) -> tuple:
+    """ the blendShapeWeights time samples of the first SkelAnimation of the stage """
+    try:
+        from pxr import Usd
+    except ImportError:
+        raise ImportError("Reading usd animations needs the usd python bindings. Install them via 'pip install usd-core'")
+
+    stage = Usd.Stage.Open(file_path)
+    animation = next((p for p in stage.Traverse() if p.GetTypeName() == "SkelAnimation"), None)
+    if animation is None:
+        raise ValueError(f"{file_path} contains no SkelAnimation")
+
+    names = list(animation.GetAttribute("blendShapes").Get() or [])
+    attribute = animation.GetAttribute("blendShapeWeights")
+    times = attribute.GetTimeSamples()
+    weights = np.empty((len(times), len(names)), dtype=np.float32)
+    for i, t in enumerate(times):
+        weights[i] = attribute.Get(t)
+    return weights, names, float(stage.GetTimeCodesPerSecond())
+
+
+def _source_id(file_path: str) -> dict:
+    stat = os.stat(file_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _load_sidecar(file_path: str):
+    """ returns the memory-mapped animation or None if there is no valid sidecar """
+    try:
+        with open(file_path + SIDECAR_META_SUFFIX) as f:
+            meta = json.load(f)
+        if meta["source"] != _source_id(file_path):
+            return None
+        weights = np.load(file_path + SIDECAR_SUFFIX, mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    return BlendshapeAnimation(weights, meta["names"], meta["fps"], source=file_path)
+
+
+def _write_sidecar(file_path: str, weights: np.ndarray, names: list, fps: float):
+    # write to temporary files first, so a concurrent reader never sees half a sidecar
+    tmp = file_path + SIDECAR_SUFFIX + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(weights, dtype=np.float32))
+    os.replace(tmp, file_path + SIDECAR_SUFFIX)
+
+    tmp = file_path + SIDECAR_META_SUFFIX + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"names": names, "fps": fps, "source": _source_id(file_path)}, f)
+    os.replace(tmp, file_path + SIDECAR_META_SUFFIX)
+
+
+def resample_animation(animation: BlendshapeAnimation, fps: float, method: str = "linear") -> BlendshapeAnimation:
+    """
+    Derives the animation at another frame rate, e.g. 30 and 24 fps versions from one 60 fps export.
+    All blendshapes are interpolated at once.
+    :param fps: The new frame rate.
+    :param method: "linear" or "cubic" (Catmull-Rom). Cubic keeps fast movements smoother when upsampling.
+        Its overshoot is clipped to the value range of each blendshape.
+    """
+    if method not in ("linear", "cubic"):
+        raise ValueError('method must be "linear" or "cubic"')
+
+    weights = np.asarray(animation.weights, dtype=np.float32)
+    n = len(weights)
+    if n < 2 or fps == animation.fps:
+        return BlendshapeAnimation(weights.copy(), animation.names, fps, source=animation.source)
+
+    # frame i of the new animation lies at position i * old_fps / new_fps of the old one. 1e-9 absorbs rounding.
+    n_out = int(np.floor(animation.duration * fps + 1e-9)) + 1
+    positions = np.arange(n_out) * (animation.fps / fps)
+    left = np.minimum(positions.astype(np.int64), n - 2)
+    t = (positions - left).astype(np.float32)[:, None]
+
+    p1 = weights[left]
+    p2 = weights[left + 1]
+    if method == "linear":
+        out = p1 + (p2 - p1) * t
+    else:
+        p0 = weights[np.maximum(left - 1, 0)]
+        p3 = weights[np.minimum(left + 2, n - 1)]
+        t2 = t * t
+        t3 = t2 * t
+        out = 0.5 * (
+            2 * p1 + (p2 - p0) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2 + (3 * p1 - p0 - 3 * p2 + p3) * t3
+        )
+        np.clip(out, weights.min(axis=0), weights.max(axis=0), out=out)
+
+    return BlendshapeAnimation(out.astype(np.float32, copy=False), animation.names, fps, source=animation.source)
+
+
+def save_animation(animation: BlendshapeAnimation, file_path: str):
+    """ Writes the animation in the layout of the A2F exporter. The format (json or usd) is taken from the extension. """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".json":
+        with open(file_path, "w") as f:
+            json.dump({
+                "exportFps": animation.fps,
+                "trackPath": "",
+                "numPoses": animation.n_shapes,
+                "numFrames": animation.n_frames,
+                "facsNames": animation.names,
+                "weightMat": np.asarray(animation.weights).tolist()
+            }, f)
+    elif ext in (".usd", ".usda", ".usdc"):
+        _write_usd(animation, file_path)
+    else:
+        raise ValueError(f"Unsupported animation format {ext}. Use json or usd.")
+
+
+def write_weights(file_path: str, weights: np.ndarray):
+    """
+    Replaces the weights of an existing export in place and keeps everything else of the file
+    (track path, joints and custom curves of the usd export). The number of frames and blendshapes must not change.
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".json":
+        with open(file_path) as f:
+            data = json.load(f)
+        if weights.shape != (data["numFrames"], data["numPoses"]):
+            raise ValueError(f"weights of shape {weights.shape} don't fit the {file_path}")
+        data["weightMat"] = weights.tolist()
+        with open(file_path, "w") as f:
+            json.dump(data, f)
+    elif ext in (".usd", ".usda", ".usdc"):
+        try:
+            from pxr import Usd, Vt
+        except ImportError:
+            raise ImportError("Writing usd animations needs the usd python bindings. Install them via 'pip install usd-core'")
+        stage = Usd.Stage.Open(file_path)
+        animation = next((p for p in stage.Traverse() if p.GetTypeName() == "SkelAnimation"), None)
+        if animation is None:
+            raise ValueError(f"{file_path} contains no SkelAnimation")
+        attribute = animation.GetAttribute("blendShapeWeights")
+        times = attribute.GetTimeSamples()
+        if len(times) != len(weights):
+            raise ValueError(f"{len(weights)} frames don't fit the {len(times)} frames of {file_path}")
+        for t, frame in zip(times, weights):
+            attribute.Set(Vt.FloatArray.FromNumpy(frame), t)
+        stage.GetRootLayer().Save()
+    else:
+        raise ValueError(f"Unsupported animation format {ext}. Use json or usd.")
+
+
+def resample_file(input_path: str, output_path: str, fps: float, method: str = "linear") -> str:
+    """
+    Loads an export, resamples it to fps and writes it to output_path in the format of its extension.
+    :return: output_path
+    """
+    save_animation(resample_animation(load_animation(input_path), fps, method=method), output_path)
+    return output_path
+
+
+def _write_usd(animation: BlendshapeAnimation, file_path: str):
+    """ /World/anim_output SkelAnimation with time sampled blendShapeWeights like the A2F usd export """
+    try:
+        from pxr import Usd, UsdGeom, UsdSkel, Vt
+    except ImportError:
+        raise ImportError("Writing usd animations needs the usd python bindings. Install them via 'pip install usd-core'")
+
+    # a new stage can't be created at the path of an already opened layer, so write to a fresh file first
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1], dir=directory)
+    os.close(fd)
+    os.remove(tmp)
+    try:
+        stage = Usd.Stage.CreateNew(tmp)
+        stage.SetTimeCodesPerSecond(animation.fps)
+        stage.SetStartTimeCode(0)
+        stage.SetEndTimeCode(max(animation.n_frames - 1, 0))
+        UsdGeom.Xform.Define(stage, "/World")
+        skel_animation = UsdSkel.Animation.Define(stage, "/World/anim_output")
+        skel_animation.CreateBlendShapesAttr(animation.names)
+        attribute = skel_animation.CreateBlendShapeWeightsAttr()
+        weights = np.asarray(animation.weights, dtype=np.float32)
+        for i in range(animation.n_frames):
+            attribute.Set(Vt.FloatArray.FromNumpy(weights[i]), i)
+        stage.GetRootLayer().Save()
+        del stage
+        os.replace(tmp, file_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,228 @@
+"""
+Post-processing of exported blendshape animations before they reach the engine.
+A pipeline is a list of stages which modify a (frames, blendshapes) float32 array in place. Every stage works on
+whole columns with numpy, so a clip costs a few vectorized operations per stage instead of a python loop per frame.
+Blendshape names are resolved to column indices once per name list and reused for all clips with the same layout.
+
+    pipeline = AnimationPipeline(
+        Gain({"jawOpen": 0.8}),
+        Retarget({"mouthClose": {"jawOpen": 0.2}}, mode="add"),
+        Smooth(1.5),
+        BlinkInjection(interval=4.0),
+        Clamp(0.0, 1.0)
+    )
+    a2f.audio2face_single("hello.wav", "output/hello", postprocess=pipeline)
+"""
+
+import abc
+
+import numpy as np
+
+from py_audio2face.animation import BlendshapeAnimation, load_animation, save_animation, write_weights
+from py_audio2face.emotion_curves import smooth
+
+
+class PipelineStage(abc.ABC):
+    """ Base class of the stages. apply modifies the weights in place. """
+
+    @abc.abstractmethod
+    def apply(self, weights: np.ndarray, names: list, fps: float):
+        pass
+
+    def config(self) -> dict:
+        """ the parameters of the stage. Part of the settings of incremental folder exports. """
+        params = {k: v for k, v in vars(self).items() if not k.startswith("_")}
+        return {"stage": type(self).__name__, **params}
+
+    def _columns(self, names: list, wanted) -> np.ndarray:
+        """ column indices of the wanted blendshapes which exist in names. Cached per name list. """
+        cache = self.__dict__.setdefault("_column_cache", {})
+        key = (tuple(names), tuple(wanted))
+        if key not in cache:
+            position = {name: i for i, name in enumerate(names)}
+            cache[key] = np.array([position[w] for w in wanted if w in position], dtype=np.intp)
+        return cache[key]
+
+
+class Gain(PipelineStage):
+    def __init__(self, gains=1.0, default: float = 1.0):
+        """
+        :param gains: One factor for all blendshapes or {blendshape: factor}.
+        :param default: Factor of the blendshapes missing in the gains dict.
+        """
+        self.gains = gains
+        self.default = default
+        self._vectors = {}
+
+    def apply(self, weights: np.ndarray, names: list, fps: float):
+        if not isinstance(self.gains, dict):
+            weights *= self.gains
+            return
+        key = tuple(names)
+        if key not in self._vectors:
+            self._vectors[key] = np.array([self.gains.get(n, self.default) for n in names], dtype=np.float32)
+        weights *= self._vectors[key]
+
+
+class Clamp(PipelineStage):
+    def __init__(self, low: float = 0.0, high: float = 1.0):
+        self.low = low
+        self.high = high
+
+    def apply(self, weights: np.ndarray, names: list, fps: float):
+        np.clip(weights, self.low, self.high, out=weights)
+
+
+class Smooth(PipelineStage):
+    def __init__(self, smoothing_exp: float = 1.0, shapes: list = None):
+        """
+        Temporal smoothing with an exponential kernel. See emotion_curves.smooth.
+        :param smoothing_exp: Decay of the kernel in frames.
+        :param shapes: Blendshapes to smooth. None smooths all.
+        """
+        self.smoothing_exp = smoothing_exp
+        self.shapes = list(shapes) if shapes is not None else None
+        self._buffer = None
+
+    def apply(self, weights: np.ndarray, names: list, fps: float):
+        columns = weights if self.shapes is None else weights[:, self._columns(names, self.shapes)]
+        if self._buffer is None or self._buffer.shape != columns.shape:
+            self._buffer = np.empty(columns.shape, dtype=np.float32)
+        smooth(columns, self.smoothing_exp, out=self._buffer)
+        if self.shapes is None:
+            weights[...] = self._buffer
+        else:
+            weights[:, self._columns(names, self.shapes)] = self._buffer
+
+
+class Retarget(PipelineStage):
+    def __init__(self, mapping: dict, mode: str = "replace"):
+        """
+        Drives blendshapes by linear combinations of others, e.g. to adapt the jaw and mouth to a character.
+        :param mapping: {target: {source: factor}}. All targets are computed from the weights before the stage.
+        :param mode: "replace" sets the targets, "add" adds to them.
+        """
+        if mode not in ("replace", "add"):
+            raise ValueError('mode must be "replace" or "add"')
+        self.mapping = mapping
+        self.mode = mode
+        self._matrices = {}
+
+    def _matrix(self, names: list) -> tuple:
+        """ (source columns, target columns, (sources x targets) matrix) """
+        key = tuple(names)
+        if key not in self._matrices:
+            targets = [t for t in self.mapping if t in names]
+            sources = sorted({s for t in targets for s in self.mapping[t] if s in names}, key=names.index)
+            matrix = np.zeros((len(sources), len(targets)), dtype=np.float32)
+            for j, target in enumerate(targets):
+                for i, source in enumerate(sources):
+                    matrix[i, j] = self.mapping[target].get(source, 0.0)
+            self._matrices[key] = (self._columns(names, sources), self._columns(names, targets), matrix)
+        return self._matrices[key]
+
+    def apply(self, weights: np.ndarray, names: list, fps: float):
+        sources, targets, matrix = self._matrix(names)
+        if len(targets) == 0:
+            return
+        values = weights[:, sources] @ matrix
+        if self.mode == "add":
+            weights[:, targets] += values
+        else:
+            weights[:, targets] = values
+
+
+class BlinkInjection(PipelineStage):
+    def __init__(
+            self,
+            interval: float = 4.0,
+            jitter: float = 1.5,
+            duration: float = 0.2,
+            strength: float = 1.0,
+            shapes: tuple = ("eyeBlinkLeft", "eyeBlinkRight"),
+            seed: int = 0
+    ):
+        """
+        Adds blinks to animations without (enough) eye movement.
+        :param interval: Mean time between two blinks in seconds.
+        :param jitter: The intervals vary uniformly by +- jitter seconds.
+        :param duration: Length of a blink in seconds.
+        :param strength: Peak weight of a blink. Existing higher weights are kept.
+        :param seed: Seed of the blink times. The same seed gives the same blinks for clips of the same length.
+        """
+        self.interval = interval
+        self.jitter = jitter
+        self.duration = duration
+        self.strength = strength
+        self.shapes = tuple(shapes)
+        self.seed = seed
+
+    def curve(self, n_frames: int, fps: float) -> np.ndarray:
+        """ the blink curve of a clip with n_frames frames """
+        length = n_frames / fps
+        rng = np.random.default_rng(self.seed)
+        n_blinks = int(length / max(self.interval - self.jitter, 1e-3)) + 2
+        intervals = self.interval + rng.uniform(-self.jitter, self.jitter, n_blinks)
+        centers = np.cumsum(np.maximum(intervals, self.duration))
+
+        # distance of every frame to the nearest blink
+        times = np.arange(n_frames) / fps
+        right = np.clip(np.searchsorted(centers, times), 0, len(centers) - 1)
+        left = np.maximum(right - 1, 0)
+        distance = np.minimum(np.abs(times - centers[left]), np.abs(times - centers[right]))
+
+        half = self.duration / 2
+        pulse = 0.5 * (1 + np.cos(np.pi * np.minimum(distance / half, 1.0)))
+        return (self.strength * pulse).astype(np.float32)
+
+    def apply(self, weights: np.ndarray, names: list, fps: float):
+        columns = self._columns(names, self.shapes)
+        if len(columns) == 0:
+            return
+        blinks = self.curve(len(weights), fps)[:, None]
+        weights[:, columns] = np.maximum(weights[:, columns], blinks)
+
+
+class AnimationPipeline:
+    def __init__(self, *stages: PipelineStage):
+        """ The stages are applied in the given order. """
+        self.stages = list(stages)
+
+    def config(self) -> list:
+        return [stage.config() for stage in self.stages]
+
+    def process(self, weights: np.ndarray, names: list, fps: float, out: np.ndarray = None) -> np.ndarray:
+        """
+        Runs all stages.
+        :param weights: (frames, blendshapes) array.
+        :param out: Output buffer of the same shape. Pass weights itself to process in place.
+            A new array is allocated if None.
+        """
+        if out is None:
+            out = np.array(weights, dtype=np.float32)
+        elif out is not weights:
+            out[...] = weights
+        for stage in self.stages:
+            stage.apply(out, names, fps)
+        return out
+
+    def __call__(self, animation: BlendshapeAnimation) -> BlendshapeAnimation:
+        """ returns a processed copy of the animation """
+        weights = self.process(animation.weights, animation.names, animation.fps)
+        return BlendshapeAnimation(weights, animation.names, animation.fps, source=animation.source)
+
+    def process_file(self, file_path: str, output_path: str = None) -> str:
+        """
+        Processes an exported animation (json or usd).
+        :param output_path: Where to write the result. None overwrites the export in place and keeps the rest of
+            its content.
+        :return: the path of the processed file
+        """
+        animation = load_animation(file_path, cache=False)
+        weights = self.process(animation.weights, animation.names, animation.fps, out=animation.weights)
+        if output_path is None:
+            write_weights(file_path, weights)
+            return file_path
+
+        save_animation(BlendshapeAnimation(weights, animation.names, animation.fps), output_path)
+        return output_path
@@ -0,0 +1,152 @@
+"""
+asyncio-native counterpart of Audio2Face.
+All requests to the headless server are awaitable, so one event loop (e.g. a FastAPI service) can drive many
+conversations at the same time without blocking or spawning a thread per request.
+Http requests are sent with a pooled httpx.AsyncClient, audio is streamed with grpc.aio.
+"""
+
+import asyncio
+import os
+
+from py_audio2face.modules.clients._async_http_client import _A2F_ASYNC_HTTP_CLIENT
+from py_audio2face.modules.aio._general import _AsyncA2FGeneral
+from py_audio2face.modules.aio._player import _AsyncA2FPlayer
+from py_audio2face.modules.aio._audio2emotion import _AsyncA2FAudio2Emotion
+from py_audio2face.modules.aio._export import _AsyncA2FExport
+from py_audio2face.modules.aio._streaming import _AsyncA2FStreaming
+from py_audio2face.modules._audio2emotion import _A2F_Audio2Emotion
+from py_audio2face.settings import DEFAULT_HTTP_POOL_SIZE
+
+from py_audio2face import utils
+
+
+class AsyncAudio2Face(
+    _A2F_ASYNC_HTTP_CLIENT,
+    _AsyncA2FGeneral,
+    _AsyncA2FExport,
+    _AsyncA2FPlayer,
+    _AsyncA2FAudio2Emotion,
+    _AsyncA2FStreaming
+):
+    def __init__(
+            self,
+            api_url="http://localhost:8011",
+            a2f_install_path: str = None,
+            output_dir: str = None,
+            pool_size: int = DEFAULT_HTTP_POOL_SIZE,
+            timeout: float = 600,
+            grpc_channels=None
+    ):
+        """
+        api_url (str): The API endpoint for Audio2Face.
+        a2f_install_path (str): Path to the Audio2Face installation directory. If its tried to get it from defualt dir
+        output_dir (str): Optional output directory for generated animations.
+        pool_size (int): Maximum number of kept-alive http connections to the server.
+        timeout (float): Timeout of http requests in seconds. Exports of long tracks can take minutes.
+        grpc_channels (AsyncGrpcChannelPool): Optional pool of persistent grpc.aio channels for streaming, see
+            Audio2Face. Created on the first stream if not given. aclose() only closes a pool the client created itself.
+        """
+        self.api_url = api_url
+        if a2f_install_path is None:
+            a2f_install_path = utils.get_audio2face_install_path()
+            if a2f_install_path is None:
+                raise FileNotFoundError(
+                    "Audio2Face installation path is not provided and not found in the registry. "
+                    "Install Audio2Face and provide the installation path manually."
+                )
+        if a2f_install_path[-1] != "/":
+            a2f_install_path += "/"
+
+        self.a2f_install_path = a2f_install_path
+        self.output_dir = output_dir
+        self.process_audio2face = None
+        self.supervisor = None  # HeadlessServerSupervisor, created by start_headless_server
+
+        self.http_client = self._create_http_client(pool_size=pool_size, timeout=timeout)
+        self.loaded_scene = None
+        self.grpc_channels = grpc_channels
+        self._owns_grpc_channels = grpc_channels is None  # a pool created by get_grpc_channels is closed by aclose()
+
+        # audio2emotion
+        self.a2e_settings = _A2F_Audio2Emotion.get_default_a2e_settings()
+
+        # The headless server has a single player and solver. set_track + export of concurrent calls must not
+        # interleave. Created lazily because asyncio.Lock binds to the running loop on python < 3.10
+        self._player_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    @property
+    def player_lock(self) -> asyncio.Lock:
+        if self._player_lock is None:
+            self._player_lock = asyncio.Lock()
+        return self._player_lock
+
+    async def init_a2f(self, streaming: bool = False):
+        """
+        Starts the audio2face headless server if a2f not running.
+        Sends the arkit_resolved mark_usd_file / streaming file to the audio2face server to initialize the scene.
+        """
+        mark_usd_file = utils.get_mark_usd_file_path(streaming)
+        if self.loaded_scene == mark_usd_file:
+            return
+
+        await self.start_headless_server()
+        await self.load_scene(mark_usd_file)
+
+    async def audio2face_single(
+            self,
+            audio_file_path: str,
+            output_path: str,
+            fps: int = 60,
+            emotion_auto_detect: bool = True,
+            format: str = "usd"
+    ) -> str:
+        """
+        Generate the face animation from a single audio file.
+        Concurrent calls are queued on the server's player, while the event loop stays free for other work.
+        audio_file_path (str): Path to the audio file.
+        output_path (str): Path to the output animation file.
+        fps (int): Frames per second of the output animation.
+        emotion_auto_detect (bool): Whether to detect emotions in audio and convert them to keyframes.
+        return: the path of the output file
+        """
+        async with self.player_lock:
+            await self.init_a2f()
+
+            await self.set_root_path(audio_file_path)
+            await self.set_track(audio_file_path)
+
+            return await self.export(
+                output_path=output_path, fps=fps, emotion_auto_detect=emotion_auto_detect, format=format
+            )
+
+    async def audio2face_folder(
+            self,
+            input_folder: str,
+            output_folder: str,
+            fps: int = 60,
+            emotion: bool = False,
+            format: str = "usd"
+    ) -> list:
+        """
+        Generate the face animations from all audio files in a folder.
+        :return: a list of the paths of the output files
+        """
+        async with self.player_lock:
+            await self.init_a2f()
+            await self.set_root_path(input_folder)
+
+            output_files = []
+            for af in utils.get_files_in_dir(input_folder, [".wav", ".mp3"]):
+                await self.set_track(af)
+                outfile_name, ext = os.path.basename(af).rsplit(".", 1)
+                outfile_name = f"{output_folder}/{outfile_name}_a2f_animation"
+                of = await self.export(output_path=outfile_name, fps=fps, emotion_auto_detect=emotion, format=format)
+                output_files.append(of)
+
+            return output_files
@@ -7,14 +7,19 @@ The script includes methods to
 """
 
 import os
+import shutil
 import tqdm
 
 from py_audio2face.modules.clients._http_client import _A2F_HTTP_CLIENT
+from py_audio2face.modules.clients._transport import A2FTransport
 from py_audio2face.modules._general import _A2FGeneral
 from py_audio2face.modules._player import _A2FPlayer
 from py_audio2face.modules._audio2emotion import _A2F_Audio2Emotion
 from py_audio2face.modules._export import _A2FExport
 from py_audio2face.modules._streaming import _A2F_streaming
+from py_audio2face.modules._state import A2FServerState
+from py_audio2face.modules._animation_cache import AnimationCache
+from py_audio2face.modules._manifest import FolderManifest
 
 from py_audio2face import utils
 
@@ -31,14 +36,28 @@ class Audio2Face(
             self,
             api_url="http://localhost:8011",
             a2f_install_path: str = None,
-            output_dir: str = None
+            output_dir: str = None,
+            transport: A2FTransport = None,
+            cache: AnimationCache = None,
+            grpc_channels=None,
+            supervisor=None
     ):
         """
         api_url (str): The API endpoint for Audio2Face.
         a2f_install_path (str): Path to the Audio2Face installation directory. If its tried to get it from defualt dir
         output_dir (str): Optional output directory for generated animations.
+        transport (A2FTransport): Optional HTTP transport to the server. Configure pool size, timeouts and retries
+            with it or pass a subclass. Defaults to a pooled keep-alive A2FTransport.
+        cache (AnimationCache): Optional cache of exported animations. Audio which was already animated with the same
+            settings is copied from the cache instead of being sent to the server.
+        grpc_channels (GrpcChannelPool): Optional pool of persistent gRPC channels for streaming. Share one pool
+            between clients or configure its keepalive. Created on the first stream if not given. close() only closes
+            a pool the client created itself, a passed pool stays open for the other clients.
+        supervisor (HeadlessServerSupervisor): Optional supervisor of the headless server process, e.g. with another
+            start script, a log file or restart settings. Created by start_headless_server if not given.
         """
         self.api_url = api_url
+        self.transport = transport if transport is not None else A2FTransport()
         if a2f_install_path is None:
             a2f_install_path = utils.get_audio2face_install_path()
             if a2f_install_path is None:
@@ -52,11 +71,45 @@ class Audio2Face(
         self.a2f_install_path = a2f_install_path
         self.output_dir = output_dir
         self.process_audio2face = None  # process object for audio2face from subprocess
+        self.supervisor = supervisor
 
-        self.loaded_scene = None  # the current loaded scene. Checked in init_a2f for not loading the same scene again
+        # mirror of the server state. Used to skip requests which wouldn't change anything
+        self.server_state = A2FServerState()
+        self.cache = cache
+        self.last_export_response = None
+        self.grpc_channels = grpc_channels
+        self._owns_grpc_channels = grpc_channels is None  # a pool created by get_grpc_channels is closed by close()
+        self.last_stream_stats = None  # StreamStats of the last stream_audio call
 
         # audio2emotion
         self.a2e_settings = self.get_default_a2e_settings()
+        self.emotion = None  # the global emotion of the last set_emotion call. None keeps the one of the scene.
+
+    def close(self):
+        """
+        Closes the pooled http connections and the gRPC channels of the client and writes the index of the cache.
+        The headless server keeps running. A gRPC channel pool passed to the constructor is shared and stays open.
+        """
+        self.transport.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.grpc_channels is not None and self._owns_grpc_channels:
+            self.grpc_channels.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def loaded_scene(self):
+        """ the current loaded scene. Checked in init_a2f for not loading the same scene again """
+        return self.server_state.scene
+
+    @loaded_scene.setter
+    def loaded_scene(self, usd_file_path: str):
+        self.server_state.set_scene(usd_file_path)
 
     def init_a2f(self, streaming: bool = False):
         """
@@ -76,7 +129,8 @@ class Audio2Face(
             output_path: str,
             fps: int = 60,
             emotion_auto_detect: bool = True, 
-            format: str = "usd" 
+            format: str = "usd",
+            postprocess=None
     ) -> str:
         """
         Generate the face animation from a single audio file.
@@ -85,14 +139,27 @@ class Audio2Face(
         fps (int): Frames per second of the output animation.
         emotion_auto_detect (bool): Whether to detect emotions in audio and convert them to keyframes. To change the
             default settings, use the set_emotion method.
+        postprocess (AnimationPipeline): Optional post-processing of the exported animation. The cache keeps the
+            unprocessed export, so other pipelines can be applied to the cached animation later.
         return: the path of the output file
         """
+        if output_path is not None:
+            # export makes relative paths absolute. Do the same here, so hits and misses return the same path.
+            output_path = os.path.abspath(output_path)
+        export_file = utils.get_export_file_path(output_path, format)
+        cache_key = self._get_cache_key(audio_file_path, output_path, fps, emotion_auto_detect, format)
+        if cache_key is not None and self.cache.get(cache_key, export_file):
+            if postprocess is not None:
+                postprocess.process_file(export_file)
+            return output_path
+
         self.init_a2f()
 
         self.set_root_path(audio_file_path)
-        self.set_track(audio_file_path)
-
-        return self.export(output_path=output_path, fps=fps, emotion_auto_detect=emotion_auto_detect, format=format)
+        output_path = self._animate_track(audio_file_path, output_path, fps, emotion_auto_detect, format, cache_key)
+        if postprocess is not None and utils.is_ok_response(self.last_export_response):
+            postprocess.process_file(utils.get_export_file_path(output_path, format))
+        return output_path
 
     def audio2face_folder(
             self, 
@@ -100,7 +167,10 @@ class Audio2Face(
             output_folder: str, 
             fps: int = 60, 
             emotion: bool = False, 
-            format: str = "usd" 
+            format: str = "usd",
+            incremental: bool = True,
+            batch: bool = False,
+            postprocess=None
         ) -> list:
         """
         Generate the face animations from all audio files in a folder.
@@ -108,26 +178,151 @@ class Audio2Face(
         output_folder (str): Path to the output folder for the animations.
         fps (int): Frames per second of the output animations.
         emotion_auto_detect (bool): Whether to generate emotion_auto_detect keys from the audio files.
+        incremental (bool): Keep a manifest in the output folder and skip files which were already exported with the
+            same settings and didn't change since. An interrupted run continues where it stopped.
+        batch (bool): Let the server export the whole folder in one request instead of set_track + export per file.
+            Much faster for many short clips. Files the batch export didn't produce are exported one by one.
+            Note that the server always exports all files of the folder, also the ones that are up to date.
+        postprocess (AnimationPipeline): Optional post-processing of every produced animation. Its configuration is
+            part of the manifest settings, so a changed pipeline exports the folder again.
         :return: a list of the paths of the output files
         """
-        self.init_a2f()
+        audio_files = utils.get_files_in_dir(input_folder, [".wav", ".mp3"])
+        render_settings = self.get_render_settings(fps, format, emotion)
+        if render_settings is None:
+            print("The emotion on the server is unknown. Exporting all files without manifest.")
+            incremental = False
+        manifest = FolderManifest(output_folder) if incremental else None
+        settings_hash = None
+        if manifest is not None:
+            if postprocess is not None:
+                render_settings["postprocess"] = postprocess.config()
+            settings_hash = FolderManifest.settings_hash(render_settings)
+
+        # outfile name will be base file name of af_a2f_animation
+        output_files = [
+            os.path.abspath(f"{output_folder}/{os.path.basename(af).rsplit('.', 1)[0]}_a2f_animation")
+            for af in audio_files
+        ]
+
+        def finish(af: str, outfile_name: str):
+            if postprocess is not None:
+                postprocess.process_file(utils.get_export_file_path(outfile_name, format))
+            if manifest is not None:
+                # the cache already hashed the audio for its key, don't read the file again
+                sha256 = self.cache.hash_audio(af) if self.cache is not None else None
+                manifest.record(af, settings_hash, outfile_name, sha256=sha256)
+
+        # skip what is up to date or cached
+        pending = []
+        for af, outfile_name in zip(audio_files, output_files):
+            export_file = utils.get_export_file_path(outfile_name, format)
+            if manifest is not None and manifest.is_up_to_date(af, settings_hash, export_file):
+                continue
 
+            cache_key = self._get_cache_key(af, outfile_name, fps, emotion, format)
+            if cache_key is not None and self.cache.get(cache_key, export_file):
+                finish(af, outfile_name)
+                continue
+
+            pending.append((af, outfile_name, cache_key))
+
+        if not pending:
+            return output_files
+
+        # the server is only initialized once the first file has to be animated
+        self.init_a2f()
         self.set_root_path(input_folder)
 
-        audio_files = utils.get_files_in_dir(input_folder, [".wav", ".mp3"])
+        if batch and len(pending) > 1:
+            pending = self._export_folder_batch(pending, output_folder, fps, emotion, format, finish)
 
         # iterate and convert files
-        audio_files_tqdm = tqdm.tqdm(audio_files)
-        output_files = []
-        for af in audio_files_tqdm:
-            audio_files_tqdm.set_description(f"Processing {af}")
-            self.set_track(af)
+        animated = set()  # cache keys exported in this run. Identical audio later in the folder is copied.
+        pending_tqdm = tqdm.tqdm(pending)
+        for af, outfile_name, cache_key in pending_tqdm:
+            pending_tqdm.set_description(f"Processing {af}")
+            if cache_key in animated and self.cache.get(cache_key, utils.get_export_file_path(outfile_name, format)):
+                finish(af, outfile_name)
+                continue
+
+            self._animate_track(af, outfile_name, fps, emotion, format, cache_key)
+            if utils.is_ok_response(self.last_export_response):
+                finish(af, outfile_name)
+                if cache_key is not None:
+                    animated.add(cache_key)
+
+        return output_files
+
+    def _export_folder_batch(self, pending: list, output_folder: str, fps: int, emotion: bool, format: str, finish) -> list:
+        """
+        Exports the pending (audio file, output name, cache key) of the folder with one batch request.
+        Renames the exports to the names of the per-file export and returns the files which still need to be exported.
+        """
+        batch_dir = os.path.join(os.path.abspath(output_folder), ".a2f_batch")
+        exported = self.export_batch(
+            [af for af, _, _ in pending], batch_dir, fps=fps, format=format, emotion_auto_detect=emotion
+        )
+
+        remaining = []
+        for af, outfile_name, cache_key in pending:
+            if af not in exported:
+                remaining.append((af, outfile_name, cache_key))
+                continue
+
+            export_file = utils.get_export_file_path(outfile_name, format)
+            os.replace(exported[af], export_file)
+            if cache_key is not None:
+                self.cache.put(cache_key, export_file)
+            finish(af, outfile_name)
 
-            # outfile name will be base file name of af_a2f_animation
-            outfile_name, ext = os.path.basename(af).rsplit(".", 1)
-            outfile_name = f"{output_folder}/{outfile_name}_a2f_animation"
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        if remaining:
+            print(f"Batch export produced {len(pending) - len(remaining)} of {len(pending)} files. Exporting the rest one by one.")
+        return remaining
+
+    def get_render_settings(self, fps: int, format: str, emotion_auto_detect: bool) -> dict:
+        """
+        All client side settings which influence an exported animation besides the audio itself.
+        None if the server may not hold the emotion set with set_emotion, e.g. after a scene load or invalidate_state.
+        The result is unknown then and must neither be cached nor recorded in a manifest.
+        """
+        if self.emotion is not None and self.server_state.emotion != self.emotion:
+            return None
+        return {
+            "fps": fps,
+            "format": format,
+            "emotion_auto_detect": bool(emotion_auto_detect),
+            # keys are only generated and therefore only influence the result with emotion_auto_detect
+            "a2e_settings": self.a2e_settings if emotion_auto_detect else None,
+            "emotion": self.emotion,
+            "scene": os.path.basename(utils.get_mark_usd_file_path(streaming=False)),
+        }
+
+    def _get_cache_key(self, audio_file_path: str, output_path: str, fps: int, emotion_auto_detect: bool, format: str):
+        """ returns the key of the animation in the cache or None if caching is not possible """
+        if self.cache is None or output_path is None:
+            return None
+
+        render_settings = self.get_render_settings(fps, format, emotion_auto_detect)
+        if render_settings is None:
+            return None
+        return self.cache.make_key(audio_file_path, render_settings)
+
+    def _animate_track(
+            self,
+            audio_file_path: str,
+            output_path: str,
+            fps: int,
+            emotion_auto_detect: bool,
+            format: str,
+            cache_key: str = None
+    ) -> str:
+        """ set_track + export of a file inside the current root path. Successful exports are added to the cache. """
+        self.set_track(audio_file_path)
+        output_path = self.export(output_path=output_path, fps=fps, emotion_auto_detect=emotion_auto_detect, format=format)
 
-            of = self.export(output_path=outfile_name, fps=fps, emotion_auto_detect=emotion, format=format)
-            output_files.append(of)
+        if cache_key is not None and utils.is_ok_response(self.last_export_response):
+            self.cache.put(cache_key, utils.get_export_file_path(output_path, format))
 
-        return output_files
\ No newline at end of file
+        return output_path
@@ -0,0 +1,175 @@
+"""
+Spread the files of a folder over several Audio2Face headless servers.
+Each server gets a worker thread with its own client and queue of files. Workers which run out of files steal
+from the end of the longest queue of the others, so fast servers automatically take over work of slow ones.
+If a server dies mid-batch its current file and its queue are taken over by the remaining servers.
+"""
+
+import collections
+import os
+import threading
+import tqdm
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face import utils
+
+
+class _WorkStealingQueues:
+    """
+    One deque per worker. Workers pop from the front of their own deque and steal from the back of the others.
+    Idle workers wait while files are in flight, because a failing server gives its file back to the queues.
+    """
+    def __init__(self, n_workers: int):
+        self.queues = [collections.deque() for _ in range(n_workers)]
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+    def distribute(self, items: list):
+        # round-robin so every worker starts with a similar share of the folder
+        for i, item in enumerate(items):
+            self.queues[i % len(self.queues)].append(item)
+
+    def get(self, worker: int):
+        """ returns the next item for the worker or None if all work is done """
+        with self.cond:
+            while True:
+                if self.queues[worker]:
+                    item = self.queues[worker].popleft()
+                else:
+                    victim = max(self.queues, key=len)
+                    item = victim.pop() if victim else None
+
+                if item is not None:
+                    self.in_flight += 1
+                    return item
+                if self.in_flight == 0:
+                    return None
+                self.cond.wait()
+
+    def done(self, worker: int, requeue=None):
+        """ marks the worker's current item as finished. A requeued item is put at the back to be stolen first. """
+        with self.cond:
+            self.in_flight -= 1
+            if requeue is not None:
+                self.queues[worker].append(requeue)
+            self.cond.notify_all()
+
+
+class Audio2FacePool:
+    def __init__(
+            self,
+            api_urls: list = None,
+            a2f_install_path: str = None,
+            clients: list = None
+    ):
+        """
+        api_urls (list): API endpoints of the running headless servers e.g. ["http://localhost:8011", "http://localhost:8012"]
+        a2f_install_path (str): Path to the Audio2Face installation directory, passed to the clients.
+        clients (list): Already configured Audio2Face clients. Used instead of api_urls if given.
+        """
+        if clients is None:
+            if not api_urls:
+                raise ValueError("Provide either api_urls or clients")
+            clients = [Audio2Face(api_url=url, a2f_install_path=a2f_install_path) for url in api_urls]
+
+        self.clients = clients
+        self.alive = [True] * len(clients)
+
+    def is_server_alive(self, worker: int) -> bool:
+        # one short status request, make_request would retry a dead server with backoff
+        return self.clients[worker].is_ready()
+
+    def audio2face_folder(
+            self,
+            input_folder: str,
+            output_folder: str,
+            fps: int = 60,
+            emotion: bool = False,
+            format: str = "usd",
+            max_attempts: int = 2
+    ) -> list:
+        """
+        Generate the face animations from all audio files in a folder using all servers of the pool.
+        input_folder (str): Path to the folder containing the audio files. Must be readable by all servers.
+        output_folder (str): Path to the output folder for the animations.
+        fps (int): Frames per second of the output animations.
+        emotion (bool): Whether to generate emotion keys from the audio files.
+        max_attempts (int): How often a file is tried on (different) live servers before it is given up.
+        :return: a list of the paths of the output files in the order of the input files. None for failed files.
+        """
+        audio_files = utils.get_files_in_dir(input_folder, [".wav", ".mp3"])
+        output_folder = os.path.abspath(output_folder)
+        os.makedirs(output_folder, exist_ok=True)
+
+        self.alive = [True] * len(self.clients)
+        queues = _WorkStealingQueues(len(self.clients))
+        queues.distribute(list(range(len(audio_files))))
+        results = [None] * len(audio_files)
+        attempts = [0] * len(audio_files)
+        progress = tqdm.tqdm(total=len(audio_files))
+
+        def worker(w: int):
+            client = self.clients[w]
+            if not self.is_server_alive(w):
+                print(f"audio2face server {client.api_url} is not running. Skipping it.")
+                self.alive[w] = False
+                return
+
+            client.init_a2f()
+            client.set_root_path(input_folder)
+
+            while True:
+                i = queues.get(w)
+                if i is None:
+                    return
+
+                af = audio_files[i]
+                outfile_name, ext = os.path.basename(af).rsplit(".", 1)
+                outfile_name = f"{output_folder}/{outfile_name}_a2f_animation"
+                attempts[i] += 1
+                if self._process_file(client, af, outfile_name, fps, emotion, format):
+                    results[i] = outfile_name
+                    queues.done(w)
+                    progress.update(1)
+                    continue
+
+                if not self.is_server_alive(w):
+                    # give the file back without counting the attempt. The other workers steal it from the queue.
+                    print(f"audio2face server {client.api_url} died. Redistributing its files.")
+                    self.alive[w] = False
+                    attempts[i] -= 1
+                    queues.done(w, requeue=i)
+                    return
+
+                if attempts[i] < max_attempts:
+                    queues.done(w, requeue=i)
+                else:
+                    print(f"Failed to animate {af} after {attempts[i]} attempts")
+                    queues.done(w)
+                    progress.update(1)
+
+        threads = [threading.Thread(target=worker, args=(w,), daemon=True) for w in range(len(self.clients))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        progress.close()
+
+        if not any(self.alive):
+            print("All audio2face servers of the pool are down. Unprocessed files are returned as None.")
+
+        return results
+
+    @staticmethod
+    def _process_file(client: Audio2Face, audio_file: str, output_path: str, fps: int, emotion: bool, format: str) -> bool:
+        """ Animates a single file on the client's server. Returns True if the export succeeded. """
+        try:
+            client.set_track(audio_file)
+            if emotion:
+                client.generate_emotion_keys()
+            response = client.export_blend_shape(output_path=output_path, fps=fps, format=format)
+        except Exception as e:
+            print(f"Processing {audio_file} on {client.api_url} failed: {e}")
+            return False
+
+        return utils.is_ok_response(response)
@@ -0,0 +1,111 @@
+"""
+Local post-processing of emotion timelines, e.g. the raw curves of Audio2Face.get_emotion_timeline.
+The functions work on float32 arrays of shape (frames, emotions) and mirror the Audio2Emotion settings:
+smoothing (a2e_smoothing_exp), contrast (a2e_contrast), max emotions (a2e_max_emotions), strength
+(a2e_emotion_strength) and the preferred emotion (preferred_emotion, a2e_preferred_emotion_strength).
+They approximate the server side stages, so settings can be swept in milliseconds instead of one GenerateKeys
+round trip per trial. Apply the chosen settings on the server for the final export.
+"""
+
+import numpy as np
+
+
+def smooth(emotions: np.ndarray, smoothing_exp: float, out: np.ndarray = None) -> np.ndarray:
+    """
+    Averages every frame with its neighbors, weighted by exp(-distance / smoothing_exp).
+    :param smoothing_exp: Decay of the weights in frames (keyframes for a keyframe timeline). 0 disables smoothing.
+    :param out: Optional output array of the same shape. Must not be emotions itself.
+    """
+    emotions = np.asarray(emotions, dtype=np.float32)
+    if out is None:
+        out = np.empty_like(emotions)
+    if smoothing_exp <= 0 or len(emotions) < 2:
+        out[...] = emotions
+        return out
+
+    # 3 time constants cover 95% of the kernel. The edges are repeated so the ends don't fade to 0.
+    radius = min(int(np.ceil(3 * smoothing_exp)), len(emotions) - 1)
+    weights = np.exp(-np.arange(radius + 1) / smoothing_exp).astype(np.float32)
+    padded = np.pad(emotions, ((radius, radius), (0, 0)), mode="edge")
+    n = len(emotions)
+    np.multiply(emotions, weights[0], out=out)
+    for k in range(1, radius + 1):
+        out += weights[k] * (padded[radius - k:radius - k + n] + padded[radius + k:radius + k + n])
+    out /= weights[0] + 2 * weights[1:].sum()
+    return out
+
+
+def contrast(emotions: np.ndarray, amount: float, out: np.ndarray = None) -> np.ndarray:
+    """
+    Spreads the emotions of every frame away from (amount > 1) or towards (amount < 1) the frame's mean.
+    The result is clipped to 0..1.
+    """
+    emotions = np.asarray(emotions, dtype=np.float32)
+    mean = emotions.mean(axis=1, keepdims=True)
+    out = np.subtract(emotions, mean, out=out)
+    out *= amount
+    out += mean
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def limit_emotions(emotions: np.ndarray, max_emotions: int, out: np.ndarray = None) -> np.ndarray:
+    """ Keeps the max_emotions strongest emotions of every frame and sets the others to 0. """
+    emotions = np.asarray(emotions, dtype=np.float32)
+    if out is None:
+        out = emotions.copy()
+    elif out is not emotions:
+        out[...] = emotions
+    n_emotions = emotions.shape[1]
+    if max_emotions >= n_emotions:
+        return out
+
+    weakest = np.argpartition(emotions, n_emotions - max_emotions - 1, axis=1)[:, :n_emotions - max_emotions]
+    np.put_along_axis(out, weakest, 0.0, axis=1)
+    return out
+
+
+def scale_strength(emotions: np.ndarray, strength: float, out: np.ndarray = None) -> np.ndarray:
+    """ Scales the emotions relative to the neutral face (all 0). """
+    return np.multiply(np.asarray(emotions, dtype=np.float32), strength, out=out)
+
+
+def mix_preferred(emotions: np.ndarray, preferred: list, strength: float, out: np.ndarray = None) -> np.ndarray:
+    """
+    Blends the preferred emotion into every frame: emotions * (1 - strength) + preferred * strength.
+    An unset preferred emotion (all 0) leaves the emotions unchanged like in A2F.
+    """
+    emotions = np.asarray(emotions, dtype=np.float32)
+    preferred = np.asarray(preferred, dtype=np.float32)
+    if not preferred.any() or strength <= 0:
+        if out is None:
+            return emotions.copy()
+        out[...] = emotions
+        return out
+
+    out = np.multiply(emotions, 1.0 - strength, out=out)
+    out += preferred * strength
+    return out
+
+
+def apply_a2e_settings(emotions: np.ndarray, settings: dict = None, out: np.ndarray = None, **kwargs) -> np.ndarray:
+    """
+    Runs all stages in the order of Audio2Emotion: smoothing, contrast, max emotions, strength, preferred emotion.
+    :param emotions: Raw timeline of shape (frames, emotions).
+    :param settings: a2e settings like Audio2Face.a2e_settings. Missing keys skip their stage.
+    :param out: Optional output buffer of the same shape, reused between calls of a parameter sweep.
+    :param kwargs: Overrides single settings e.g. a2e_contrast=1.5
+    :return: the processed timeline
+    """
+    settings = dict(settings or {}, **kwargs)
+    emotions = np.asarray(emotions, dtype=np.float32)
+
+    out = smooth(emotions, settings.get("a2e_smoothing_exp", 0), out=out)
+    if settings.get("a2e_contrast", 1.0) != 1.0:
+        contrast(out, settings["a2e_contrast"], out=out)
+    if settings.get("a2e_max_emotions") is not None:
+        limit_emotions(out, settings["a2e_max_emotions"], out=out)
+    if settings.get("a2e_emotion_strength") is not None:
+        scale_strength(out, settings["a2e_emotion_strength"], out=out)
+    if settings.get("preferred_emotion") is not None:
+        mix_preferred(out, settings["preferred_emotion"], settings.get("a2e_preferred_emotion_strength", 0), out=out)
+    return out
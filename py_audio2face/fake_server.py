@@ -0,0 +1,445 @@
+"""
+Local stand-in for the Audio2Face headless server.
+It implements the REST routes used by the mixins and the gRPC Audio2Face service of the streaming player,
+so the client can be developed, benchmarked and regression-tested on machines without a GPU or Audio2Face install.
+Nothing is animated: exports contain synthetic but well-formed blendshape curves in the A2F file layout.
+
+Latency, failures and processing time proportional to the audio length are configurable:
+    with FakeAudio2FaceServer(latency=0.002, processing_factor=0.05) as server:
+        a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+        a2f.stream_audio(..., grpc_port=server.grpc_port)
+
+Or from the command line:
+    python -m py_audio2face.fake_server --port 8011 --grpc-port 50051
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from py_audio2face import utils
+from py_audio2face.settings import DEFAULT_AUDIO_STREAM_GRPC_PORT
+
+try:
+    import grpc
+    from concurrent import futures
+    from py_audio2face.modules.clients.grpc_stub import audio2face_pb2, audio2face_pb2_grpc
+    streaming_installed = True
+except Exception as e:
+    streaming_installed = False
+
+
+EMOTION_NAMES = [
+    "amazement", "anger", "cheekiness", "disgust", "fear", "grief", "joy", "outofbreath", "pain", "sadness"
+]
+
+ARKIT_BLENDSHAPE_NAMES = [
+    "eyeBlinkLeft", "eyeLookDownLeft", "eyeLookInLeft", "eyeLookOutLeft", "eyeLookUpLeft", "eyeSquintLeft",
+    "eyeWideLeft", "eyeBlinkRight", "eyeLookDownRight", "eyeLookInRight", "eyeLookOutRight", "eyeLookUpRight",
+    "eyeSquintRight", "eyeWideRight", "jawForward", "jawLeft", "jawRight", "jawOpen", "mouthClose", "mouthFunnel",
+    "mouthPucker", "mouthLeft", "mouthRight", "mouthSmileLeft", "mouthSmileRight", "mouthFrownLeft",
+    "mouthFrownRight", "mouthDimpleLeft", "mouthDimpleRight", "mouthStretchLeft", "mouthStretchRight",
+    "mouthRollLower", "mouthRollUpper", "mouthShrugLower", "mouthShrugUpper", "mouthPressLeft", "mouthPressRight",
+    "mouthLowerDownLeft", "mouthLowerDownRight", "mouthUpperUpLeft", "mouthUpperUpRight", "browDownLeft",
+    "browDownRight", "browInnerUp", "browOuterUpLeft", "browOuterUpRight", "cheekPuff", "cheekSquintLeft",
+    "cheekSquintRight", "noseSneerLeft", "noseSneerRight", "tongueOut"
+]
+
+# routes whose processing time grows with the length of the current track
+_PROCESSING_ROUTES = {"A2F/A2E/GenerateKeys", "A2F/Exporter/ExportBlendshapes"}
+
+
+def _ok(result=None, message: str = ""):
+    return {"status": "OK", "result": result, "message": message}
+
+
+def _error(message: str):
+    return {"status": "ERROR", "result": None, "message": message}
+
+
+def synthetic_weights(n_frames: int, n_shapes: int, fps: float) -> list:
+    """ smooth, deterministic curves in [0, 1] shaped (frames, shapes) """
+    return [
+        [round(0.5 + 0.5 * math.sin(2 * math.pi * (0.3 + 0.07 * s) * f / fps + s), 4) for s in range(n_shapes)]
+        for f in range(n_frames)
+    ]
+
+
+def write_blendshape_export(file_path: str, fps: float, duration: float, track_path: str = "", names: list = None):
+    """ Writes an animation in the layout of the A2F blendshape exporter. format is taken from the extension. """
+    names = names or ARKIT_BLENDSHAPE_NAMES
+    n_frames = max(1, int(round(duration * fps)) + 1)
+    weights = synthetic_weights(n_frames, len(names), fps)
+
+    if file_path.endswith(".json"):
+        with open(file_path, "w") as f:
+            json.dump({
+                "exportFps": fps,
+                "trackPath": track_path,
+                "numPoses": len(names),
+                "numFrames": n_frames,
+                "facsNames": names,
+                "weightMat": weights
+            }, f)
+        return
+
+    # usda text layer. USD detects the text format by content, so the .usd extension works for it as well.
+    samples = ",\n".join(f"            {i}: [{', '.join(map(str, w))}]" for i, w in enumerate(weights))
+    name_tokens = ", ".join(f'"{n}"' for n in names)
+    with open(file_path, "w") as f:
+        f.write(
+            "#usda 1.0\n"
+            f"(\n    startTimeCode = 0\n    endTimeCode = {n_frames - 1}\n    timeCodesPerSecond = {fps}\n)\n\n"
+            'def Xform "World"\n{\n'
+            '    def SkelAnimation "anim_output"\n    {\n'
+            f"        uniform token[] blendShapes = [{name_tokens}]\n"
+            f"        float[] blendShapeWeights.timeSamples = {{\n{samples}\n        }}\n"
+            "    }\n}\n"
+        )
+
+
+class FakeAudio2FaceServer:
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            grpc_port: int = 0,
+            latency=0.0,
+            processing_factor: float = 0.0,
+            failure_rate: float = 0.0,
+            failing_routes: list = None,
+            playback_factor: float = 0.0,
+            seed: int = None
+    ):
+        """
+        host (str): Interface to bind the REST and gRPC servers to.
+        port (int): REST port. 0 picks a free port, see api_url.
+        grpc_port (int): gRPC port of the streaming player. 0 picks a free port. None disables gRPC.
+        latency (float | dict): Seconds added to every request, or {route: seconds}. Key "*" is the default.
+        processing_factor (float): GenerateKeys and ExportBlendshapes take processing_factor * track duration seconds.
+        failure_rate (float): Probability that a request of failing_routes answers with HTTP 500.
+        failing_routes (list): Routes affected by failure_rate. None means all routes.
+        playback_factor (float): gRPC pushes with block_until_playback_is_finished wait playback_factor * audio
+            duration seconds. 1.0 is real time like the real player.
+        seed (int): Seed for the failure injection.
+        """
+        self.host = host
+        self.latency = latency
+        self.processing_factor = processing_factor
+        self.failure_rate = failure_rate
+        self.failing_routes = set(failing_routes) if failing_routes is not None else None
+        self.playback_factor = playback_factor
+        self.random = random.Random(seed)
+
+        self._http = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._http.daemon_threads = True
+        self._http.fake = self
+        self._http_thread = None
+
+        self._grpc = None
+        self.grpc_port = None
+        if grpc_port is not None and streaming_installed:
+            self._grpc = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+            audio2face_pb2_grpc.add_Audio2FaceServicer_to_server(_StreamingServicer(self), self._grpc)
+            self.grpc_port = self._grpc.add_insecure_port(f"{host}:{grpc_port}")
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Resets the simulated scene state and the request counters """
+        with self.lock:
+            self.loaded_scene = None
+            self.root_path = None
+            self.track = None
+            self.a2e_settings = {}
+            self.emotion = [0.0] * len(EMOTION_NAMES)
+            self.frame = 0
+            self.live_seconds = 0.0  # audio of the current / last stream received by the streaming player
+            self.requests = {}  # route -> count
+            self.streams = []  # one dict per received gRPC push
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self._http.server_address[1]}"
+
+    def start(self):
+        self._http_thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._http_thread.start()
+        if self._grpc is not None:
+            self._grpc.start()
+        return self
+
+    def stop(self):
+        self._http.shutdown()
+        self._http.server_close()
+        if self._grpc is not None:
+            self._grpc.stop(grace=None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # simulation helpers
+    def _latency_for(self, route: str) -> float:
+        if isinstance(self.latency, dict):
+            return self.latency.get(route, self.latency.get("*", 0.0))
+        return self.latency
+
+    def _should_fail(self, route: str) -> bool:
+        if self.failure_rate <= 0 or (self.failing_routes is not None and route not in self.failing_routes):
+            return False
+        with self.lock:
+            return self.random.random() < self.failure_rate
+
+    def track_duration(self, track: str = None) -> float:
+        track = track or self.track
+        if self.root_path is None or track is None:
+            return 0.0
+        try:
+            return utils.get_wav_duration(os.path.join(self.root_path, track))
+        except (OSError, ValueError):
+            return 0.0
+
+    def root_path_tracks(self) -> list:
+        return sorted(f for f in os.listdir(self.root_path) if f.endswith((".wav", ".mp3")))
+
+    def handle(self, method: str, route: str, payload: dict):
+        """ returns (http status code, json body) of a REST request """
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+        delay = self._latency_for(route)
+        if route in _PROCESSING_ROUTES:
+            delay += self.processing_factor * self.track_duration()
+        if delay > 0:
+            time.sleep(delay)
+
+        if self._should_fail(route):
+            return 500, _error("injected failure")
+
+        handler = getattr(self, "_route_" + route.replace("/", "_"), None)
+        if handler is None:
+            return 404, {"detail": "Not Found"}
+        return 200, handler(payload or {})
+
+    # REST routes. Names are the route with / replaced by _
+    def _route_status(self, payload):
+        return "OK"
+
+    def _route_A2F_GetInstances(self, payload):
+        return _ok({
+            "fullface_instances": ["/World/audio2face/CoreFullface"],
+            "regular_instances": [],
+            "streaming_instances": []
+        })
+
+    def _route_A2F_USD_Load(self, payload):
+        self.loaded_scene = payload.get("file_name")
+        return _ok(message=f"Loaded {self.loaded_scene}")
+
+    def _route_A2F_Player_SetRootPath(self, payload):
+        dir_path = payload.get("dir_path", "")
+        if not os.path.isdir(dir_path):
+            return _error(f"{dir_path} is not a directory")
+        self.root_path = dir_path
+        return _ok()
+
+    def _route_A2F_Player_GetRootPath(self, payload):
+        return _ok(self.root_path)
+
+    def _route_A2F_Player_GetTracks(self, payload):
+        if self.root_path is None:
+            return _error("root path is not set")
+        return _ok(self.root_path_tracks())
+
+    def _route_A2F_Player_SetTrack(self, payload):
+        file_name = payload.get("file_name", "")
+        if self.root_path is None or not os.path.isfile(os.path.join(self.root_path, file_name)):
+            return _error(f"track {file_name} not found in {self.root_path}")
+        self.track = file_name
+        self.frame = 0
+        return _ok()
+
+    def _route_A2F_Player_GetCurrentTrack(self, payload):
+        return _ok(self.track)
+
+    def _route_A2F_Player_GetRange(self, payload):
+        if self.track is None:
+            return _error("no track set")
+        duration = self.track_duration()
+        return _ok({"default": [0.0, duration], "work": [0.0, duration]})
+
+    def _route_A2F_Player_SetFrame(self, payload):
+        self.frame = payload.get("frame", 0)
+        return _ok()
+
+    def _route_A2F_A2E_SetSettings(self, payload):
+        self.a2e_settings.update(payload)
+        return _ok()
+
+    def _route_A2F_A2E_SetEmotion(self, payload):
+        self.emotion = list(payload.get("emotion", self.emotion))
+        return _ok()
+
+    def _route_A2F_A2E_GenerateKeys(self, payload):
+        if self.track is None:
+            return _error("no track set")
+        return _ok(message="Keys generated")
+
+    def _route_A2F_A2E_GetEmotionNames(self, payload):
+        return _ok(EMOTION_NAMES)
+
+    def _route_A2F_A2E_GetEmotion(self, payload):
+        frame = payload.get("frame", self.frame)
+        return _ok([round(0.5 + 0.5 * math.sin(0.05 * frame + i), 4) for i in range(len(EMOTION_NAMES))])
+
+    def _route_A2F_A2E_EnableAutoGenerateOnTrackChange(self, payload):
+        return _ok()
+
+    def _route_A2F_Exporter_ExportBlendshapes(self, payload):
+        export_dir = payload.get("export_directory", "")
+        fmt = payload.get("format", "usd")
+        file_name = payload.get("file_name", "output")
+        if not os.path.isdir(export_dir):
+            return _error(f"export directory {export_dir} doesn't exist")
+
+        if payload.get("batch", False):
+            if self.root_path is None:
+                return _error("root path is not set")
+            # one file per track of the root path. The solver time of the single exports adds up.
+            tracks = self.root_path_tracks()
+            time.sleep(self.processing_factor * sum(self.track_duration(t) for t in tracks))
+        elif self.track is None and self.live_seconds <= 0:
+            return _error("no track set")
+        else:
+            tracks = [None]
+
+        files = []
+        for track in tracks:
+            name = file_name if track is None else f"{file_name}_{os.path.splitext(track)[0]}"
+            # like A2F the exporter appends _bsweight and the format to the file name
+            file_path = utils.get_export_file_path(os.path.join(export_dir, name), fmt)
+            if track is None and self.track is None:
+                # the animation of the streamed audio so far
+                duration, track_path = self.live_seconds, ""
+            else:
+                duration, track_path = self.track_duration(track), os.path.join(self.root_path, track or self.track)
+            write_blendshape_export(file_path, fps=payload.get("fps", 60), duration=duration, track_path=track_path)
+            files.append(file_path)
+        return _ok(files if payload.get("batch", False) else files[0])
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive like the real server
+    disable_nagle_algorithm = True  # headers and body are written separately. Avoids 40ms delayed-ack stalls.
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self, method: str):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = {}
+
+        code, result = self.server.fake.handle(method, self.path.strip("/"), payload)
+        data = json.dumps(result).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+if streaming_installed:
+    class _StreamingServicer(audio2face_pb2_grpc.Audio2FaceServicer):
+        """ Accepts pushed audio like the streaming player and records what was received """
+        def __init__(self, fake: FakeAudio2FaceServer):
+            self.fake = fake
+
+        def _finish(self, stream: dict, block: bool):
+            stream["finished"] = time.perf_counter()
+            with self.fake.lock:
+                self.fake.streams.append(stream)
+            duration = stream["samples"] / stream["samplerate"] if stream["samplerate"] else 0.0
+            if block and self.fake.playback_factor > 0:
+                time.sleep(self.fake.playback_factor * duration)
+
+        def PushAudio(self, request, context):
+            stream = {
+                "rpc": "PushAudio", "instance_name": request.instance_name, "samplerate": request.samplerate,
+                "chunks": 1, "bytes": len(request.audio_data), "samples": len(request.audio_data) // 4,
+                "sha256": hashlib.sha256(request.audio_data).hexdigest(), "started": time.perf_counter()
+            }
+            self._finish(stream, request.block_until_playback_is_finished)
+            return audio2face_pb2.PushAudioResponse(success=True, message="")
+
+        def PushAudioStream(self, request_iterator, context):
+            first = next(request_iterator, None)
+            if first is None or not first.HasField("start_marker"):
+                return audio2face_pb2.PushAudioStreamResponse(success=False, message="start marker expected")
+
+            start = first.start_marker
+            stream = {
+                "rpc": "PushAudioStream", "instance_name": start.instance_name, "samplerate": start.samplerate,
+                "chunks": 0, "bytes": 0, "samples": 0, "started": time.perf_counter()
+            }
+            self.fake.live_seconds = 0.0
+            digest = hashlib.sha256()
+            for request in request_iterator:
+                stream["chunks"] += 1
+                stream["bytes"] += len(request.audio_data)
+                digest.update(request.audio_data)
+                if start.samplerate:
+                    self.fake.live_seconds = stream["bytes"] / 4 / start.samplerate
+            stream["samples"] = stream["bytes"] // 4
+            stream["sha256"] = digest.hexdigest()  # of the received audio, to compare it with other pushes
+
+            self._finish(stream, start.block_until_playback_is_finished)
+            return audio2face_pb2.PushAudioStreamResponse(success=True, message="")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Audio2Face headless server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--grpc-port", type=int, default=DEFAULT_AUDIO_STREAM_GRPC_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--processing-factor", type=float, default=0.0,
+                        help="seconds of processing per second of audio for GenerateKeys and ExportBlendshapes")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--playback-factor", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeAudio2FaceServer(
+        host=args.host, port=args.port, grpc_port=args.grpc_port, latency=args.latency,
+        processing_factor=args.processing_factor, failure_rate=args.failure_rate,
+        playback_factor=args.playback_factor
+    ).start()
+    print(f"fake audio2face server running on {server.api_url}, gRPC port {server.grpc_port}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import collections
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from py_audio2face import utils
+
+
+class AnimationCache:
+    """
+    Content addressed on-disk cache of exported animations.
+    The key is a hash of the audio content and everything else that changes the result (fps, format, a2e settings,
+    emotion vector, scene). Identical audio is animated once, no matter under which file name it is rendered again.
+    The cache is bounded by max_bytes. If it grows larger, the least recently used animations are evicted.
+    """
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3, flush_every: int = 100):
+        """
+        :param cache_dir: Directory of the cache. Created if missing. Can be shared between runs.
+        :param max_bytes: Upper bound of the summed size of the cached animation files.
+        :param flush_every: The index is kept in memory and written after this many changes and on close().
+            Files of entries which were lost by a crash before the flush are picked up again on the next start.
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._audio_hashes = {}  # (path, mtime, size) -> sha256 to not re-hash unchanged files
+        self._changes = 0  # changes of the index since the last flush
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = self._load_index()  # least recently used first
+        self._bytes = sum(e["size"] for e in self._index.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _load_index(self) -> collections.OrderedDict:
+        try:
+            with open(os.path.join(self.cache_dir, self.INDEX_FILE)) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+        entries = {}
+        with os.scandir(self.cache_dir) as files:
+            for file in files:
+                key = os.path.splitext(file.name)[0]
+                if not file.is_file() or file.name.startswith(self.INDEX_FILE):
+                    continue
+                if key in index and index[key]["file"] == file.name:
+                    entries[key] = index[key]
+                else:
+                    # stored after the last flush of the index
+                    stat = file.stat()
+                    entries[key] = {"file": file.name, "size": stat.st_size, "last_access": stat.st_mtime}
+        # entries whose file was deleted by hand are dropped because only existing files are listed
+        return collections.OrderedDict(sorted(entries.items(), key=lambda item: item[1]["last_access"]))
+
+    def _save_index(self):
+        tmp_file = os.path.join(self.cache_dir, self.INDEX_FILE + ".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_file, os.path.join(self.cache_dir, self.INDEX_FILE))
+        self._changes = 0
+
+    def _changed(self):
+        self._changes += 1
+        if self._changes >= self.flush_every:
+            self._save_index()
+
+    def flush(self):
+        """ writes the index if it changed since the last flush """
+        with self._lock:
+            if self._changes:
+                self._save_index()
+
+    def close(self):
+        """ writes the index. The cache can still be used afterwards. """
+        self.flush()
+
+    def hash_audio(self, audio_file_path: str) -> str:
+        stat = os.stat(audio_file_path)
+        file_id = (os.path.abspath(audio_file_path), stat.st_mtime_ns, stat.st_size)
+        if file_id not in self._audio_hashes:
+            self._audio_hashes[file_id] = utils.hash_file(audio_file_path)
+        return self._audio_hashes[file_id]
+
+    def make_key(self, audio_file_path: str, render_settings: dict) -> str:
+        """
+        :param audio_file_path: The animated audio. Only its content matters, not its name.
+        :param render_settings: Everything else that changes the result. See Audio2Face.get_render_settings.
+        """
+        sha = hashlib.sha256(self.hash_audio(audio_file_path).encode())
+        sha.update(json.dumps(render_settings, sort_keys=True).encode())
+        return sha.hexdigest()
+
+    def get(self, key: str, target_file: str) -> bool:
+        """ Copies the cached animation to target_file. Returns False on a cache miss. """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return False
+
+            if os.path.dirname(target_file):
+                os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            shutil.copyfile(os.path.join(self.cache_dir, entry["file"]), target_file)
+            entry["last_access"] = time.time()
+            self._index.move_to_end(key)
+            self.hits += 1
+            self._changed()
+            return True
+
+    def put(self, key: str, source_file: str):
+        """ Stores the exported animation file under key and evicts old entries if the cache is too large """
+        if not os.path.isfile(source_file):
+            return
+
+        file_name = f"{key}{os.path.splitext(source_file)[1]}"
+        with self._lock:
+            shutil.copyfile(source_file, os.path.join(self.cache_dir, file_name))
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old["size"]
+            self._index[key] = {
+                "file": file_name,
+                "size": os.path.getsize(source_file),
+                "last_access": time.time()
+            }
+            self._bytes += self._index[key]["size"]
+            self._evict()
+            self._changed()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._index:
+            key, entry = self._index.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except OSError:
+                pass
+            self._bytes -= entry["size"]
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for entry in self._index.values():
+                try:
+                    os.remove(os.path.join(self.cache_dir, entry["file"]))
+                except OSError:
+                    pass
+            self._index = collections.OrderedDict()
+            self._bytes = 0
+            self._save_index()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._bytes,
+            }
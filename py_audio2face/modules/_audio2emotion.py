@@ -1,7 +1,16 @@
 from __future__ import annotations  # avoid circular import with import py_audio2face 
 import py_audio2face.audio2face as a2f
 
+from concurrent.futures import ThreadPoolExecutor
+
 from py_audio2face.settings import DEFAULT_A2E_INSTANCE
+from py_audio2face.modules._state import unchanged_response
+from py_audio2face import utils
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Default generate settings
 """
@@ -82,7 +91,16 @@ class _A2F_Audio2Emotion:
         add_to_dict("a2e_preferred_emotion_strength", a2e_preferred_emotion_strength)
 
         self.a2e_settings.update(settings)
-        return self.post("A2F/A2E/SetSettings", payload=settings)
+
+        # only send what the server doesn't have yet
+        settings = self.server_state.changed_a2e_settings(settings)
+        if not settings:
+            return unchanged_response()
+
+        response = self.post("A2F/A2E/SetSettings", payload=settings)
+        if utils.is_ok_response(response):
+            self.server_state.a2e_settings.update(settings)
+        return response
 
     def a2e_set_settings_from_dict(self: a2f.Audio2Face, settings: dict):
         """
@@ -152,19 +170,35 @@ class _A2F_Audio2Emotion:
         if update_settings:
             self.a2e_set_settings(preferred_emotion=list(emotion_strength.values()))
 
+        emotion = list(emotion_strength.values())
+        self.emotion = emotion
+        if self.server_state.emotion == emotion:
+            return unchanged_response()
+
         payload = {
             "a2f_instance": DEFAULT_A2E_INSTANCE,
-            "emotion": list(emotion_strength.values())
+            "emotion": emotion
         }
         response = self.post("A2F/A2E/SetEmotion", payload=payload)
+        if utils.is_ok_response(response):
+            self.server_state.emotion = emotion
         return response
 
-    def generate_emotion_keys(self: a2f.Audio2Face):
+    def generate_emotion_keys(self: a2f.Audio2Face, force: bool = False):
         """
         Detects emotions in the audio and generates the keyframes.
         To change the default settings, use the a2e_set_settings method.
+        The keys stay on the server until another track is loaded. Exporting the same track again (e.g. in another
+        fps or format) with unchanged a2e settings reuses them instead of running the emotion inference again.
+        :param force: Generate the keys even if the server already has them.
         """
+        keys_id = self.server_state.emotion_keys_id(self.a2e_settings)
+        if not force and keys_id is not None and self.server_state.emotion_keys == keys_id:
+            return unchanged_response()
+
         resp = self.post("A2F/A2E/GenerateKeys", payload=self.a2e_settings)
+        if utils.is_ok_response(resp):
+            self.server_state.emotion_keys = keys_id
         return resp
 
     def get_emotion_names(self: a2f.Audio2Face):
@@ -194,3 +228,71 @@ class _A2F_Audio2Emotion:
         }
 
         return self.post("A2F/A2E/GetEmotion", payload=payload)
+
+    def get_emotion_timeline(
+            self: a2f.Audio2Face,
+            start: int = 0,
+            end: int = None,
+            step: int = 1,
+            fps: int = 60,
+            keyframes: bool = False,
+            max_workers: int = None
+    ) -> tuple:
+        """
+        Fetches the emotion curve of the current track. The frames are requested concurrently over the pooled
+        connections instead of one GetEmotion round trip after the other.
+        :param start: First frame.
+        :param end: End frame (exclusive). If None the duration of the current track at fps is used.
+        :param step: Fetch every step-th frame.
+        :param fps: Frame rate of the timeline. Used for end=None and keyframes.
+        :param keyframes: Sample at the a2e keyframe interval (a2e_stride seconds) only. The emotions between the
+            keyframes are interpolated by A2F, so this is the whole information at a fraction of the requests.
+        :param max_workers: Concurrent requests. Defaults to the connection pool size of the transport.
+        :return: (emotions, names) with emotions a float32 array of shape (frames, emotions). Row i is frame
+            start + i * step. Frames which couldn't be fetched are NaN.
+        """
+        if np is None:
+            raise ImportError("get_emotion_timeline needs numpy. Install it via 'pip install numpy'")
+
+        if end is None:
+            track = self.server_state.track
+            if track is None:
+                raise ValueError("end is required if no track was set by this client")
+            end = int(self._get_track_duration(track[0]) * fps) + 1
+        if keyframes:
+            step = max(1, round(self.a2e_settings.get("a2e_stride", 1) * fps))
+        frames = list(range(start, end, step))
+
+        names = self.get_emotion_names()
+        names = names.get("result") if utils.is_ok_response(names) else None
+        with ThreadPoolExecutor(max_workers=max_workers or self.transport.pool_size) as executor:
+            responses = list(executor.map(self.get_emotion, frames))
+
+        return _emotion_matrix(responses, names), names
+
+    def _get_track_duration(self: a2f.Audio2Face, track_path: str) -> float:
+        """ duration of the current track in seconds. Asks the player, which also decodes mp3 """
+        response = self.get_range()
+        if utils.is_ok_response(response):
+            time_range = response["result"].get("default") or response["result"].get("work")
+            if time_range:
+                return time_range[1]
+        if track_path.lower().endswith(".wav"):
+            return utils.get_wav_duration(track_path)
+        raise ValueError(f"The server didn't report the range of {track_path}. Pass end explicitly.")
+
+
+def _emotion_matrix(responses: list, names: list = None) -> np.ndarray:
+    """ stacks the GetEmotion vectors of the responses. Failed responses become NaN rows. """
+    vectors = [r.get("result") if utils.is_ok_response(r) else None for r in responses]
+    width = len(names) if names else next((len(v) for v in vectors if v), 10)
+    emotions = np.full((len(vectors), width), np.nan, dtype=np.float32)
+    failed = 0
+    for i, vector in enumerate(vectors):
+        if vector is None or len(vector) != width:
+            failed += 1
+        else:
+            emotions[i] = vector
+    if failed:
+        print(f"Could not fetch the emotions of {failed} of {len(vectors)} frames")
+    return emotions
@@ -1,8 +1,12 @@
 from __future__ import annotations  # avoid circular import with import py_audio2face
 import py_audio2face.audio2face as a2f
 
+import collections
 import os
 from py_audio2face.settings import DEFAULT_SOLVER_INSTANCE, DEFAULT_OUTPUT_DIR
+from py_audio2face import utils
+
+_BATCH_PREFIX = "a2f_batch"
 
 
 class _A2FExport:
@@ -11,7 +15,8 @@ class _A2FExport:
             output_path: str,
             fps: int = 60,
             format: str = "usd",
-            emotion_auto_detect: bool = False
+            emotion_auto_detect: bool = False,
+            postprocess=None
     ):
         """
         Export the blend shapes to a file.
@@ -20,6 +25,7 @@ class _A2FExport:
         :param format: Output format of the animation file.
         :param emotion_auto_detect: Whether to generate emotion_auto_detect keys from the audio.
             If a dictionary is provided, it will be used as the emotion_auto_detect settings.
+        :param postprocess: Optional AnimationPipeline which is applied to the exported file in place.
         """
 
         if output_path is None:
@@ -38,19 +44,101 @@ class _A2FExport:
             self.generate_emotion_keys()
 
         response = self.export_blend_shape(output_path=output_path, fps=fps, format=format)
-        if 'status' not in response or response['status'] == 'ERROR':
-            print(f"BlendShape Export failed: {response['message']}")
+        self.last_export_response = response
+        if not utils.is_ok_response(response):
+            message = response.get('message') if isinstance(response, dict) else response
+            print(f"BlendShape Export failed: {message}")
+        elif postprocess is not None:
+            postprocess.process_file(utils.get_export_file_path(output_path, format))
 
         return output_path
 
-    def export_blend_shape(self: a2f.Audio2Face, output_path: str, fps: int = 60, format: str = "usd"):
+    def export_blend_shape(
+            self: a2f.Audio2Face,
+            output_path: str,
+            fps: int = 60,
+            format: str = "usd",
+            batch: bool = False
+    ):
+        """
+        :param batch: Export all tracks of the player's root path in one call instead of the current track only.
+            output_path is then the export directory + file name prefix. See export_batch.
+        """
         payload = {
             "solver_node": DEFAULT_SOLVER_INSTANCE,
             "export_directory": os.path.dirname(output_path),
             "file_name": os.path.basename(output_path),
             "format": format,
-            "batch": False,
+            "batch": batch,
             "fps": fps
         }
 
         return self.post("A2F/Exporter/ExportBlendshapes", payload=payload)
+
+    def export_batch(
+            self: a2f.Audio2Face,
+            audio_files: list,
+            output_dir: str,
+            fps: int = 60,
+            format: str = "usd",
+            emotion_auto_detect: bool = False
+    ) -> dict:
+        """
+        Exports all tracks of the player's root path with a single request and maps the written files back to
+        the audio files. Saves one round trip and solver setup per file compared to set_track + export.
+        :param audio_files: The audio files of the root path the caller is interested in.
+        :param output_dir: Directory the server writes the animations to.
+        :param emotion_auto_detect: Let the server generate emotion keys for every track.
+        :return: {audio_file: exported animation file} for the audio files which could be mapped. Empty on failure.
+        """
+        output_dir = os.path.abspath(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        before = _list_files(output_dir, format)
+
+        if emotion_auto_detect:
+            self.set_enable_auto_generate_on_track_change(True)
+
+        response = self.export_blend_shape(
+            output_path=os.path.join(output_dir, _BATCH_PREFIX), fps=fps, format=format, batch=True
+        )
+        if emotion_auto_detect:
+            self.set_enable_auto_generate_on_track_change(False)
+        # the batch export walks through all tracks of the player
+        self.server_state.set_track(None)
+
+        if not utils.is_ok_response(response):
+            message = response.get('message') if isinstance(response, dict) else response
+            print(f"Batch export failed: {message}")
+            return {}
+
+        result = response.get("result")
+        if isinstance(result, list):
+            written = {os.path.basename(f) for f in result}
+        else:
+            written = {f for f, mtime in _list_files(output_dir, format).items() if before.get(f) != mtime}
+
+        # the server names the export of a track {file_name}_{track stem}_bsweight.{format}
+        names = {af: _batch_export_name(af, format) for af in audio_files}
+        counts = collections.Counter(names.values())
+        exported = {}
+        for af, name in names.items():
+            if counts[name] > 1:
+                # e.g. line.wav and line.mp3. The export can't be told apart, leave them to the single exports.
+                print(f"{af} shares its batch export name {name} with another file. Skipping it in the batch.")
+                continue
+            if name in written and os.path.isfile(os.path.join(output_dir, name)):
+                exported[af] = os.path.join(output_dir, name)
+
+        return exported
+
+
+def _batch_export_name(audio_file: str, format: str) -> str:
+    """ the file name the batch export writes for an audio file of the root path """
+    stem = os.path.splitext(os.path.basename(audio_file))[0]
+    return os.path.basename(utils.get_export_file_path(f"{_BATCH_PREFIX}_{stem}", format))
+
+
+def _list_files(directory: str, format: str) -> dict:
+    """ {file name: mtime_ns} of the files with the format's extension """
+    with os.scandir(directory) as entries:
+        return {e.name: e.stat().st_mtime_ns for e in entries if e.is_file() and e.name.endswith(f".{format}")}
@@ -1,6 +1,7 @@
 from __future__ import annotations  # avoid circular import with import py_audio2face
 import py_audio2face.audio2face as a2f
 from py_audio2face.settings import DEFAULT_A2E_INSTANCE
+from py_audio2face import utils
 
 
 class _A2FGeneral:
@@ -8,12 +9,17 @@ class _A2FGeneral:
         return self.make_request("A2F/GetInstances")
 
     def load_scene(self: a2f.Audio2Face, usd_file_path: str = ""):
-        # check if the scene is already loaded
-        scene = self.get_scene()
-        print("Check scene if loaded")
-        if usd_file_path in scene:
+        if self.server_state.scene == usd_file_path:
             return
 
+        # the mirror doesn't know the scene yet. Check if the scene was loaded before this client started.
+        if self.server_state.scene is None:
+            scene = self.get_scene()
+            print("Check scene if loaded")
+            if usd_file_path in scene:
+                self.server_state.set_scene(usd_file_path)
+                return
+
         # load scene from file
         print(f"load scene {usd_file_path}")
         payload = {
@@ -21,9 +27,17 @@ class _A2FGeneral:
         }
 
         resp = self.post("A2F/USD/Load", payload)
-        self.loaded_scene = usd_file_path
+        if utils.is_ok_response(resp):
+            self.server_state.set_scene(usd_file_path)
         return resp
 
+    def invalidate_state(self: a2f.Audio2Face):
+        """
+        Forget the mirrored server state (scene, root path, track, a2e settings, emotion).
+        Call it after the headless server was restarted or modified by another client. The next calls resend everything.
+        """
+        self.server_state.invalidate()
+
     def set_frame(self: a2f.Audio2Face, frame: int, as_timestamp: bool = False, a2f_instance: str = None):
         # get the default instance if not provided. Other instance needed for streaming.
         a2f_instance = a2f_instance or DEFAULT_A2E_INSTANCE
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+from py_audio2face import utils
+
+
+class FolderManifest:
+    """
+    Records which clips of a folder run were exported with which settings, so the next run only processes what
+    changed and a crashed run resumes where it stopped.
+    The manifest is an append-only json lines file in the output folder. Every finished clip appends one line
+    immediately, the last line of an input wins. It is compacted on load when it contains many outdated lines.
+    """
+    FILE_NAME = ".a2f_manifest.jsonl"
+
+    def __init__(self, output_folder: str):
+        self.file_path = os.path.join(os.path.abspath(output_folder), self.FILE_NAME)
+        self.entries = {}  # input path -> entry
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.file_path):
+            return
+
+        n_lines = 0
+        with open(self.file_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut off by a crash
+                self.entries[entry["input"]] = entry
+                n_lines += 1
+
+        if n_lines > 2 * len(self.entries):
+            self._compact()
+
+    def _compact(self):
+        tmp_file = self.file_path + ".tmp"
+        with open(tmp_file, "w") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_file, self.file_path)
+
+    @staticmethod
+    def settings_hash(render_settings: dict) -> str:
+        return hashlib.sha256(json.dumps(render_settings, sort_keys=True).encode()).hexdigest()
+
+    def is_up_to_date(self, audio_file_path: str, settings_hash: str, export_file: str) -> bool:
+        """
+        True if the clip was exported with the same settings, the export still exists and the input didn't change.
+        Inputs with a new mtime but identical content are still up to date (e.g. after a copy or checkout).
+        """
+        entry = self.entries.get(os.path.abspath(audio_file_path))
+        if entry is None or entry["settings"] != settings_hash or not os.path.isfile(export_file):
+            return False
+
+        stat = os.stat(audio_file_path)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+
+        if utils.hash_file(audio_file_path) != entry["sha256"]:
+            return False
+        # remember the new mtime to not hash again next time
+        self.record(audio_file_path, settings_hash, entry["output"], sha256=entry["sha256"])
+        return True
+
+    def record(self, audio_file_path: str, settings_hash: str, output_path: str, sha256: str = None):
+        """ Marks a clip as exported. Written to disk immediately so a crash doesn't lose it. """
+        audio_file_path = os.path.abspath(audio_file_path)
+        stat = os.stat(audio_file_path)
+        entry = {
+            "input": audio_file_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256 or utils.hash_file(audio_file_path),
+            "settings": settings_hash,
+            "output": output_path
+        }
+        self.entries[audio_file_path] = entry
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
@@ -3,6 +3,7 @@ import py_audio2face.audio2face as a2f
 
 import os
 from py_audio2face.settings import DEFAULT_PLAYER_INSTANCE
+from py_audio2face import utils
 
 
 
@@ -17,22 +18,42 @@ class _A2FPlayer:
         if not os.path.isabs(sounds_folder):
             sounds_folder = os.path.join(os.getcwd(), sounds_folder)
 
+        if self.server_state.root_path == sounds_folder:
+            return
+
         payload = {
             "a2f_player": DEFAULT_PLAYER_INSTANCE,
             "dir_path": sounds_folder
         }
 
-        self.post("A2F/Player/SetRootPath", payload=payload)
+        response = self.post("A2F/Player/SetRootPath", payload=payload)
+        if utils.is_ok_response(response):
+            self.server_state.set_root_path(sounds_folder)
 
     def set_track(self: a2f.Audio2Face, input_sound_path: str):
         if not os.path.isfile(input_sound_path):
             raise FileNotFoundError(f"File {input_sound_path} doesn't exist")
 
+        track = self.server_state.track_key(input_sound_path)
+        if self.server_state.track == track:
+            return
+
         payload = {
             "a2f_player": DEFAULT_PLAYER_INSTANCE,
             "file_name": os.path.basename(input_sound_path),
             "time_range": [0, -1]
         }
 
-        self.post("A2F/Player/SetTrack", payload=payload)
+        response = self.post("A2F/Player/SetTrack", payload=payload)
+        if utils.is_ok_response(response):
+            self.server_state.set_track(track)
 
+    def get_range(self: a2f.Audio2Face):
+        """
+        The time range of the current track in seconds, as decoded by the server. Works for every format the player
+        reads, e.g. mp3. Response result: {"default": [start, end], "work": [start, end]}
+        """
+        payload = {
+            "a2f_player": DEFAULT_PLAYER_INSTANCE
+        }
+        return self.post("A2F/Player/GetRange", payload=payload)
@@ -0,0 +1,63 @@
+import json
+import os
+
+
+class A2FServerState:
+    """
+    Client side mirror of the state of the headless server: loaded scene, player root path and track,
+    audio2emotion settings, the global emotion vector and which emotion keys were generated.
+    Values are only recorded after the server confirmed the change, so a request can be skipped whenever the
+    mirror already holds the requested value. None / empty means unknown, which always sends the request.
+    Call invalidate() (Audio2Face.invalidate_state) when the server was restarted or changed by someone else.
+    """
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        self.scene = None
+        self.invalidate_scene_content()
+
+    def invalidate_scene_content(self):
+        """ Everything that belongs to a loaded scene. Reset when a (new) scene is loaded. """
+        self.root_path = None
+        self.track = None
+        self.a2e_settings = {}
+        self.emotion = None
+        self.emotion_keys = None  # emotion_keys_id of the keys generated for the current track
+
+    def set_scene(self, usd_file_path: str):
+        self.scene = usd_file_path
+        self.invalidate_scene_content()
+
+    def set_root_path(self, root_path: str):
+        self.root_path = root_path
+        self.set_track(None)
+
+    def set_track(self, track):
+        """ the emotion keys belong to the track. A2F discards them when another track is loaded. """
+        self.track = track
+        self.emotion_keys = None
+
+    def emotion_keys_id(self, a2e_settings: dict):
+        """
+        identifies generated emotion keys by the audio (the track key) and the a2e settings they were generated with.
+        None if the track is unknown.
+        """
+        if self.track is None:
+            return None
+        return self.track, json.dumps(a2e_settings, sort_keys=True)
+
+    @staticmethod
+    def track_key(file_path: str) -> tuple:
+        """ identifies a track by path and file version, so a rewritten file with the same name is sent again """
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+    def changed_a2e_settings(self, settings: dict) -> dict:
+        """ returns the subset of settings which differ from the ones known on the server """
+        return {k: v for k, v in settings.items() if k not in self.a2e_settings or self.a2e_settings[k] != v}
+
+
+def unchanged_response() -> dict:
+    """ returned instead of a server response if a request was skipped because nothing would change """
+    return {"status": "OK", "result": None, "message": "Skipped. The server state is already up to date."}
@@ -0,0 +1,511 @@
+# Processing stages of the audio stream between the producer (tts, microphone, file) and the gRPC request.
+# Each stage takes chunks and yields chunks, so they can be chained in front of the PushAudioStreamRequests.
+
+import collections
+import threading
+import time
+from typing import Iterator, Union
+
+import numpy as np
+
+from py_audio2face.settings import DEFAULT_GRPC_MAX_AUDIO_BYTES
+
+FLOAT32_BYTES = 4
+
+# factor to scale integer pcm to [-1, 1]
+PCM_SCALES = {
+    np.dtype(np.int16): 1 / 32768,
+    np.dtype(np.int32): 1 / 2147483648,
+    np.dtype(np.float32): 1.0,
+    np.dtype(np.float64): 1.0,
+}
+
+
+class AudioNormalizer:
+    """
+    Converts the chunks of a producer (tts engine, microphone, ..) to the mono float32 audio A2F expects.
+    int16/int32/float32/float64 pcm as arrays or raw bytes is scaled to [-1, 1], interleaved channels are downmixed
+    to mono, gain is applied and the result is clipped. Optionally the audio is resampled to target_samplerate with
+    linear interpolation which continues seamlessly over the chunk boundaries.
+    All steps are vectorized per chunk and work in buffers which are reused between the chunks, so the returned
+    array is only valid until the next call.
+    """
+    def __init__(
+            self,
+            samplerate: int,
+            target_samplerate: int = None,
+            dtype: str = "float32",
+            channels: int = 1,
+            gain: float = 1.0,
+            limit: bool = True
+    ):
+        """
+        :param samplerate: Sampling rate of the incoming audio.
+        :param target_samplerate: Sampling rate of the outgoing audio. None keeps the rate.
+        :param dtype: Sample type of incoming bytes e.g. "int16" for 16-bit pcm. Arrays bring their own dtype.
+        :param channels: Number of interleaved channels of the incoming audio. 2-d arrays bring their own.
+        :param gain: Factor the samples are multiplied with.
+        :param limit: Clip the samples to [-1, 1] after the gain.
+        """
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in PCM_SCALES:
+            raise ValueError(f"Unsupported sample type {dtype}. Use one of {[str(d) for d in PCM_SCALES]}")
+
+        self.samplerate = samplerate
+        self.target_samplerate = target_samplerate or samplerate
+        self.channels = channels
+        self.gain = gain
+        self.limit = limit
+
+        self._pending = b""  # trailing bytes of an incomplete sample frame
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._resampled = np.empty(0, dtype=np.float32)
+        # resampler state: last input sample and position of the next output sample relative to it
+        self._step = self.samplerate / self.target_samplerate
+        self._last = None
+        self._position = 1.0
+
+    def reset(self):
+        """
+        Forgets the state of the previous stream: an incomplete trailing sample frame and the resampler position.
+        Called by stream_audio and push_audio before every stream, so one normalizer can be reused for many.
+        """
+        if self._pending:
+            print(f"AudioNormalizer: dropping {len(self._pending)} bytes of an incomplete sample frame")
+        self._pending = b""
+        self._last = None
+        self._position = 1.0
+
+    def _as_array(self, chunk: Union[np.ndarray, bytes]) -> np.ndarray:
+        if isinstance(chunk, np.ndarray):
+            if chunk.dtype not in PCM_SCALES:
+                raise ValueError(f"Unsupported sample type {chunk.dtype}")
+            if chunk.ndim == 1 and self.channels > 1:
+                chunk = chunk[:len(chunk) - len(chunk) % self.channels].reshape(-1, self.channels)
+            return chunk
+
+        frame_bytes = self.dtype.itemsize * self.channels
+        if self._pending:
+            chunk = self._pending + chunk
+        usable = len(chunk) - len(chunk) % frame_bytes
+        self._pending = chunk[usable:]
+        audio = np.frombuffer(chunk, dtype=self.dtype, count=usable // self.dtype.itemsize)
+        return audio.reshape(-1, self.channels) if self.channels > 1 else audio
+
+    def _get_buffer(self, name: str, n: int) -> np.ndarray:
+        """ returns the first n samples of the named buffer. The buffer grows but is never shrunk. """
+        buffer = getattr(self, name)
+        if len(buffer) < n:
+            buffer = np.empty(max(n, 2 * len(buffer)), dtype=np.float32)
+            setattr(self, name, buffer)
+        return buffer[:n]
+
+    def process(self, chunk: Union[np.ndarray, bytes]) -> np.ndarray:
+        """ Returns the normalized float32 mono samples of the chunk """
+        audio = self._as_array(chunk)
+        factor = PCM_SCALES[audio.dtype] * self.gain
+
+        if audio.ndim == 2:
+            out = self._get_buffer("_buffer", len(audio))
+            np.mean(audio, axis=1, dtype=np.float32, out=out)
+            if factor != 1.0:
+                out *= factor
+        elif audio.dtype == np.float32 and factor == 1.0 and not (self.limit and np.any(np.abs(audio) > 1)):
+            out = audio  # nothing to do, don't copy
+        else:
+            out = self._get_buffer("_buffer", len(audio))
+            np.multiply(audio, factor, out=out, casting="unsafe")
+
+        if self.limit and out is not audio:
+            np.clip(out, -1.0, 1.0, out=out)
+
+        if self.target_samplerate != self.samplerate:
+            out = self._resample(out)
+        return out
+
+    def _resample(self, audio: np.ndarray) -> np.ndarray:
+        if len(audio) == 0:
+            return audio
+        if self._last is None:
+            # the first output sample is the first input sample
+            self._last = audio[0]
+            self._position = 1.0
+
+        # index 0 is the last sample of the previous chunk, the chunk follows at 1..n
+        n = len(audio)
+        positions = self._position + self._step * np.arange(int(np.ceil((n - self._position) / self._step)))
+        out = self._get_buffer("_resampled", len(positions))
+
+        left = positions.astype(np.int64)
+        frac = (positions - left).astype(np.float32)
+        right = np.minimum(left + 1, n)
+        extended_left = np.where(left == 0, self._last, audio[np.maximum(left - 1, 0)])
+        extended_right = audio[right - 1]
+        np.multiply(extended_right - extended_left, frac, out=out)
+        out += extended_left
+
+        self._position = (positions[-1] + self._step - n) if len(positions) else self._position - n
+        self._last = audio[-1]
+        return out
+
+    def stream(self, audio_stream) -> Iterator[np.ndarray]:
+        """ Normalizes a whole stream of chunks """
+        for chunk in audio_stream:
+            audio = self.process(chunk)
+            if len(audio) > 0:
+                yield audio
+
+
+class VoiceActivityGate:
+    """
+    Energy based voice activity gate for mono float32 audio.
+    The audio is analysed in frames of frame_ms. Frames with an rms above threshold_db are voiced.
+    After voice, hangover_ms of silence is still sent so word endings aren't cut. Longer pauses are shortened to
+    max_pause_ms: the frames of the pause are held back and only the last ones are sent once voice resumes.
+    With trim, the silence before the first and after the last voice is dropped completely, except for preroll_ms
+    right before the first voice.
+    Silence costs bandwidth and inference time on the server and exact digital silence can make A2F produce NaNs.
+    The levels of all frames of a chunk are computed at once. The hangover and pause decisions are a python loop over
+    the frames, 100 iterations per second of audio at the default 10 ms, a few ms per minute of audio. For the small
+    chunks of a stream that is faster than vectorizing the state with cumulative numpy operations, whose fixed cost
+    per chunk outweighs the few frames a chunk contains.
+    """
+    def __init__(
+            self,
+            samplerate: int,
+            threshold_db: float = -45.0,
+            frame_ms: float = 10.0,
+            hangover_ms: float = 200.0,
+            max_pause_ms: float = 400.0,
+            trim: bool = True,
+            preroll_ms: float = 0.0
+    ):
+        """
+        :param samplerate: Sampling rate of the audio. Must match the rate of the sent audio, i.e. the
+            target_samplerate of a normalizer in front of the gate.
+        :param threshold_db: Frames with an rms level above this (dBFS) are voiced.
+        :param frame_ms: Length of the analysed frames.
+        :param hangover_ms: Silence which is kept after voice.
+        :param max_pause_ms: Pauses between voice are shortened to this length. Must be >= hangover_ms.
+        :param trim: Drop leading and trailing silence.
+        :param preroll_ms: With trim, silence which is kept before the first voice, so soft onsets aren't cut.
+        """
+        self.samplerate = samplerate
+        self.frame_size = max(1, int(samplerate * frame_ms / 1000))
+        self.hangover_frames = int(round(hangover_ms / frame_ms))
+        pause_frames = max(int(round(max_pause_ms / frame_ms)), self.hangover_frames)
+        self.threshold = (10 ** (threshold_db / 20)) ** 2  # compared with the mean square, saves the sqrt
+        self.trim = trim
+
+        self._remainder = np.empty(0, dtype=np.float32)  # incomplete frame of the last chunk
+        self._held = collections.deque(maxlen=pause_frames - self.hangover_frames)
+        self._preroll = collections.deque(maxlen=int(round(preroll_ms / frame_ms)))  # trimmed silence before voice
+        self._in_voice = False  # voice was seen and no pause is held
+        self._silent_frames = 0
+        self.input_samples = 0
+        self.output_samples = 0
+        self.voiced_frames = 0
+        self.frames = 0
+
+    def process(self, chunk: Union[np.ndarray, bytes]) -> np.ndarray:
+        """ Returns the part of the float32 chunk which passes the gate. Can be empty. """
+        audio = np.frombuffer(chunk, dtype=np.float32) if isinstance(chunk, bytes) else np.asarray(chunk, np.float32)
+        self.input_samples += len(audio)
+        if len(self._remainder):
+            audio = np.concatenate([self._remainder, audio])
+
+        n_frames = len(audio) // self.frame_size
+        self._remainder = audio[n_frames * self.frame_size:].copy()
+        return self._gate(audio[:n_frames * self.frame_size].reshape(n_frames, self.frame_size))
+
+    def flush(self) -> np.ndarray:
+        """ Returns the audio which is still held back. Call it after the last chunk. """
+        out = []
+        if len(self._remainder):
+            out.append(self._gate(self._remainder.reshape(1, -1)))
+            self._remainder = np.empty(0, dtype=np.float32)
+        if not self.trim and self._held:
+            out.extend(self._held)
+            self.output_samples += sum(len(f) for f in self._held)
+        self._held.clear()
+        self._preroll.clear()
+        return np.concatenate(out) if out else np.empty(0, dtype=np.float32)
+
+    def _gate(self, frames: np.ndarray) -> np.ndarray:
+        voiced = np.einsum("ij,ij->i", frames, frames) / frames.shape[1] > self.threshold
+        self.frames += len(frames)
+        self.voiced_frames += int(np.count_nonzero(voiced))
+
+        out = []
+        for frame, is_voiced in zip(frames, voiced):
+            if is_voiced:
+                # a pause ended (or the voice started). Send the held end of the pause or the preroll first.
+                out.extend(self._preroll)
+                out.extend(self._held)
+                self._preroll.clear()
+                self._held.clear()
+                out.append(frame)
+                self._in_voice = True
+                self._silent_frames = 0
+            elif self._in_voice and self._silent_frames < self.hangover_frames:
+                out.append(frame)
+                self._silent_frames += 1
+            elif self._in_voice or not self.trim:
+                self._held.append(frame.copy())
+            elif self._preroll.maxlen:
+                self._preroll.append(frame.copy())
+
+        if not out:
+            return np.empty(0, dtype=np.float32)
+        out = np.concatenate(out)
+        self.output_samples += len(out)
+        return out
+
+    def stats(self) -> dict:
+        held = sum(len(f) for f in self._held) + sum(len(f) for f in self._preroll)
+        dropped = self.input_samples - self.output_samples - len(self._remainder) - held
+        return {
+            "input_samples": self.input_samples,
+            "output_samples": self.output_samples,
+            "dropped_samples": dropped,
+            "dropped_seconds": dropped / self.samplerate,
+            "frames": self.frames,
+            "voiced_frames": self.voiced_frames,
+        }
+
+    def stream(self, audio_stream) -> Iterator[np.ndarray]:
+        """ Gates a whole stream of chunks """
+        for chunk in audio_stream:
+            audio = self.process(chunk)
+            if len(audio) > 0:
+                yield audio
+        audio = self.flush()
+        if len(audio) > 0:
+            yield audio
+
+
+class RealtimePacer:
+    """
+    Releases float32 audio at wall clock rate instead of as fast as the producer yields it.
+    A reader thread pulls the producer's chunks into a jitter buffer, so bursts of a tts engine are absorbed. The
+    sender starts once prefill seconds are buffered and keeps the sent audio at most lead_time ahead of real time.
+    underruns counts the times the buffer ran dry while the server was playing (the producer was too slow).
+    overruns counts the times the buffer was full when a chunk arrived (the producer was too fast).
+    """
+    def __init__(
+            self,
+            samplerate: int,
+            lead_time: float = 0.1,
+            prefill: float = 0.05,
+            max_buffered: float = 2.0,
+            overflow: str = "block"
+    ):
+        """
+        :param samplerate: Sampling rate of the audio.
+        :param lead_time: Seconds the sent audio may be ahead of the playback.
+        :param prefill: Seconds of audio which are buffered before the first chunk is sent.
+        :param max_buffered: Capacity of the jitter buffer in seconds.
+        :param overflow: "block" stops pulling from the producer while the buffer is full,
+            "drop_oldest" drops the oldest audio to keep the latency bounded.
+        """
+        if overflow not in ("block", "drop_oldest"):
+            raise ValueError('overflow must be "block" or "drop_oldest"')
+        self.samplerate = samplerate
+        self.lead_time = lead_time
+        self.prefill = prefill
+        self.max_buffered = max_buffered
+        self.overflow = overflow
+
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_samples = 0
+        self.max_buffered_seconds = 0.0
+
+    def stream(self, audio_stream) -> Iterator[np.ndarray]:
+        """ Paces a whole stream of chunks """
+        buffer = collections.deque()
+        cond = threading.Condition()
+        state = {"samples": 0, "done": False, "error": None, "stopped": False}
+        capacity = int(self.max_buffered * self.samplerate)
+
+        def read():
+            try:
+                for chunk in audio_stream:
+                    # copy, the chunks of the stages before can be reused buffers
+                    chunk = np.frombuffer(chunk, np.float32).copy() if isinstance(chunk, bytes) \
+                        else np.array(chunk, dtype=np.float32)
+                    with cond:
+                        if state["samples"] + len(chunk) > capacity and buffer:
+                            self.overruns += 1
+                            if self.overflow == "drop_oldest":
+                                while buffer and state["samples"] + len(chunk) > capacity:
+                                    dropped = buffer.popleft()
+                                    state["samples"] -= len(dropped)
+                                    self.dropped_samples += len(dropped)
+                            else:
+                                cond.wait_for(lambda: state["samples"] + len(chunk) <= capacity or not buffer
+                                              or state["stopped"])
+                        if state["stopped"]:
+                            return
+                        buffer.append(chunk)
+                        state["samples"] += len(chunk)
+                        self.max_buffered_seconds = max(self.max_buffered_seconds, state["samples"] / self.samplerate)
+                        cond.notify_all()
+            except Exception as e:
+                state["error"] = e
+            finally:
+                with cond:
+                    state["done"] = True
+                    cond.notify_all()
+
+        threading.Thread(target=read, daemon=True).start()
+        try:
+            with cond:
+                cond.wait_for(lambda: state["samples"] >= self.prefill * self.samplerate or state["done"])
+            start = time.perf_counter()
+            sent = 0  # samples
+            while True:
+                # sleep until the chunk is due: the playback reached sent - lead_time
+                delay = start + sent / self.samplerate - self.lead_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+                with cond:
+                    if not buffer and not state["done"]:
+                        cond.wait_for(lambda: buffer or state["done"])
+                        now = time.perf_counter()
+                        if buffer and now > start + sent / self.samplerate:
+                            # the server played everything sent so far and had to wait
+                            self.underruns += 1
+                            start = now - sent / self.samplerate
+                    if not buffer:
+                        break
+                    chunk = buffer.popleft()
+                    state["samples"] -= len(chunk)
+                    cond.notify_all()
+
+                sent += len(chunk)
+                yield chunk
+
+            if state["error"] is not None:
+                raise state["error"]
+        finally:
+            with cond:
+                state["stopped"] = True
+                cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "dropped_samples": self.dropped_samples,
+            "max_buffered_seconds": self.max_buffered_seconds,
+        }
+
+
+def get_stream_samplerate(samplerate: int, normalizer: AudioNormalizer = None, vad: VoiceActivityGate = None) -> int:
+    """
+    the samplerate of the sent audio. A normalizer can resample the audio.
+    A vad gate works on the sent audio, so its samplerate has to match the normalizer's target samplerate.
+    """
+    if normalizer is not None:
+        if normalizer.samplerate != samplerate:
+            raise ValueError(
+                f"samplerate {samplerate} doesn't match the normalizer's samplerate {normalizer.samplerate}"
+            )
+        samplerate = normalizer.target_samplerate
+    if vad is not None and vad.samplerate != samplerate:
+        raise ValueError(f"the vad's samplerate {vad.samplerate} doesn't match the sent samplerate {samplerate}")
+    return samplerate
+
+
+class AudioReblocker:
+    """
+    Coalesces small chunks and splits large chunks into frames of frame_size float32 samples.
+    Tiny chunks waste per-message overhead and chunks above the gRPC message limit fail, so every frame is at most
+    max_message_bytes large.
+    Small chunks are collected in one preallocated buffer. Chunks which are already float32 are only viewed, not
+    converted, and bytes of exactly one frame are passed through as they are. protobuf only accepts bytes, so
+    the one copy into the request message remains.
+    """
+    def __init__(self, frame_size: int = None, max_message_bytes: int = DEFAULT_GRPC_MAX_AUDIO_BYTES):
+        """
+        :param frame_size: Samples per sent frame. None forwards chunks as they come and only splits oversized ones.
+        :param max_message_bytes: Upper bound of the audio bytes per message.
+        """
+        max_frame_bytes = max_message_bytes - max_message_bytes % FLOAT32_BYTES
+        if frame_size is None:
+            self.frame_bytes = None
+        else:
+            if frame_size <= 0:
+                raise ValueError("frame_size must be positive")
+            self.frame_bytes = min(frame_size * FLOAT32_BYTES, max_frame_bytes)
+        self.max_frame_bytes = max_frame_bytes
+
+        self._buffer = bytearray(self.frame_bytes or 0)
+        self._buffer_view = memoryview(self._buffer)
+        self._fill = 0
+
+    @staticmethod
+    def as_bytes_view(chunk: Union[np.ndarray, bytes]) -> memoryview:
+        """ byte view of the chunk as float32 samples. Contiguous float32 arrays and bytes are not copied. """
+        if isinstance(chunk, np.ndarray):
+            chunk = np.ascontiguousarray(chunk, dtype=np.float32)
+        return memoryview(chunk).cast("B")
+
+    def feed(self, chunk: Union[np.ndarray, bytes]) -> Iterator[bytes]:
+        """ Yields all complete frames which are available after adding the chunk """
+        if self.frame_bytes is None:
+            yield from self._split(chunk)
+            return
+
+        if self._fill == 0 and isinstance(chunk, bytes) and len(chunk) == self.frame_bytes:
+            yield chunk
+            return
+
+        view = self.as_bytes_view(chunk)
+        pos = 0
+        # top up the pending frame first
+        if self._fill > 0:
+            n = min(self.frame_bytes - self._fill, len(view))
+            self._buffer_view[self._fill:self._fill + n] = view[:n]
+            self._fill += n
+            pos = n
+            if self._fill < self.frame_bytes:
+                return
+            yield bytes(self._buffer)
+            self._fill = 0
+
+        # whole frames are cut directly out of the chunk
+        while len(view) - pos >= self.frame_bytes:
+            yield bytes(view[pos:pos + self.frame_bytes])
+            pos += self.frame_bytes
+
+        rest = len(view) - pos
+        if rest > 0:
+            self._buffer_view[:rest] = view[pos:]
+            self._fill = rest
+
+    def flush(self) -> Iterator[bytes]:
+        """ Yields the incomplete last frame. Call it after the last chunk. """
+        if self._fill > 0:
+            # whole samples only, a trailing partial sample can't be played
+            n = self._fill - self._fill % FLOAT32_BYTES
+            self._fill = 0
+            if n > 0:
+                yield bytes(self._buffer_view[:n])
+
+    def _split(self, chunk: Union[np.ndarray, bytes]) -> Iterator[bytes]:
+        if isinstance(chunk, bytes) and len(chunk) <= self.max_frame_bytes:
+            yield chunk
+            return
+
+        view = self.as_bytes_view(chunk)
+        for pos in range(0, len(view), self.max_frame_bytes):
+            yield bytes(view[pos:pos + self.max_frame_bytes])
+
+    def process(self, audio_stream) -> Iterator[bytes]:
+        """ Re-blocks a whole stream of chunks """
+        for chunk in audio_stream:
+            yield from self.feed(chunk)
+        yield from self.flush()
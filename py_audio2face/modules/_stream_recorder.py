@@ -0,0 +1,196 @@
+"""
+Incremental blendshape export of a running stream.
+stream_audio reports every sent chunk to the recorder. Whenever a time window of audio is complete, a worker thread
+exports the animation of the streaming player and writes the frames of the window as a segment file and/or hands
+it to a callback. The gRPC send thread only appends to a queue, so exporting never delays the audio.
+The segments of a long session are available while it runs instead of only after the stream ended.
+The exporter of A2F has no frame range, so every export contains the whole animation since the start of the stream
+and the window is cut out locally. The cost of an export grows with the session: a session of n windows writes
+about n^2 / 2 windows worth of frames in total. A slow export lets the windows pile up, which are then exported with
+one request. For sessions of many minutes use longer segments.
+"""
+
+from __future__ import annotations  # avoid circular import with import py_audio2face
+import py_audio2face.audio2face as a2f
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+from py_audio2face import utils
+from py_audio2face.settings import DEFAULT_OUTPUT_DIR
+from py_audio2face.animation import load_animation, save_animation, BlendshapeAnimation
+
+_FINISHED = object()
+
+
+class AnimationSegment:
+    def __init__(self, index: int, start: float, end: float, animation: BlendshapeAnimation, file: str = None):
+        """
+        index (int): Position of the segment in the stream.
+        start (float), end (float): Time window of the segment in seconds of streamed audio.
+        animation (BlendshapeAnimation): The frames of the window.
+        file (str): The written segment file. None if the recorder writes no files.
+        """
+        self.index = index
+        self.start = start
+        self.end = end
+        self.animation = animation
+        self.file = file
+
+    def __repr__(self):
+        return f"AnimationSegment({self.index}, {self.start:.2f}s-{self.end:.2f}s, {self.animation.n_frames} frames)"
+
+
+class StreamRecorder:
+    def __init__(
+            self,
+            client: a2f.Audio2Face,
+            segment_seconds: float = 5.0,
+            output_path: str = None,
+            fps: int = 60,
+            format: str = "usd",
+            on_segment=None,
+            wait_for_playback: bool = True,
+            playback_lag: float = 0.1
+    ):
+        """
+        Pass the recorder to Audio2Face.stream_audio (or open_stream) as recorder=...
+        :param client: Client of the headless server which exports the segments. Only used by the worker thread.
+        :param segment_seconds: Length of the time windows.
+        :param output_path: Segments are written to {output_path}_{index:04d}_bsweight.{format}. If None and no
+            on_segment callback is given, DEFAULT_OUTPUT_DIR/stream is used. If None with a callback, no files are kept:
+            the temporary exports go to a temp directory which is removed when the stream finished.
+        :param on_segment: callback(AnimationSegment) called by the worker thread for every finished segment.
+        :param wait_for_playback: The player animates the audio in real time. Wait until a window was played
+            (plus playback_lag seconds) before it is exported.
+        """
+        if segment_seconds <= 0:
+            raise ValueError("segment_seconds must be positive")
+
+        if output_path is None and on_segment is None:
+            print(f"output path is not provided, using default: {DEFAULT_OUTPUT_DIR}")
+            output_path = os.path.join(DEFAULT_OUTPUT_DIR, "stream")
+
+        self.client = client
+        self.segment_seconds = segment_seconds
+        self.output_path = os.path.abspath(output_path) if output_path is not None else None
+        self.fps = fps
+        self.format = format
+        self.on_segment = on_segment
+        self.wait_for_playback = wait_for_playback
+        self.playback_lag = playback_lag
+
+        self.segments = []
+        self.errors = []
+        self.exports = 0  # export requests. Lower than the segments if the worker fell behind and coalesced windows.
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._export_dir = None  # where the full exports are written before the windows are cut out
+        self._started = None  # perf_counter of the first audio
+        self._sent = 0.0  # seconds of sent audio
+        self._window_start = 0.0
+        self._index = 0
+
+    def begin(self):
+        """ starts the worker. Called by stream_audio. """
+        self.segments = []
+        self.errors = []
+        self._started = None
+        self._sent = 0.0
+        self._window_start = 0.0
+        self._index = 0
+        if self.output_path is not None:
+            self._export_dir = os.path.dirname(self.output_path)
+            os.makedirs(self._export_dir, exist_ok=True)
+        else:
+            self._export_dir = tempfile.mkdtemp(prefix="a2f_recorder_")
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def advance(self, seconds: float):
+        """ reports sent audio. Queues the completed windows without blocking. """
+        if self._started is None:
+            self._started = time.perf_counter()
+        self._sent += seconds
+        while self._sent - self._window_start >= self.segment_seconds:
+            self._queue_window(self._window_start + self.segment_seconds)
+
+    def finish(self, timeout: float = None) -> list:
+        """
+        Queues the remaining audio as last segment and waits for the worker. Called by stream_audio.
+        :return: the recorded segments
+        """
+        if self._thread is None:
+            return self.segments
+        if self._sent > self._window_start:
+            self._queue_window(self._sent)
+        self._queue.put(_FINISHED)
+        self._thread.join(timeout)
+        if self.output_path is None and not self._thread.is_alive():
+            shutil.rmtree(self._export_dir, ignore_errors=True)
+        return self.segments
+
+    def _queue_window(self, end: float):
+        self._queue.put((self._index, self._window_start, end))
+        self._index += 1
+        self._window_start = end
+
+    def _work(self):
+        finished = False
+        while not finished:
+            windows = [self._queue.get()]
+            # a slow export lets windows pile up. Export them with one request.
+            while True:
+                try:
+                    windows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if windows[-1] is _FINISHED:
+                finished = True
+                windows.pop()
+            if not windows:
+                continue
+            try:
+                self._record(windows, last=finished)
+            except Exception as e:
+                print(f"Recording animation segments {windows[0][0]}-{windows[-1][0]} failed: {e}")
+                self.errors.append(e)
+
+    def _record(self, windows: list, last: bool):
+        end = windows[-1][2]
+        if self.wait_for_playback and not last:
+            delay = self._started + end + self.playback_lag - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        # export_blend_shape instead of export: the caller's thread may use the client and its last_export_response
+        export_path = os.path.join(self._export_dir, f".{os.getpid()}_{id(self)}_live")
+        response = self.client.export_blend_shape(output_path=export_path, fps=self.fps, format=self.format)
+        self.exports += 1
+        if not utils.is_ok_response(response):
+            raise RuntimeError(f"the export of the streaming player failed: {response}")
+
+        export_file = utils.get_export_file_path(export_path, self.format)
+        try:
+            animation = load_animation(export_file, cache=False)
+        finally:
+            os.remove(export_file)
+
+        for index, start, window_end in windows:
+            first = round(start * self.fps)
+            # windows share their border frame. The last frame belongs to the next window except at the end.
+            stop = round(window_end * self.fps) + (1 if last and window_end == end else 0)
+            segment = AnimationSegment(index, start, window_end, BlendshapeAnimation(
+                animation.weights[first:stop], animation.names, animation.fps, source=self.output_path
+            ))
+            if self.output_path is not None:
+                segment.file = utils.get_export_file_path(f"{self.output_path}_{index:04d}", self.format)
+                save_animation(segment.animation, segment.file)
+            self.segments.append(segment)
+            if self.on_segment is not None:
+                self.on_segment(segment)
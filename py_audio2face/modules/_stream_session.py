@@ -0,0 +1,171 @@
+"""
+Push based streaming to the Audio2Face streaming player.
+Producers like tts callbacks push chunks whenever they have them. A sender thread streams them to the server.
+The buffer between both is bounded, so a stalled server slows the producer down (block) or loses the oldest audio
+(drop_oldest) instead of growing the memory without limit.
+"""
+
+from __future__ import annotations  # avoid circular import with import py_audio2face
+import py_audio2face.audio2face as a2f
+
+import collections
+import threading
+import time
+
+from py_audio2face.modules._stream_stats import StreamStats
+
+OVERFLOW_POLICIES = ("block", "drop_oldest")
+
+
+class StreamSession:
+    def __init__(
+            self,
+            client: a2f.Audio2Face,
+            samplerate: int,
+            max_buffered_chunks: int = 64,
+            overflow: str = "block",
+            **stream_kwargs
+    ):
+        """
+        Use Audio2Face.open_stream to create a session.
+        :param client: The client which streams the audio.
+        :param samplerate: Sampling rate of the pushed audio.
+        :param max_buffered_chunks: Capacity of the buffer between producer and sender thread.
+        :param overflow: What push does if the buffer is full. "block" waits for free space, "drop_oldest" drops the
+            oldest buffered chunk.
+        :param stream_kwargs: Passed to Audio2Face.stream_audio e.g. normalizer, vad, frame_size, grpc_port or stats.
+            The StreamStats of the session are available as session.stream_stats and include the queue wait.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        if max_buffered_chunks <= 0:
+            raise ValueError("max_buffered_chunks must be positive")
+
+        self.client = client
+        self.samplerate = samplerate
+        self.max_buffered_chunks = max_buffered_chunks
+        self.overflow = overflow
+        self.stream_stats = stream_kwargs.pop("stats", None) or StreamStats()
+        self.stream_kwargs = stream_kwargs
+
+        self._buffer = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._in_flight = 0  # chunks taken from the buffer but not yet handed to gRPC
+        self.success = None
+        self.error = None
+
+        self.pushed_chunks = 0
+        self.sent_chunks = 0
+        self.dropped_chunks = 0
+        self.buffered_bytes = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._send, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def push(self, chunk, timeout: float = None) -> bool:
+        """
+        Adds a chunk (numpy array or bytes) to the stream. Arrays must not be modified after they were pushed.
+        :param timeout: Maximum time to wait for free space with overflow="block". None waits forever.
+        :return: False if the chunk wasn't buffered because the timeout passed.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("push on a closed StreamSession")
+            if self.error is not None:
+                raise RuntimeError(f"streaming to audio2face failed: {self.error}")
+
+            if len(self._buffer) >= self.max_buffered_chunks:
+                if self.overflow == "drop_oldest":
+                    self.buffered_bytes -= _nbytes(self._buffer.popleft()[0])
+                    self.dropped_chunks += 1
+                else:
+                    start = time.perf_counter()
+                    has_space = self._cond.wait_for(
+                        lambda: len(self._buffer) < self.max_buffered_chunks or self.error is not None, timeout
+                    )
+                    self.blocked_seconds += time.perf_counter() - start
+                    if self.error is not None:
+                        raise RuntimeError(f"streaming to audio2face failed: {self.error}")
+                    if not has_space:
+                        return False
+
+            self._buffer.append((chunk, time.perf_counter()))
+            self.pushed_chunks += 1
+            self.buffered_bytes += _nbytes(chunk)
+            self.max_depth = max(self.max_depth, len(self._buffer))
+            self._cond.notify_all()
+            return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """ Waits until all pushed chunks were handed to gRPC. Returns False on timeout. """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: (not self._buffer and self._in_flight == 0) or not self._thread.is_alive(), timeout
+            )
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Ends the stream after the buffered chunks were sent and waits for the server's response.
+        :return: True if the server reported success.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return bool(self.success)
+
+    def _chunks(self):
+        """ yields the buffered chunks until the session is closed and the buffer is drained """
+        while True:
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._buffer or self._closed)
+                if not self._buffer:
+                    return
+                chunk, pushed = self._buffer.popleft()
+                self.buffered_bytes -= _nbytes(chunk)
+                self.stream_stats.record_queue_wait(time.perf_counter() - pushed)
+                self._in_flight = 1
+                self._cond.notify_all()
+            self.sent_chunks += 1
+            yield chunk
+
+    def _send(self):
+        try:
+            self.success = self.client.stream_audio(
+                self._chunks(), samplerate=self.samplerate, stats=self.stream_stats, **self.stream_kwargs
+            )
+        except Exception as e:
+            print(f"Streaming to audio2face failed: {e}")
+            self.error = e
+            self.success = False
+        finally:
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "depth": len(self._buffer),
+                "max_depth": self.max_depth,
+                "buffered_bytes": self.buffered_bytes,
+                "pushed_chunks": self.pushed_chunks,
+                "sent_chunks": self.sent_chunks,
+                "dropped_chunks": self.dropped_chunks,
+                "blocked_seconds": self.blocked_seconds,
+            }
+
+
+def _nbytes(chunk) -> int:
+    return chunk.nbytes if hasattr(chunk, "nbytes") else len(chunk)
@@ -0,0 +1,95 @@
+# Latency statistics of one audio stream to the streaming player.
+# Times are measured with time.perf_counter and reported in seconds relative to the start of stream_audio,
+# so they show where the time between the producer and A2F goes: waiting for the producer (and the queue of a
+# StreamSession), building the protobuf messages and handing them to gRPC.
+
+import statistics
+import time
+
+CHUNK_METRICS = ("wait_s", "queue_wait_s", "serialize_s", "send_s")
+
+
+class StreamStats:
+    """
+    :param on_chunk: Optional callback(chunk_index, timings) invoked after each sent chunk.
+        timings is a dict with bytes, wait_s, serialize_s and send_s of the chunk.
+    """
+    def __init__(self, on_chunk=None):
+        self.on_chunk = on_chunk
+        self.start = None
+        self.start_marker_s = None  # start marker handed to gRPC
+        self.first_chunk_s = None  # first audio handed to gRPC
+        self.last_chunk_s = None
+        self.finished_s = None  # response of the server received
+        self.success = None
+        self.chunks = 0
+        self.bytes = 0
+        self.wait_s = []  # waiting for the next chunk of the producer and the processing stages
+        self.queue_wait_s = []  # time chunks spent in the buffer of a StreamSession
+        self.serialize_s = []  # building the request message
+        self.send_s = []  # handing the message to gRPC
+
+    @property
+    def samples(self) -> int:
+        return self.bytes // 4  # float32
+
+    def begin(self):
+        self.start = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def record_start_marker(self):
+        self.start_marker_s = self.elapsed()
+
+    def record_chunk(self, nbytes: int, wait: float, serialize: float, send: float):
+        self.last_chunk_s = self.elapsed()
+        if self.first_chunk_s is None:
+            self.first_chunk_s = self.last_chunk_s
+        self.chunks += 1
+        self.bytes += nbytes
+        self.wait_s.append(wait)
+        self.serialize_s.append(serialize)
+        self.send_s.append(send)
+        if self.on_chunk is not None:
+            self.on_chunk(self.chunks - 1, {"bytes": nbytes, "wait_s": wait, "serialize_s": serialize, "send_s": send})
+
+    def record_queue_wait(self, wait: float):
+        self.queue_wait_s.append(wait)
+
+    def finish(self, success: bool):
+        self.finished_s = self.elapsed()
+        self.success = success
+
+    def summary(self) -> dict:
+        """ returns the totals and {metric: {count, total, mean, p50, p95, max}} of the per chunk timings """
+        result = {
+            "success": self.success,
+            "start_marker_s": self.start_marker_s,
+            "first_chunk_s": self.first_chunk_s,
+            "last_chunk_s": self.last_chunk_s,
+            "finished_s": self.finished_s,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "samples": self.samples,
+        }
+        for metric in CHUNK_METRICS:
+            values = sorted(getattr(self, metric))
+            if not values:
+                continue
+            result[metric] = {
+                "count": len(values),
+                "total": sum(values),
+                "mean": statistics.mean(values),
+                "p50": values[len(values) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1],
+            }
+        return result
+
+    def histogram(self, metric: str = "send_s", bins=20):
+        """ returns (counts, bin_edges) of a per chunk metric like numpy.histogram """
+        import numpy as np
+        if metric not in CHUNK_METRICS:
+            raise ValueError(f"metric must be one of {CHUNK_METRICS}")
+        return np.histogram(getattr(self, metric), bins=bins)
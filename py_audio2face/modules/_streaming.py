@@ -6,27 +6,192 @@
 from __future__ import annotations  # avoid circular import with import py_audio2face
 import py_audio2face.audio2face as a2f
 
-from py_audio2face.settings import DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE, DEFAULT_AUDIO_STREAM_GRPC_PORT
+import time
+
+from py_audio2face.settings import (
+    DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE, DEFAULT_AUDIO_STREAM_GRPC_PORT, DEFAULT_GRPC_MAX_AUDIO_BYTES,
+    DEFAULT_UNARY_MAX_SECONDS
+)
 from typing import Generator, Union
 
 try:
     import grpc
     import numpy as np
     from py_audio2face.modules.clients.grpc_stub import audio2face_pb2, audio2face_pb2_grpc
+    from py_audio2face.modules.clients._grpc_channel_pool import GrpcChannelPool
+    from py_audio2face.modules._stream_session import StreamSession
+    from py_audio2face.modules._stream_stats import StreamStats
+    from py_audio2face.modules._stream_recorder import StreamRecorder
+    from py_audio2face.modules._stream_processing import AudioReblocker, AudioNormalizer, VoiceActivityGate, RealtimePacer, get_stream_samplerate
     streaming_installed = True
 except Exception as e:
     streaming_installed = False
 
+# stream_audio arguments without a meaning for a single PushAudio call
+STREAM_ONLY_ARGS = ("vad", "pacer", "frame_size", "stats", "recorder")
+
 
 class _A2F_streaming:
 
+    def get_grpc_channels(self: a2f.Audio2Face) -> GrpcChannelPool:
+        """ the pool of persistent gRPC channels of the client. Created on first use. """
+        if self.grpc_channels is None:
+            self.grpc_channels = GrpcChannelPool()
+        return self.grpc_channels
+
+    def warm_up_streaming(
+            self: a2f.Audio2Face,
+            grpc_port: int = DEFAULT_AUDIO_STREAM_GRPC_PORT,
+            timeout: float = None
+    ) -> bool:
+        """
+        Loads the streaming scene and connects the gRPC channel ahead of the first utterance,
+        so neither is paid on the time to first audio.
+        :return: True if the channel is connected.
+        """
+        self.init_a2f(streaming=True)
+        return self.get_grpc_channels().warm_up(f"localhost:{grpc_port}", timeout=timeout)
+
+    def push_audio(
+            self: a2f.Audio2Face,
+            audio: Union[np.ndarray, bytes],
+            samplerate: int,
+            block_until_playback_is_finished: bool = True,
+            instance_name: str = DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE,
+            grpc_port: int = DEFAULT_AUDIO_STREAM_GRPC_PORT,
+            normalizer: AudioNormalizer = None
+    ) -> bool:
+        """
+        Send a complete audio clip to the Audio2Face Streaming Audio Player with a single PushAudio call.
+        Saves the start marker round of the stream for short clips. Clips above the gRPC message limit are streamed.
+
+        :param audio: The whole clip as numpy array or float32 bytes
+        :param samplerate: Sampling rate of the audio data
+        :param block_until_playback_is_finished: If True, blocks until playback is finished
+        :param instance_name: Prim path of the Audio2Face Streaming Audio Player
+        :param grpc_port: Port of the gRPC server
+        :param normalizer: Converts the clip to mono float32. See stream_audio.
+        :return: True if the push was successful, False otherwise
+        """
+        if not streaming_installed:
+            raise ImportError(
+                "py_audio2face[streaming] is not installed. "
+                "Please install it via 'pip install py_audio2face[streaming]'"
+            )
+
+        sent_samplerate = get_stream_samplerate(samplerate, normalizer)
+        if normalizer is not None:
+            normalizer.reset()
+            audio = normalizer.process(audio)
+        if isinstance(audio, np.ndarray):
+            audio = np.ascontiguousarray(audio, dtype=np.float32).tobytes()
+
+        if len(audio) > DEFAULT_GRPC_MAX_AUDIO_BYTES:
+            return self.stream_audio(
+                [audio], samplerate=sent_samplerate, block_until_playback_is_finished=block_until_playback_is_finished,
+                instance_name=instance_name, grpc_port=grpc_port
+            )
+
+        self.init_a2f(streaming=True)
+        url = f"localhost:{grpc_port}"
+        request = audio2face_pb2.PushAudioRequest(
+            audio_data=audio,
+            samplerate=sent_samplerate,
+            instance_name=instance_name,
+            block_until_playback_is_finished=block_until_playback_is_finished
+        )
+        try:
+            response = self.get_grpc_channels().get_stub(url).PushAudio(request)
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                self.grpc_channels.invalidate(url)
+            raise
+        return response.success
+
+    def send_audio(
+            self: a2f.Audio2Face,
+            audio: Union[np.ndarray, bytes, Generator],
+            samplerate: int,
+            mode: str = "auto",
+            unary_max_seconds: float = DEFAULT_UNARY_MAX_SECONDS,
+            **kwargs
+    ) -> bool:
+        """
+        Send audio to the Audio2Face Streaming Audio Player with push_audio or stream_audio.
+        In "auto" mode complete clips up to unary_max_seconds use the unary push_audio and everything else
+        (long clips, generators and other open ended input) is streamed.
+
+        :param audio: A complete clip (numpy array or float32 bytes) or a generator of chunks
+        :param samplerate: Sampling rate of the audio data
+        :param mode: "auto", "unary" or "stream"
+        :param unary_max_seconds: Longest clip which is sent unary in "auto" mode
+        :param kwargs: Further arguments of push_audio / stream_audio e.g. grpc_port or normalizer
+        :return: True if sending was successful, False otherwise
+        """
+        if mode not in ("auto", "unary", "stream"):
+            raise ValueError('mode must be "auto", "unary" or "stream"')
+
+        is_clip = isinstance(audio, (bytes, np.ndarray))
+        stream_only = [arg for arg in STREAM_ONLY_ARGS if kwargs.get(arg) is not None]
+        if mode == "auto":
+            is_short = is_clip and _clip_seconds(audio, samplerate, kwargs) <= unary_max_seconds
+            mode = "unary" if is_short and not stream_only else "stream"
+
+        if mode == "unary":
+            if stream_only:
+                raise ValueError(f"{stream_only} can only be used with mode='stream'")
+            if not is_clip:
+                # the chunks are normalized one by one like in a stream, the joined clip is float32 already
+                normalizer = kwargs.pop("normalizer", None)
+                if normalizer is not None:
+                    samplerate = get_stream_samplerate(samplerate, normalizer)
+                    normalizer.reset()
+                    audio = normalizer.stream(audio)
+                audio = b"".join(AudioReblocker().process(audio))
+            return self.push_audio(audio, samplerate, **kwargs)
+
+        return self.stream_audio([audio] if is_clip else audio, samplerate, **kwargs)
+
+    def open_stream(
+            self: a2f.Audio2Face,
+            samplerate: int,
+            max_buffered_chunks: int = 64,
+            overflow: str = "block",
+            **stream_kwargs
+    ) -> StreamSession:
+        """
+        Opens a push based stream to the Audio2Face Streaming Audio Player.
+        Push chunks with session.push(chunk) from any thread and end the stream with session.close().
+
+        :param samplerate: Sampling rate of the audio data
+        :param max_buffered_chunks: Capacity of the buffer between the producer and the gRPC sender thread
+        :param overflow: "block" makes push wait while the buffer is full, "drop_oldest" drops the oldest chunk
+        :param stream_kwargs: Further arguments of stream_audio e.g. normalizer, vad, frame_size or grpc_port
+        :return: the running StreamSession
+        """
+        if not streaming_installed:
+            raise ImportError(
+                "py_audio2face[streaming] is not installed. "
+                "Please install it via 'pip install py_audio2face[streaming]'"
+            )
+
+        return StreamSession(
+            self, samplerate, max_buffered_chunks=max_buffered_chunks, overflow=overflow, **stream_kwargs
+        )
+
     def stream_audio(
             self: a2f,
             audio_stream: Generator[Union[np.ndarray, bytes], None, None],
             samplerate: int,
             block_until_playback_is_finished: bool = True,
             instance_name: str = DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE,
-            grpc_port: int = DEFAULT_AUDIO_STREAM_GRPC_PORT
+            grpc_port: int = DEFAULT_AUDIO_STREAM_GRPC_PORT,
+            frame_size: int = None,
+            normalizer: AudioNormalizer = None,
+            vad: VoiceActivityGate = None,
+            pacer: RealtimePacer = None,
+            stats: StreamStats = None,
+            recorder: StreamRecorder = None
     ) -> (list, bool):
         """
         Stream audio data to Audio2Face Streaming Audio Player.
@@ -36,6 +201,17 @@ class _A2F_streaming:
         :param block_until_playback_is_finished: If True, blocks until playback is finished
         :param instance_name: Prim path of the Audio2Face Streaming Audio Player
         :param grpc_port: Port of the gRPC server
+        :param normalizer: Converts the chunks to mono float32 (e.g. from int16 tts output), applies gain and
+            resamples. Needed if the chunks are not mono float32 already.
+        :param vad: Drops silence before it is sent. Check vad.stats() for the dropped samples afterwards.
+        :param pacer: Sends the audio at real time speed through a jitter buffer instead of as fast as it is yielded.
+            Check pacer.stats() for under- and overruns afterwards.
+        :param frame_size: Samples per sent message. Small chunks are coalesced and large ones split.
+            If None the chunks are sent as they come. Chunks above the gRPC message limit are always split.
+        :param stats: Collects the latency of the stream, e.g. with an on_chunk callback. A new StreamStats is
+            created if None. The stats of the last stream are kept in self.last_stream_stats.
+        :param recorder: Exports the animation in segments of a few seconds while the audio is streamed.
+            The segments are in recorder.segments after the stream. See StreamRecorder.
         :return: True if streaming was successful, False otherwise
         """
         if not streaming_installed:
@@ -44,100 +220,75 @@ class _A2F_streaming:
                 "Please install it via 'pip install py_audio2face[streaming]'"
             )
 
+        stats = stats if stats is not None else StreamStats()
+        self.last_stream_stats = stats
+        stats.begin()
+
+        samplerate = get_stream_samplerate(samplerate, normalizer, vad)
+        if normalizer is not None:
+            normalizer.reset()
         self.init_a2f(streaming=True)
         url = f"localhost:{grpc_port}"
 
-        with grpc.insecure_channel(url) as channel:
-            stub = audio2face_pb2_grpc.Audio2FaceStub(channel)
-
-            def request_generator():
-                # Send start marker
-                start_marker = audio2face_pb2.PushAudioRequestStart(
-                    samplerate=samplerate,
-                    instance_name=instance_name,
-                    block_until_playback_is_finished=block_until_playback_is_finished
-                )
-                yield audio2face_pb2.PushAudioStreamRequest(start_marker=start_marker)
-
-                # Stream audio data
-                for i, chunk in enumerate(audio_stream):
-                    if isinstance(chunk, np.ndarray):
-                        chunk = chunk.astype(np.float32).tobytes()
-                    res = audio2face_pb2.PushAudioStreamRequest(audio_data=chunk)
-                    yield res
+        stub = self.get_grpc_channels().get_stub(url)
+
+        def request_generator():
+            # Send start marker
+            start_marker = audio2face_pb2.PushAudioRequestStart(
+                samplerate=samplerate,
+                instance_name=instance_name,
+                block_until_playback_is_finished=block_until_playback_is_finished
+            )
+            yield audio2face_pb2.PushAudioStreamRequest(start_marker=start_marker)
+            stats.record_start_marker()
+
+            # Stream audio data
+            chunks = audio_stream if normalizer is None else normalizer.stream(audio_stream)
+            if vad is not None:
+                chunks = vad.stream(chunks)
+            if pacer is not None:
+                chunks = pacer.stream(chunks)
+            frames = AudioReblocker(frame_size).process(chunks)
+            while True:
+                # gRPC resumes the generator when it sent the last message. The gaps are the send durations.
+                waited = time.perf_counter()
+                chunk = next(frames, None)
+                if chunk is None:
+                    return
+                serialized = time.perf_counter()
+                request = audio2face_pb2.PushAudioStreamRequest(audio_data=chunk)
+                sent = time.perf_counter()
+                yield request
+                now = time.perf_counter()
+                stats.record_chunk(len(chunk), serialized - waited, sent - serialized, now - sent)
+                if recorder is not None:
+                    recorder.advance(len(chunk) / 4 / samplerate)
 
+        if recorder is not None:
+            recorder.begin()
+        try:
             response = stub.PushAudioStream(request_generator())
-            return response.success
-
-    #def stream_audio(
-    #        self: a2f,
-    #        audio_stream: Generator[Union[np.ndarray, bytes], None, None],
-    #        samplerate: int,
-    #        export_blend_shape_interval: int | None = None,
-    #        export_fps: int = 60,
-    #        export_path: str | None = None,
-    #        export_emotion: bool = False,
-    #        export_format: str = "usd",
-    #        block_until_playback_is_finished: bool = True,
-    #        instance_name: str = DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE,
-    #        grpc_port: int = DEFAULT_AUDIO_STREAM_GRPC_PORT
-    #) -> (list, bool):
-    #    """
-    #    Stream audio data to Audio2Face Streaming Audio Player.
-#
-    #    :param audio_stream: Generator yielding audio chunks (numpy arrays or bytes)
-    #    :param samplerate: Sampling rate of the audio data
-    #    :param export_blend_shape_interval: Interval to export blend shapes. If None, no blend shapes are exported
-    #    :param export_fps: FPS of the exported animation
-    #    :param export_path: Path to export the animation
-    #    :param export_emotion: Whether to generate emotion_auto_detect keys from the audio
-    #    :param export_format: Format of the exported animation
-    #    :param block_until_playback_is_finished: If True, blocks until playback is finished
-    #    :param instance_name: Prim path of the Audio2Face Streaming Audio Player
-    #    :param grpc_port: Port of the gRPC server
-    #    :return: True if streaming was successful, False otherwise
-    #    """
-    #    self.init_a2f(streaming=True)
-    #    a2f_instance = utils.get_mark_usd_file_path(streaming=True)
-    #    url = f"localhost:{grpc_port}"
-#
-    #    if export_blend_shape_interval is not None and export_path is None:
-    #        print(f"output path is not provided, using default: {DEFAULT_OUTPUT_DIR}")
-    #        export_path = DEFAULT_OUTPUT_DIR
-#
-    #    generated_blendshapes = []
-    #    with grpc.insecure_channel(url) as channel:
-    #        stub = audio2face_pb2_grpc.Audio2FaceStub(channel)
-#
-    #        def request_generator():
-    #            # Send start marker
-    #            start_marker = audio2face_pb2.PushAudioRequestStart(
-    #                samplerate=samplerate,
-    #                instance_name=instance_name,
-    #                block_until_playback_is_finished=block_until_playback_is_finished
-    #            )
-    #            yield audio2face_pb2.PushAudioStreamRequest(start_marker=start_marker)
-#
-    #            # Stream audio data
-    #            last_export_frame = 0
-    #            for i, chunk in enumerate(audio_stream):
-    #                if isinstance(chunk, np.ndarray):
-    #                    chunk = chunk.astype(np.float32).tobytes()
-    #                res = audio2face_pb2.PushAudioStreamRequest(audio_data=chunk)
-#
-    #                # export blendshapes and clear the buffer if interval
-    #                if export_blend_shape_interval is not None and i % export_blend_shape_interval == 0:
-    #                    self.set_frame(frame=last_export_frame, a2f_instance=a2f_instance, as_timestamp=False)
-    #                    f = self.export(
-    #                        output_path=f"{export_path}_{i}.{export_format}",
-    #                        fps=export_fps, format=export_format, emotion_auto_detect=export_emotion
-    #                    )
-    #                    generated_blendshapes.append(f)
-    #                    last_export_frame = i
-#
-    #                yield res
-#
-    #        response = stub.PushAudioStream(request_generator())
-    #        return generated_blendshapes, response.success
-#
+        except grpc.RpcError as e:
+            stats.finish(False)
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                # the server is gone. Don't reuse the broken connection for the next stream.
+                self.grpc_channels.invalidate(url)
+            raise
+        finally:
+            if recorder is not None:
+                recorder.finish()
+        stats.finish(response.success)
+        return response.success
+
 
+def _clip_seconds(audio: Union[np.ndarray, bytes], samplerate: int, kwargs: dict) -> float:
+    """ duration of a complete clip. Bytes are float32 samples unless a normalizer says otherwise. """
+    normalizer = kwargs.get("normalizer")
+    if isinstance(audio, np.ndarray):
+        samples = audio.shape[0]
+        if audio.ndim == 1 and normalizer is not None:
+            samples //= normalizer.channels  # interleaved channels
+        return samples / samplerate
+    if normalizer is not None:
+        return len(audio) / (normalizer.dtype.itemsize * normalizer.channels) / samplerate
+    return len(audio) / 4 / samplerate
@@ -0,0 +1,139 @@
+from __future__ import annotations  # avoid circular import with import py_audio2face
+import py_audio2face.async_audio2face as aa2f
+
+import asyncio
+
+from py_audio2face.settings import DEFAULT_A2E_INSTANCE, DEFAULT_HTTP_POOL_SIZE
+from py_audio2face.modules._audio2emotion import _emotion_matrix, np
+from py_audio2face import utils
+
+
+class _AsyncA2FAudio2Emotion:
+    # See _A2F_Audio2Emotion for the description of the settings.
+
+    async def a2e_set_settings(
+            self: aa2f.AsyncAudio2Face,
+            a2e_emotion_strength: float = 0.5,
+            a2e_smoothing_exp: int = 0,
+            a2e_max_emotions: int = 5,
+            a2e_contrast: float = 1.0,
+            preferred_emotion: list = None,
+            a2e_preferred_emotion_strength: float = 0.5,
+            **kwargs
+    ):
+        """
+        Sets the settings for the audio2emotion generation
+        :param a2e_emotion_strength: Emotion Strength
+        :param a2e_smoothing_exp: Smoothing(Exp)
+        :param a2e_max_emotions: Max Emotions
+        :param a2e_contrast: Emotion Contrast
+        :param preferred_emotion: List of emotion_auto_detect strengths, which is the default emotion_auto_detect
+        :param a2e_preferred_emotion_strength: Strength
+        """
+        if self.loaded_scene is None:
+            await self.init_a2f()
+
+        settings = {}
+        def add_to_dict(key, value):
+            if value is not None:
+                settings[key] = value
+
+        add_to_dict("a2e_emotion_strength", a2e_emotion_strength)
+        add_to_dict("a2e_smoothing_exp", a2e_smoothing_exp)
+        add_to_dict("a2e_max_emotions", a2e_max_emotions)
+        add_to_dict("a2e_contrast", a2e_contrast)
+        add_to_dict("preferred_emotion", preferred_emotion)
+        add_to_dict("a2e_preferred_emotion_strength", a2e_preferred_emotion_strength)
+
+        self.a2e_settings.update(settings)
+        return await self.post("A2F/A2E/SetSettings", payload=settings)
+
+    async def set_enable_auto_generate_on_track_change(self: aa2f.AsyncAudio2Face, enable: bool = True):
+        payload = {
+            "a2f_instance": DEFAULT_A2E_INSTANCE,
+            "enable": enable
+        }
+        return await self.post("A2F/A2E/EnableAutoGenerateOnTrackChange", payload=payload)
+
+    async def set_emotion(
+            self: aa2f.AsyncAudio2Face,
+            amazement: float | None = 0.0,
+            anger: float | None = 0.0,
+            cheekiness: float | None = 0.0,
+            disgust: float | None = 0.0,
+            fear: float | None = 0.0,
+            grief: float | None = 0.0,
+            joy: float | None = 0.0,
+            outofbreath: float | None = 0.0,
+            pain: float | None = 0.0,
+            sadness: float | None = 0.0,
+            update_settings: bool = True
+    ):
+        """
+        Sets the emotions on a global level for the whole track.
+        Values are between 0..1. If a value is None it will be set to 0.
+        """
+        if self.loaded_scene is None:
+            await self.init_a2f()
+
+        values = [amazement, anger, cheekiness, disgust, fear, grief, joy, outofbreath, pain, sadness]
+        emotion = [v if v is not None else 0.0 for v in values]
+
+        if update_settings:
+            await self.a2e_set_settings(preferred_emotion=emotion)
+
+        payload = {
+            "a2f_instance": DEFAULT_A2E_INSTANCE,
+            "emotion": emotion
+        }
+        return await self.post("A2F/A2E/SetEmotion", payload=payload)
+
+    async def generate_emotion_keys(self: aa2f.AsyncAudio2Face):
+        """
+        Detects emotions in the audio and generates the keyframes.
+        To change the default settings, use the a2e_set_settings method.
+        """
+        return await self.post("A2F/A2E/GenerateKeys", payload=self.a2e_settings)
+
+    async def get_emotion_names(self: aa2f.AsyncAudio2Face):
+        return await self.make_request("A2F/A2E/GetEmotionNames")
+
+    async def get_emotion(self: aa2f.AsyncAudio2Face, frame: int = 0):
+        payload = {
+            "a2f_instance": DEFAULT_A2E_INSTANCE,
+            "as_vector": True,
+            "frame": frame,
+            "as_timestamp": False
+        }
+        return await self.post("A2F/A2E/GetEmotion", payload=payload)
+
+    async def get_emotion_timeline(
+            self: aa2f.AsyncAudio2Face,
+            start: int,
+            end: int,
+            step: int = 1,
+            fps: int = 60,
+            keyframes: bool = False,
+            max_concurrency: int = DEFAULT_HTTP_POOL_SIZE
+    ) -> tuple:
+        """
+        Fetches the emotions of the frames start..end concurrently. See Audio2Face.get_emotion_timeline.
+        :param max_concurrency: Maximum number of GetEmotion requests in flight.
+        :return: (emotions, names) with emotions a float32 array of shape (frames, emotions)
+        """
+        if np is None:
+            raise ImportError("get_emotion_timeline needs numpy. Install it via 'pip install numpy'")
+
+        if keyframes:
+            step = max(1, round(self.a2e_settings.get("a2e_stride", 1) * fps))
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(frame: int):
+            async with semaphore:
+                return await self.get_emotion(frame)
+
+        names, *responses = await asyncio.gather(
+            self.get_emotion_names(), *(fetch(frame) for frame in range(start, end, step))
+        )
+        names = names.get("result") if utils.is_ok_response(names) else None
+        return _emotion_matrix(responses, names), names
@@ -0,0 +1,56 @@
+from __future__ import annotations  # avoid circular import with import py_audio2face
+import py_audio2face.async_audio2face as aa2f
+
+import os
+from py_audio2face.settings import DEFAULT_SOLVER_INSTANCE, DEFAULT_OUTPUT_DIR
+
+
+class _AsyncA2FExport:
+    async def export(
+            self: aa2f.AsyncAudio2Face,
+            output_path: str,
+            fps: int = 60,
+            format: str = "usd",
+            emotion_auto_detect: bool = False
+    ):
+        """
+        Export the blend shapes to a file.
+        :param output_path: Path to the output file.
+        :param fps: Frames per second of the output animation.
+        :param format: Output format of the animation file.
+        :param emotion_auto_detect: Whether to generate emotion_auto_detect keys from the audio.
+        """
+
+        if output_path is None:
+            print(f"output path is not provided, using default: {DEFAULT_OUTPUT_DIR}")
+            output_path = DEFAULT_OUTPUT_DIR
+
+        # avoid non absolute paths
+        if not os.path.isabs(output_path):
+            output_path = os.path.join(os.getcwd(), output_path)
+
+        if not os.path.isdir(os.path.dirname(output_path)):
+            print(f"creating output dir: {output_path}")
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        if emotion_auto_detect:
+            await self.generate_emotion_keys()
+
+        response = await self.export_blend_shape(output_path=output_path, fps=fps, format=format)
+        if not isinstance(response, dict) or response.get('status', 'ERROR') == 'ERROR':
+            message = response.get('message') if isinstance(response, dict) else response
+            print(f"BlendShape Export failed: {message}")
+
+        return output_path
+
+    async def export_blend_shape(self: aa2f.AsyncAudio2Face, output_path: str, fps: int = 60, format: str = "usd"):
+        payload = {
+            "solver_node": DEFAULT_SOLVER_INSTANCE,
+            "export_directory": os.path.dirname(output_path),
+            "file_name": os.path.basename(output_path),
+            "format": format,
+            "batch": False,
+            "fps": fps
+        }
+
+        return await self.post("A2F/Exporter/ExportBlendshapes", payload=payload)
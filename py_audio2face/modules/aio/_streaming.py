@@ -0,0 +1,113 @@
+from __future__ import annotations  # avoid circular import with import py_audio2face
+import py_audio2face.async_audio2face as aa2f
+
+from py_audio2face.settings import DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE, DEFAULT_AUDIO_STREAM_GRPC_PORT
+from typing import AsyncIterable, Iterable, Union
+
+try:
+    import grpc
+    import numpy as np
+    from py_audio2face.modules.clients.grpc_stub import audio2face_pb2
+    from py_audio2face.modules.clients._grpc_channel_pool import AsyncGrpcChannelPool
+    from py_audio2face.modules._stream_processing import AudioReblocker, AudioNormalizer, VoiceActivityGate, get_stream_samplerate
+    streaming_installed = True
+except Exception as e:
+    streaming_installed = False
+
+
+class _AsyncA2FStreaming:
+
+    def get_grpc_channels(self: aa2f.AsyncAudio2Face) -> AsyncGrpcChannelPool:
+        """ the pool of persistent grpc.aio channels of the client. Created on first use. """
+        if self.grpc_channels is None:
+            self.grpc_channels = AsyncGrpcChannelPool()
+        return self.grpc_channels
+
+    async def warm_up_streaming(
+            self: aa2f.AsyncAudio2Face,
+            grpc_port: int = DEFAULT_AUDIO_STREAM_GRPC_PORT,
+            timeout: float = None
+    ) -> bool:
+        """ See Audio2Face.warm_up_streaming """
+        await self.init_a2f(streaming=True)
+        return await self.get_grpc_channels().warm_up(f"localhost:{grpc_port}", timeout=timeout)
+
+    async def stream_audio(
+            self: aa2f.AsyncAudio2Face,
+            audio_stream: Union[AsyncIterable, Iterable],
+            samplerate: int,
+            block_until_playback_is_finished: bool = True,
+            instance_name: str = DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE,
+            grpc_port: int = DEFAULT_AUDIO_STREAM_GRPC_PORT,
+            frame_size: int = None,
+            normalizer: AudioNormalizer = None,
+            vad: VoiceActivityGate = None
+    ) -> bool:
+        """
+        Stream audio data to Audio2Face Streaming Audio Player using grpc.aio.
+
+        :param audio_stream: Async or sync iterable yielding audio chunks (numpy arrays or float32 bytes)
+        :param samplerate: Sampling rate of the audio data
+        :param block_until_playback_is_finished: If True, the call returns after the playback finished
+        :param instance_name: Prim path of the Audio2Face Streaming Audio Player
+        :param grpc_port: Port of the gRPC server
+        :param frame_size: Samples per sent message. See Audio2Face.stream_audio.
+        :param normalizer: Converts the chunks to mono float32. See Audio2Face.stream_audio.
+        :param vad: Drops silence before it is sent. See Audio2Face.stream_audio.
+        :return: True if streaming was successful, False otherwise
+        """
+        if not streaming_installed:
+            raise ImportError(
+                "py_audio2face[streaming] is not installed. "
+                "Please install it via 'pip install py_audio2face[streaming]'"
+            )
+
+        samplerate = get_stream_samplerate(samplerate, normalizer, vad)
+        if normalizer is not None:
+            normalizer.reset()
+        await self.init_a2f(streaming=True)
+        url = f"localhost:{grpc_port}"
+
+        async def request_generator():
+            start_marker = audio2face_pb2.PushAudioRequestStart(
+                samplerate=samplerate,
+                instance_name=instance_name,
+                block_until_playback_is_finished=block_until_playback_is_finished
+            )
+            yield audio2face_pb2.PushAudioStreamRequest(start_marker=start_marker)
+
+            reblocker = AudioReblocker(frame_size)
+            if hasattr(audio_stream, "__aiter__"):
+                async for chunk in audio_stream:
+                    for frame in reblocker.feed(_normalize(chunk, normalizer, vad)):
+                        yield _to_request(frame)
+            else:
+                for chunk in audio_stream:
+                    for frame in reblocker.feed(_normalize(chunk, normalizer, vad)):
+                        yield _to_request(frame)
+            if vad is not None:
+                for frame in reblocker.feed(vad.flush()):
+                    yield _to_request(frame)
+            for frame in reblocker.flush():
+                yield _to_request(frame)
+
+        try:
+            response = await self.get_grpc_channels().get_stub(url).PushAudioStream(request_generator())
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                # the server is gone. Don't reuse the broken connection for the next stream.
+                await self.grpc_channels.invalidate(url)
+            raise
+        return response.success
+
+
+def _normalize(chunk, normalizer: AudioNormalizer = None, vad: VoiceActivityGate = None):
+    if normalizer is not None:
+        chunk = normalizer.process(chunk)
+    if vad is not None:
+        chunk = vad.process(chunk)
+    return chunk
+
+
+def _to_request(frame: bytes) -> audio2face_pb2.PushAudioStreamRequest:
+    return audio2face_pb2.PushAudioStreamRequest(audio_data=frame)
@@ -0,0 +1,103 @@
+from __future__ import annotations  # avoid circular import with import py_audio2face
+import py_audio2face.async_audio2face as aa2f
+
+import asyncio
+
+from py_audio2face.modules.clients._supervisor import HeadlessServerSupervisor
+
+try:
+    import httpx
+    async_installed = True
+except Exception as e:
+    async_installed = False
+
+
+class _A2F_ASYNC_HTTP_CLIENT:
+    @staticmethod
+    def _create_http_client(pool_size: int, timeout: float) -> httpx.AsyncClient:
+        if not async_installed:
+            raise ImportError(
+                "py_audio2face[async] is not installed. "
+                "Please install it via 'pip install py_audio2face[async]'"
+            )
+
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    async def make_request(self: aa2f.AsyncAudio2Face, api_route):
+        url = f"{self.api_url}/{api_route}"
+        try:
+            response = await self.http_client.get(url)
+            res = response.json()
+        except Exception as e:
+            res = str(e)
+            print(f"API {url} call error: {str(e)}")
+
+        return res
+
+    async def post(self: aa2f.AsyncAudio2Face, api_route: str, payload):
+        url = f"{self.api_url}/{api_route}"
+        res = None
+        try:
+            response = await self.http_client.post(url, json=payload)
+            res = response.json()
+        except ValueError as e:
+            print(f"Response of API {url} is not JSON format. Intended?")
+        except Exception as e:
+            res = str(e)
+            print(f"API {url} call error: {str(e)}")
+
+        return res
+
+    async def is_ready(self: aa2f.AsyncAudio2Face) -> bool:
+        """
+        True if the server answers the status route with OK. Like HeadlessServerSupervisor.is_ready a single request
+        with short timeouts, so a server which is down is detected right away.
+        """
+        try:
+            response = await self.http_client.get(f"{self.api_url}/status", timeout=httpx.Timeout(2, connect=0.5))
+            return str(response.json()).lower() == "ok"
+        except (httpx.HTTPError, ValueError):
+            return False
+
+    def get_supervisor(self: aa2f.AsyncAudio2Face) -> HeadlessServerSupervisor:
+        """ See Audio2Face.get_supervisor """
+        if self.supervisor is None:
+            self.supervisor = HeadlessServerSupervisor(
+                a2f_install_path=self.a2f_install_path, api_url=self.api_url,
+                on_restart=lambda ready: setattr(self, "loaded_scene", None)
+            )
+        return self.supervisor
+
+    async def start_headless_server(self: aa2f.AsyncAudio2Face, timeout: float = None):
+        """ See Audio2Face.start_headless_server. The supervisor checks and waits in a worker thread. """
+        # check if already running
+        if await self.is_ready():
+            print("audio2face running")
+            return "OK"
+
+        supervisor = self.get_supervisor()
+        loop = asyncio.get_running_loop()
+        print("wait until audio2face is ready")
+        ready = await loop.run_in_executor(None, lambda: supervisor.start(wait=True, timeout=timeout))
+        self.process_audio2face = supervisor.process
+        status = "OK" if ready else "timeout"
+
+        print(f"status {status}")
+        return status
+
+    def shutdown_a2f(self: aa2f.AsyncAudio2Face):
+        if self.supervisor is not None and self.supervisor.process is not None:
+            self.supervisor.stop()
+            return
+
+        try:
+            self.process_audio2face.kill()
+        except:
+            print("Can't kill a2f process. Was started separately?")
+
+    async def aclose(self: aa2f.AsyncAudio2Face):
+        """ Closes the pooled http connections and the gRPC channels of the client """
+        await self.http_client.aclose()
+        if self.grpc_channels is not None and self._owns_grpc_channels:
+            await self.grpc_channels.close()
@@ -0,0 +1,128 @@
+# Long lived gRPC channels to the streaming players of the headless servers.
+# Opening a channel costs a TCP (and HTTP/2) handshake. Reusing the channel of the last utterance removes it from
+# the time to first audio. Channels are keyed by target, so one pool serves several servers.
+
+import asyncio
+import threading
+
+from py_audio2face.settings import (
+    DEFAULT_GRPC_KEEPALIVE_MS, DEFAULT_GRPC_KEEPALIVE_TIMEOUT_MS, DEFAULT_GRPC_READY_TIMEOUT
+)
+
+try:
+    import grpc
+    import grpc.aio
+    from py_audio2face.modules.clients.grpc_stub import audio2face_pb2_grpc
+    streaming_installed = True
+except Exception as e:
+    streaming_installed = False
+
+
+class GrpcChannelPool:
+    """
+    Pool of persistent gRPC channels, one per target (host:port).
+    A channel is created on first use and kept open with keepalive pings, also between the streams.
+    Channels whose server was unavailable (e.g. because the headless server restarted) are invalidated and replaced
+    on the next get_stub instead of waiting for grpc's reconnect backoff.
+    :param keepalive_ms: Interval of the keepalive pings.
+    :param keepalive_timeout_ms: A ping which isn't answered in this time closes the connection.
+    :param ready_timeout: Default time in seconds warm_up waits for the channel to connect.
+    :param options: Additional grpc channel options as (key, value) tuples.
+    """
+    def __init__(
+            self,
+            keepalive_ms: int = DEFAULT_GRPC_KEEPALIVE_MS,
+            keepalive_timeout_ms: int = DEFAULT_GRPC_KEEPALIVE_TIMEOUT_MS,
+            ready_timeout: float = DEFAULT_GRPC_READY_TIMEOUT,
+            options: list = None
+    ):
+        if not streaming_installed:
+            raise ImportError(
+                "py_audio2face[streaming] is not installed. "
+                "Please install it via 'pip install py_audio2face[streaming]'"
+            )
+
+        self.options = [
+            ("grpc.keepalive_time_ms", keepalive_ms),
+            ("grpc.keepalive_timeout_ms", keepalive_timeout_ms),
+            # ping idle channels too, so a dead connection is noticed before the next stream instead of failing it.
+            # grpc sends at most 2 pings without data (grpc.http2.max_pings_without_data), which servers with default
+            # settings tolerate without answering with GOAWAY.
+            ("grpc.keepalive_permit_without_calls", 1),
+        ] + list(options or [])
+        self.ready_timeout = ready_timeout
+        self.connects = 0  # number of created channels
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _get(self, target: str) -> tuple:
+        """ returns (channel, stub) to target """
+        with self._lock:
+            if target not in self._channels:
+                channel = grpc.insecure_channel(target, options=self.options)
+                self._channels[target] = (channel, audio2face_pb2_grpc.Audio2FaceStub(channel))
+                self.connects += 1
+            return self._channels[target]
+
+    def get_stub(self, target: str):
+        """ returns the Audio2FaceStub of the pooled channel to target """
+        return self._get(target)[1]
+
+    def warm_up(self, target: str, timeout: float = None) -> bool:
+        """
+        Connects the channel to target ahead of the first stream.
+        :return: True if the channel is ready, False if it didn't connect within timeout.
+        """
+        ready = grpc.channel_ready_future(self._get(target)[0])
+        try:
+            ready.result(timeout=timeout or self.ready_timeout)
+            return True
+        except grpc.FutureTimeoutError:
+            ready.cancel()
+            return False
+
+    def invalidate(self, target: str):
+        """ closes the channel to target. The next get_stub opens a new one. """
+        with self._lock:
+            channel, _ = self._channels.pop(target, (None, None))
+            if channel is not None:
+                channel.close()
+
+    def close(self):
+        with self._lock:
+            for channel, _ in self._channels.values():
+                channel.close()
+            self._channels = {}
+
+
+class AsyncGrpcChannelPool(GrpcChannelPool):
+    """
+    grpc.aio counterpart of GrpcChannelPool for AsyncAudio2Face, with the same options.
+    The channels belong to the event loop they were created in, so use a pool from a single loop only.
+    """
+    def _get(self, target: str) -> tuple:
+        """ returns (channel, stub) to target """
+        if target not in self._channels:
+            channel = grpc.aio.insecure_channel(target, options=self.options)
+            self._channels[target] = (channel, audio2face_pb2_grpc.Audio2FaceStub(channel))
+            self.connects += 1
+        return self._channels[target]
+
+    async def warm_up(self, target: str, timeout: float = None) -> bool:
+        """ See GrpcChannelPool.warm_up """
+        try:
+            await asyncio.wait_for(self._get(target)[0].channel_ready(), timeout=timeout or self.ready_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def invalidate(self, target: str):
+        """ closes the channel to target. The next get_stub opens a new one. """
+        channel, _ = self._channels.pop(target, (None, None))
+        if channel is not None:
+            await channel.close()
+
+    async def close(self):
+        channels, self._channels = self._channels, {}
+        for channel, _ in channels.values():
+            await channel.close()
@@ -1,18 +1,17 @@
 from __future__ import annotations  # avoid circular import with import py_audio2face
 import py_audio2face.audio2face as a2f
 
-from subprocess import Popen, CREATE_NEW_CONSOLE
-import time
 import requests
-import os
 from requests import JSONDecodeError
 
+from py_audio2face.modules.clients._supervisor import HeadlessServerSupervisor
+
 
 class _A2F_HTTP_CLIENT:
     def make_request(self: a2f.Audio2Face, api_route):
         url = f"{self.api_url}/{api_route}"
         try:
-            response = requests.get(url)
+            response = self.transport.get(self.api_url, api_route)
             res = response.json()
         except Exception as e:
             res = str(e)
@@ -25,7 +24,7 @@ class _A2F_HTTP_CLIENT:
         url = f"{self.api_url}/{api_route}"
         res = None
         try:
-            response = requests.post(url, json=payload, headers="")
+            response = self.transport.post(self.api_url, api_route, payload=payload)
             res = response.json()
         except JSONDecodeError as e:
             print(f"Response of API {url} is not JSON format. Intended?")
@@ -35,39 +34,66 @@ class _A2F_HTTP_CLIENT:
 
         return res
 
+    def get_request_stats(self: a2f.Audio2Face) -> dict:
+        """
+        Latency statistics of all requests sent so far, aggregated per route.
+        returns {route: {count, errors, retries, total_s, mean_s, min_s, max_s, last_s}}
+        """
+        return self.transport.stats.summary()
 
-    def start_headless_server(self: a2f.Audio2Face):
-        # check if already running
-        status = self.make_request("status")
-        if status == "OK":
-            print("audio2face running")
-            return status
 
-        print("starting audio2face headless")
-        batch_file = f"{self.a2f_install_path}/audio2face_headless.bat"
-        if not os.path.isfile(batch_file):
-            raise ValueError(f"audio2face_headless.bat not found in {self.a2f_install_path}. Is audio2face installed?")
+    def is_ready(self: a2f.Audio2Face) -> bool:
+        """
+        True if the server answers the status route with OK. Like HeadlessServerSupervisor.is_ready a single request
+        with short timeouts and no retries, so a server which is down is detected right away.
+        """
+        try:
+            response = self.transport.session.get(f"{self.api_url}/status", timeout=(0.5, 2))
+            return str(response.json()).lower() == "ok"
+        except (requests.RequestException, ValueError):
+            return False
 
-        self.process_audio2face = Popen(batch_file, universal_newlines=True, creationflags=CREATE_NEW_CONSOLE)
+    def get_supervisor(self: a2f.Audio2Face) -> HeadlessServerSupervisor:
+        """ the supervisor which starts and restarts the headless server. Created on first use. """
+        if self.supervisor is None:
+            self.supervisor = HeadlessServerSupervisor(
+                a2f_install_path=self.a2f_install_path, api_url=self.api_url,
+                on_restart=lambda ready: self.server_state.invalidate()
+            )
+        return self.supervisor
+
+    def start_headless_server(self: a2f.Audio2Face, timeout: float = None):
+        """
+        Starts the headless server if it isn't running and waits until it answers.
+        The process is managed by get_supervisor(): its output is captured (see supervisor.logs()) and it is restarted
+        if it crashes. Pass Audio2Face(supervisor=...) to configure the start script, log file or restarts.
+        :param timeout: Seconds to wait for the server. Defaults to the supervisor's startup_timeout.
+        :return: "OK" or "timeout"
+        """
+        # check if already running. One status request, the transport would retry it with backoff.
+        supervisor = self.get_supervisor()
+        if supervisor.is_ready():
+            print("audio2face running")
+            return "OK"
+
+        # a fresh server has nothing loaded
+        self.server_state.invalidate()
 
         print("wait until audio2face is ready")
-        start_open = time.time()
-        # not managed to print the console output in pipe don't know why it doesnt work.
-        # TODO: make it with subprocess call..
-        while True:
-            status = self.make_request("status")
-            if str(status).lower() == "ok":
-                break
-            elif int(time.time() - start_open) >= 60:
-                status = "timeout"
-                break
-            else:
-                time.sleep(0.5)
+        ready = supervisor.start(wait=True, timeout=timeout)
+        self.process_audio2face = supervisor.process
+        status = "OK" if ready else "timeout"
+        if ready:
+            print(f"audio2face ready after {supervisor.startup_seconds:.2f}s")
 
         print(f"status {status}")
         return status
 
     def shutdown_a2f(self: a2f.Audio2Face):
+        if self.supervisor is not None and self.supervisor.process is not None:
+            self.supervisor.stop()
+            return
+
         try:
             self.process_audio2face.kill()
         except:
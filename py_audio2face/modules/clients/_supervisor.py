@@ -0,0 +1,229 @@
+# Starts the Audio2Face headless server as a child process and keeps it alive.
+# The output of the server is captured instead of disappearing in a new console. Log markers like "app ready" tell
+# when the server is about to answer, so the status route is checked right then instead of on a fixed 0.5 s grid.
+# Until a marker shows up the status is polled with a growing interval. A crashed server is restarted.
+
+import collections
+import os
+import signal
+import subprocess
+import threading
+import time
+
+import requests
+
+from py_audio2face.settings import (
+    DEFAULT_HEADLESS_STARTUP_TIMEOUT, DEFAULT_HEADLESS_READY_MARKERS, DEFAULT_HEADLESS_POLL_INTERVAL,
+    DEFAULT_HEADLESS_MAX_RESTARTS
+)
+
+
+def default_headless_script(a2f_install_path: str) -> str:
+    """ the headless start script of an Audio2Face installation for the current OS """
+    script = "audio2face_headless.bat" if os.name == "nt" else "audio2face_headless.sh"
+    return os.path.join(a2f_install_path, script)
+
+
+class HeadlessServerSupervisor:
+    """
+    :param command: The start command as list or string, e.g. [script] or [sys.executable, "-m", ...].
+        Defaults to the headless script of a2f_install_path.
+    :param a2f_install_path: Audio2Face installation directory. Used if no command is given.
+    :param api_url: REST endpoint of the server. Its status route confirms the readiness.
+    :param log_file: Optional file the server output is appended to.
+    :param log_lines: Number of output lines kept in memory, see logs().
+    :param ready_markers: Substrings of log lines after which the server is checked immediately.
+    :param startup_timeout: Seconds until a started server has to answer the status route.
+    :param poll_interval: (min, max) seconds between status checks. The interval grows from min to max while
+        nothing happens and drops back to min on a ready marker.
+    :param auto_restart: Restart the server if its process exits without stop().
+    :param max_restarts: Maximum number of automatic restarts.
+    :param on_log: Optional callback(line) for every output line.
+    :param on_restart: Optional callback(ready: bool) after an automatic restart, e.g. to invalidate client state.
+    :param env, cwd: Environment and working directory of the process.
+    """
+    def __init__(
+            self,
+            command=None,
+            a2f_install_path: str = None,
+            api_url: str = "http://localhost:8011",
+            log_file: str = None,
+            log_lines: int = 1000,
+            ready_markers: tuple = DEFAULT_HEADLESS_READY_MARKERS,
+            startup_timeout: float = DEFAULT_HEADLESS_STARTUP_TIMEOUT,
+            poll_interval: tuple = DEFAULT_HEADLESS_POLL_INTERVAL,
+            auto_restart: bool = True,
+            max_restarts: int = DEFAULT_HEADLESS_MAX_RESTARTS,
+            on_log=None,
+            on_restart=None,
+            env: dict = None,
+            cwd: str = None
+    ):
+        if command is None:
+            if a2f_install_path is None:
+                raise ValueError("Either command or a2f_install_path is required")
+            command = [default_headless_script(a2f_install_path)]
+        self.command = command
+        self.api_url = api_url
+        self.log_file = log_file
+        self.ready_markers = tuple(ready_markers)
+        self.startup_timeout = startup_timeout
+        self.poll_interval = poll_interval
+        self.auto_restart = auto_restart
+        self.max_restarts = max_restarts
+        self.on_log = on_log
+        self.on_restart = on_restart
+        self.env = env
+        self.cwd = cwd
+
+        self.process = None
+        self.restarts = 0
+        self.startup_seconds = None  # duration of the last start until the server was ready
+        self._logs = collections.deque(maxlen=log_lines)
+        self._marker = threading.Event()
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._watchdog = None
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def is_ready(self) -> bool:
+        """ True if the server answers the status route with OK """
+        try:
+            response = requests.get(f"{self.api_url}/status", timeout=(0.5, 2))
+            return str(response.json()).lower() == "ok"
+        except (requests.RequestException, ValueError):
+            return False
+
+    def logs(self, n: int = None) -> list:
+        """ the last n captured output lines of the server """
+        lines = list(self._logs)
+        return lines if n is None else lines[-n:]
+
+    def start(self, wait: bool = True, timeout: float = None) -> bool:
+        """
+        Launches the server unless it is running already.
+        :param wait: Wait until the server is ready.
+        :param timeout: Seconds to wait. Defaults to startup_timeout.
+        :return: True if the server is ready (always True with wait=False once it was launched).
+        """
+        with self._lock:
+            self._stopping = False
+            if not self.is_running():
+                self._launch()
+            if self.auto_restart and (self._watchdog is None or not self._watchdog.is_alive()):
+                self._watchdog = threading.Thread(target=self._watch, daemon=True)
+                self._watchdog.start()
+        return self.wait_ready(timeout) if wait else True
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """ Waits until the status route answers. Returns False on timeout or if the process exited. """
+        start = time.perf_counter()
+        deadline = start + (timeout if timeout is not None else self.startup_timeout)
+        interval = self.poll_interval[0]
+        while True:
+            if self.is_ready():
+                self.startup_seconds = time.perf_counter() - start
+                return True
+            if not self.is_running():
+                print(f"audio2face exited with code {self.process.poll() if self.process else None}")
+                return False
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False
+
+            if self._marker.wait(min(interval, remaining)):
+                # the server announced itself. Check right away and keep checking fast.
+                self._marker.clear()
+                interval = self.poll_interval[0]
+            else:
+                interval = min(interval * 1.5, self.poll_interval[1])
+
+    def stop(self, timeout: float = 10):
+        """ Stops the server and its child processes. No restart follows. """
+        with self._lock:
+            self._stopping = True
+            process = self.process
+        if process is None or process.poll() is not None:
+            return
+
+        _terminate_tree(process)
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            _terminate_tree(process, kill=True)
+            process.wait()
+
+    def _launch(self):
+        """ starts the process and the thread reading its output """
+        command = self.command
+        if isinstance(command, str):
+            command = [command]
+        if not os.path.isfile(command[0]) and os.path.sep in command[0]:
+            raise ValueError(f"{command[0]} not found. Is audio2face installed?")
+
+        kwargs = {}
+        if os.name == "nt":
+            # own process group, so the console's ctrl+c doesn't reach the server and the tree can be stopped
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+
+        print(f"starting audio2face headless: {' '.join(command)}")
+        self._marker.clear()
+        self.process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            universal_newlines=True, errors="replace", bufsize=1, env=self.env, cwd=self.cwd, **kwargs
+        )
+        threading.Thread(target=self._read_output, args=(self.process,), daemon=True).start()
+
+    def _read_output(self, process: subprocess.Popen):
+        log_file = open(self.log_file, "a", encoding="utf-8") if self.log_file else None
+        try:
+            for line in process.stdout:
+                line = line.rstrip("\r\n")
+                self._logs.append(line)
+                if log_file is not None:
+                    log_file.write(line + "\n")
+                    log_file.flush()
+                if any(marker in line for marker in self.ready_markers):
+                    self._marker.set()
+                if self.on_log is not None:
+                    self.on_log(line)
+        finally:
+            if log_file is not None:
+                log_file.close()
+
+    def _watch(self):
+        """ restarts the server whenever its process exits without stop() """
+        while True:
+            process = self.process
+            process.wait()
+            with self._lock:
+                if self._stopping or process is not self.process:
+                    if self._stopping:
+                        return
+                    continue
+                if self.restarts >= self.max_restarts:
+                    print(f"audio2face exited with code {process.returncode}. Giving up after {self.restarts} restarts.")
+                    return
+                self.restarts += 1
+                print(f"audio2face exited with code {process.returncode}. Restart {self.restarts}/{self.max_restarts}")
+                self._launch()
+
+            ready = self.wait_ready()
+            if self.on_restart is not None:
+                self.on_restart(ready)
+
+
+def _terminate_tree(process: subprocess.Popen, kill: bool = False):
+    """ the start scripts spawn the actual server. Stop the whole process tree, not only the script. """
+    try:
+        if os.name == "nt":
+            args = ["taskkill", "/T", "/PID", str(process.pid)] + (["/F"] if kill else [])
+            subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+    except (OSError, ProcessLookupError):
+        pass
@@ -0,0 +1,181 @@
+# The transport is the layer below _A2F_HTTP_CLIENT that actually talks to the headless server.
+# It keeps one pooled keep-alive session for all routes, applies per-route timeouts, retries idempotent calls
+# with exponential backoff and records the latency of every request.
+# Replace it by passing your own subclass to Audio2Face(transport=...) e.g. to add auth headers or tracing.
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+from py_audio2face.settings import (
+    DEFAULT_HTTP_POOL_SIZE, DEFAULT_HTTP_TIMEOUT, DEFAULT_HTTP_ROUTE_TIMEOUTS,
+    DEFAULT_HTTP_RETRIES, DEFAULT_HTTP_RETRY_BACKOFF
+)
+
+# Routes which leave the server in the same state no matter how often they are sent. Only these are retried.
+# GenerateKeys and ExportBlendshapes are deliberately missing: they are expensive and a retry after a read timeout
+# would run the solver a second time while the first run may still be in progress. USD/Load is missing for the same
+# reason: a retry after a read timeout starts a second scene load on top of the first one.
+IDEMPOTENT_ROUTES = {
+    "status",
+    "A2F/GetInstances",
+    "A2F/Player/SetRootPath",
+    "A2F/Player/SetTrack",
+    "A2F/Player/SetFrame",
+    "A2F/A2E/SetSettings",
+    "A2F/A2E/SetEmotion",
+    "A2F/A2E/GetEmotion",
+    "A2F/A2E/GetEmotionNames",
+    "A2F/A2E/EnableAutoGenerateOnTrackChange",
+}
+
+# HTTP status codes which indicate a temporary server problem
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class RouteStats:
+    """ Aggregated latency of all requests sent to one route """
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, latency: float, error: bool = False):
+        self.count += 1
+        self.errors += int(error)
+        self.total += latency
+        self.last = latency
+        self.min = latency if self.min is None else min(self.min, latency)
+        self.max = latency if self.max is None else max(self.max, latency)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "total_s": self.total,
+            "mean_s": self.mean,
+            "min_s": self.min,
+            "max_s": self.max,
+            "last_s": self.last,
+        }
+
+
+class TransportStats:
+    """ Per route latency statistics of a transport. Thread safe. """
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, latency: float, error: bool = False, retries: int = 0):
+        with self._lock:
+            stats = self.routes.setdefault(route, RouteStats())
+            stats.add(latency, error)
+            stats.retries += retries
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+    def summary(self) -> dict:
+        """ returns {route: {count, errors, retries, total_s, mean_s, min_s, max_s, last_s}} """
+        with self._lock:
+            return {route: stats.to_dict() for route, stats in self.routes.items()}
+
+
+class A2FTransport:
+    """
+    Pooled keep-alive HTTP transport for the Audio2Face headless server.
+    :param pool_size: Maximum number of kept-alive connections to the server.
+    :param timeout: Default timeout in seconds. Either a float or a (connect, read) tuple.
+    :param route_timeouts: Timeouts for single routes, overriding the default timeout. {route: timeout}
+    :param retries: How often idempotent routes are retried on connection errors, timeouts and 502/503/504.
+    :param backoff: Base delay in seconds of the exponential backoff between retries (backoff * 2 ** attempt).
+    :param on_request: Optional callback(method, route, latency_s, status_code) invoked after each request.
+        status_code is None if the request failed without a response.
+    """
+    def __init__(
+            self,
+            pool_size: int = DEFAULT_HTTP_POOL_SIZE,
+            timeout=DEFAULT_HTTP_TIMEOUT,
+            route_timeouts: dict = None,
+            retries: int = DEFAULT_HTTP_RETRIES,
+            backoff: float = DEFAULT_HTTP_RETRY_BACKOFF,
+            on_request=None
+    ):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.route_timeouts = dict(DEFAULT_HTTP_ROUTE_TIMEOUTS)
+        self.route_timeouts.update(route_timeouts or {})
+        self.retries = retries
+        self.backoff = backoff
+        self.on_request = on_request
+        self.stats = TransportStats()
+        self.session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        # retries are handled per route in request(), not by urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_timeout(self, route: str):
+        return self.route_timeouts.get(route, self.timeout)
+
+    def is_idempotent(self, method: str, route: str) -> bool:
+        return method.upper() == "GET" or route in IDEMPOTENT_ROUTES
+
+    def request(self, method: str, base_url: str, route: str, payload=None) -> requests.Response:
+        """
+        Sends a request to {base_url}/{route} and returns the response.
+        Raises the last requests exception if all attempts failed.
+        """
+        url = f"{base_url}/{route}"
+        attempts = 1 + (self.retries if self.is_idempotent(method, route) else 0)
+        timeout = self.get_timeout(route)
+
+        start = time.perf_counter()
+        response = None
+        for attempt in range(attempts):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = self.session.request(method, url, json=payload, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == attempts - 1:
+                    self._report(method, route, start, None, attempt)
+                    raise
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES:
+                break
+
+        self._report(method, route, start, response.status_code, attempt)
+        return response
+
+    def _report(self, method: str, route: str, start: float, status_code, retries: int):
+        latency = time.perf_counter() - start
+        error = status_code is None or status_code >= 400
+        self.stats.record(route, latency, error=error, retries=retries)
+        if self.on_request is not None:
+            self.on_request(method, route, latency, status_code)
+
+    def get(self, base_url: str, route: str) -> requests.Response:
+        return self.request("GET", base_url, route)
+
+    def post(self, base_url: str, route: str, payload=None) -> requests.Response:
+        return self.request("POST", base_url, route, payload=payload)
+
+    def close(self):
+        self.session.close()
@@ -7,7 +7,8 @@ ASSETS_DIR = os.path.join(ROOT_DIR, "assets")
 
 APP_DATA_DIR = os.getenv('LOCALAPPDATA')
 #C:\Users\MOO\AppData\Local\ov\pkg\audio2face-2023.2.0
-print("LOCALAPPDATA:"+APP_DATA_DIR)
+if APP_DATA_DIR is not None:  # only set on windows
+    print("LOCALAPPDATA:"+APP_DATA_DIR)
 
 DEFAULT_PLAYER_INSTANCE = "/World/audio2face/Player"
 DEFAULT_SOLVER_INSTANCE = "/World/audio2face/BlendshapeSolve"
@@ -15,3 +16,26 @@ DEFAULT_A2E_INSTANCE = "/World/audio2face/CoreFullface"
 
 DEFAULT_AUDIO_STREAM_PLAYER_INSTANCE = "/World/audio2face/PlayerStreaming"
 DEFAULT_AUDIO_STREAM_GRPC_PORT = 50051
+DEFAULT_GRPC_MAX_AUDIO_BYTES = 4 * 1024 * 1024 - 1024  # grpc's default 4 MB message limit minus room for the envelope
+DEFAULT_GRPC_KEEPALIVE_MS = 20000  # keepalive ping interval of the streaming channels
+DEFAULT_GRPC_KEEPALIVE_TIMEOUT_MS = 10000
+DEFAULT_GRPC_READY_TIMEOUT = 5  # seconds the warm up waits for a channel to connect
+DEFAULT_UNARY_MAX_SECONDS = 2.0  # send_audio sends complete clips up to this length with one PushAudio call
+
+# HTTP transport to the headless server
+DEFAULT_HTTP_POOL_SIZE = 10  # max kept-alive connections
+DEFAULT_HTTP_TIMEOUT = (5, 60)  # (connect, read) timeout in seconds
+DEFAULT_HTTP_ROUTE_TIMEOUTS = {  # routes that are much faster or slower than the default
+    "status": (1, 2),
+    "A2F/USD/Load": (5, 300),
+    "A2F/A2E/GenerateKeys": (5, 1800),
+    "A2F/Exporter/ExportBlendshapes": (5, 1800),
+}
+DEFAULT_HTTP_RETRIES = 3  # only idempotent routes are retried
+DEFAULT_HTTP_RETRY_BACKOFF = 0.2  # seconds, doubled with every retry
+
+# Supervisor of the headless server process
+DEFAULT_HEADLESS_STARTUP_TIMEOUT = 60  # seconds until a started server has to answer the status route
+DEFAULT_HEADLESS_READY_MARKERS = ("app ready", "Uvicorn running on")  # log lines printed when the server is up
+DEFAULT_HEADLESS_POLL_INTERVAL = (0.05, 1.0)  # (min, max) seconds between status checks during the startup
+DEFAULT_HEADLESS_MAX_RESTARTS = 3  # automatic restarts of a crashed server
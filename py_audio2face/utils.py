@@ -1,5 +1,7 @@
 import os
 import glob
+import hashlib
+import struct
 import importlib_resources
 from py_audio2face.settings import APP_DATA_DIR
 
@@ -24,6 +26,25 @@ def get_files_in_dir(path: str, extensions: list = None) -> list:
     return files
 
 
+def hash_file(file_path: str) -> str:
+    """ sha256 hex digest of the file content """
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def is_ok_response(response) -> bool:
+    """ returns True if the headless server answered with {"status": "OK", ...} """
+    return isinstance(response, dict) and response.get("status") == "OK"
+
+
+def get_export_file_path(output_path: str, format: str = "usd") -> str:
+    """ The blendshape exporter appends _bsweight and the format to the requested file name """
+    return f"{output_path}_bsweight.{format}"
+
+
 def get_audio2face_install_path():
     """
     Get the newest installed audio2face installation path from the default location (in AppData)
@@ -33,6 +54,10 @@ def get_audio2face_install_path():
     # get users appdata dir
     # update to audio2face-2023.2.0
 
+    if APP_DATA_DIR is None:
+        print("LOCALAPPDATA is not set. Please specify the audio2face installation path manually.")
+        return None
+
     # get installed versions:
     audio2face_install_dir = os.path.join(APP_DATA_DIR, "ov/pkg/")
     installed_versions = [
@@ -58,6 +83,33 @@ def get_audio2face_install_path():
     return os.path.join(audio2face_install_dir, newest_version)
 
 
+def get_wav_duration(file_path: str) -> float:
+    """
+    Returns the duration of a wav file in seconds. Reads only the RIFF header, so it works for any sample format
+    including float wavs which the wave module can't open.
+    """
+    with open(file_path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{file_path} is not a wav file")
+
+        byte_rate = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{file_path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            elif chunk_id == b"data":
+                if byte_rate is None:
+                    raise ValueError(f"{file_path} has no fmt chunk before its data chunk")
+                return chunk_size / byte_rate
+            else:
+                f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
 def get_mark_usd_file_path(streaming = False) -> str:
     if not streaming:
         usd_file_path = importlib_resources.files('py_audio2face') / 'assets' / 'mark_arkit_solved_default.usd'
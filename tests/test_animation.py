@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from py_audio2face.animation import (
+    load_animation, resample_animation, save_animation, resample_file, BlendshapeAnimation, SIDECAR_SUFFIX
+)
+from py_audio2face.fake_server import write_blendshape_export, ARKIT_BLENDSHAPE_NAMES
+from py_audio2face.settings import ASSETS_DIR
+
+USD_EXPORT = os.path.join(ASSETS_DIR, "output_bsweight.usd")
+
+try:
+    import pxr
+    usd_installed = True
+except ImportError:
+    usd_installed = False
+
+
+class TestLoadAnimation(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_json(self):
+        path = os.path.join(self.tmp.name, "clip_bsweight.json")
+        write_blendshape_export(path, fps=30, duration=2.0)
+        with open(path) as f:
+            expected = np.array(json.load(f)["weightMat"], dtype=np.float32)
+
+        animation = load_animation(path)
+        self.assertEqual(animation.weights.shape, (61, len(ARKIT_BLENDSHAPE_NAMES)))
+        self.assertEqual(animation.weights.dtype, np.float32)
+        self.assertEqual((animation.fps, animation.names), (30, ARKIT_BLENDSHAPE_NAMES))
+        np.testing.assert_array_equal(animation["jawOpen"], expected[:, ARKIT_BLENDSHAPE_NAMES.index("jawOpen")])
+
+    def test_sidecar_is_memory_mapped_and_invalidated(self):
+        path = os.path.join(self.tmp.name, "clip_bsweight.json")
+        write_blendshape_export(path, fps=30, duration=1.0)
+        first = load_animation(path)
+        self.assertTrue(os.path.isfile(path + SIDECAR_SUFFIX))
+
+        cached = load_animation(path)
+        self.assertIsInstance(cached.weights, np.memmap)
+        np.testing.assert_array_equal(cached.weights, first.weights)
+
+        write_blendshape_export(path, fps=30, duration=2.0)
+        self.assertEqual(load_animation(path).n_frames, 61)
+
+    @unittest.skipUnless(usd_installed, "usd-core is not installed")
+    def test_usd(self):
+        path = shutil.copy(USD_EXPORT, self.tmp.name)
+        animation = load_animation(path)
+        self.assertEqual(animation.weights.shape, (563, len(animation.names)))
+        self.assertEqual(animation.fps, 60)
+        self.assertIn("jawOpen", animation.names)
+        self.assertGreater(animation["jawOpen"].max(), 0.0)
+
+
+class TestResampleAnimation(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        t = np.arange(61, dtype=np.float32) / 60
+        self.animation = BlendshapeAnimation(
+            np.stack([t, 0.5 + 0.4 * np.sin(2 * np.pi * t)], axis=1).astype(np.float32), ["a", "b"], 60
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_linear_keeps_common_frames(self):
+        resampled = resample_animation(self.animation, 30)
+        self.assertEqual((resampled.n_frames, resampled.fps), (31, 30))
+        self.assertEqual(resampled.weights.dtype, np.float32)
+        np.testing.assert_allclose(resampled.weights, self.animation.weights[::2], atol=1e-6)
+
+        upsampled = resample_animation(self.animation, 120)
+        self.assertEqual(upsampled.n_frames, 121)
+        np.testing.assert_allclose(upsampled["a"], np.arange(121) / 120, atol=1e-6)
+
+    def test_cubic(self):
+        resampled = resample_animation(self.animation, 24, method="cubic")
+        self.assertEqual(resampled.n_frames, 25)
+        expected = 0.5 + 0.4 * np.sin(2 * np.pi * np.arange(25) / 24)
+        np.testing.assert_allclose(resampled["b"], expected, atol=1e-3)
+        self.assertLessEqual(resampled["b"].max(), self.animation["b"].max())
+        with self.assertRaises(ValueError):
+            resample_animation(self.animation, 24, method="nearest")
+
+    def test_json_round_trip(self):
+        source = os.path.join(self.tmp.name, "clip_bsweight.json")
+        write_blendshape_export(source, fps=60, duration=1.0)
+        output = resample_file(source, os.path.join(self.tmp.name, "clip_30_bsweight.json"), 30)
+        animation = load_animation(output, cache=False)
+        self.assertEqual((animation.n_frames, animation.fps), (31, 30))
+        self.assertEqual(animation.names, ARKIT_BLENDSHAPE_NAMES)
+        with open(output) as f:
+            self.assertEqual(json.load(f)["numFrames"], 31)
+
+    @unittest.skipUnless(usd_installed, "usd-core is not installed")
+    def test_usd_round_trip(self):
+        path = os.path.join(self.tmp.name, "clip_bsweight.usd")
+        for fps in (30, 24):  # overwrites the existing file the second time
+            save_animation(resample_animation(load_animation(USD_EXPORT, cache=False), fps), path)
+            animation = load_animation(path, cache=False)
+            self.assertEqual(animation.fps, fps)
+            self.assertEqual(animation.n_frames, int(562 / 60 * fps) + 1)
+            self.assertIn("jawOpen", animation.names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules._animation_cache import AnimationCache
+from py_audio2face.settings import ASSETS_DIR
+from py_audio2face import utils
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+
+
+class TestAnimationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeAudio2FaceServer().start()
+        self.cache = AnimationCache(os.path.join(self.tmp.name, "cache"))
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused", cache=self.cache)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def _out(self, name: str) -> str:
+        return os.path.join(self.tmp.name, "out", name)
+
+    def test_hit_skips_server(self):
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("first"), format="json")
+        self.server.reset()
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("second"), format="json")
+
+        self.assertEqual(self.server.requests, {})
+        with open(utils.get_export_file_path(self._out("first"), "json")) as a, \
+                open(utils.get_export_file_path(self._out("second"), "json")) as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_relative_output_path(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            miss = self.a2f.audio2face_single(SAMPLE_AUDIO, "relative", format="json")
+            os.remove(utils.get_export_file_path(miss, "json"))
+            hit = self.a2f.audio2face_single(SAMPLE_AUDIO, "relative", format="json")
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(hit, miss)
+        self.assertEqual(hit, os.path.join(os.path.realpath(self.tmp.name), "relative"))
+        self.assertTrue(os.path.isfile(utils.get_export_file_path(hit, "json")))
+
+    def test_settings_are_part_of_the_key(self):
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("a"), fps=60)
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("b"), fps=30)
+        self.a2f.set_emotion(joy=1.0)
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("c"), fps=30)
+        self.assertEqual(self.server.requests["A2F/Exporter/ExportBlendshapes"], 3)
+        self.assertEqual(self.cache.stats()["misses"], 3)
+
+    def test_unknown_server_emotion_skips_the_cache(self):
+        self.a2f.set_emotion(joy=1.0)
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("a"))
+        # after a restart the server may have lost the emotion. Neither read nor write the cache.
+        self.a2f.invalidate_state()
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("b"))
+        self.assertEqual(self.server.requests["A2F/Exporter/ExportBlendshapes"], 2)
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+        self.a2f.set_emotion(joy=1.0)
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("c"))
+        self.assertEqual(self.server.requests["A2F/Exporter/ExportBlendshapes"], 2)
+
+    def test_folder_animates_identical_audio_once(self):
+        folder = os.path.join(self.tmp.name, "in")
+        os.makedirs(folder)
+        shutil.copy(SAMPLE_AUDIO, os.path.join(folder, "line_a.wav"))
+        shutil.copy(SAMPLE_AUDIO, os.path.join(folder, "line_b.wav"))
+
+        outputs = self.a2f.audio2face_folder(folder, os.path.join(self.tmp.name, "out"))
+        self.assertEqual(self.server.requests["A2F/Exporter/ExportBlendshapes"], 1)
+        for output in outputs:
+            self.assertTrue(os.path.isfile(utils.get_export_file_path(output, "usd")))
+
+    def test_index_is_written_in_batches(self):
+        index_file = os.path.join(self.cache.cache_dir, AnimationCache.INDEX_FILE)
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("a"), format="json")
+        for name in "bcd":
+            self.a2f.audio2face_single(SAMPLE_AUDIO, self._out(name), format="json")
+        self.assertFalse(os.path.exists(index_file))
+        self.assertEqual(self.cache.stats()["hits"], 3)
+
+        # entries which weren't flushed yet are found again from their files
+        self.assertEqual(AnimationCache(self.cache.cache_dir).stats()["entries"], 1)
+        self.a2f.close()
+        self.assertTrue(os.path.isfile(index_file))
+
+    def test_lru_eviction(self):
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("a"), format="json")
+        size = self.cache.stats()["bytes"]
+        self.cache.max_bytes = int(size * 1.5)
+        self.a2f.audio2face_single(SAMPLE_AUDIO, self._out("b"), fps=59, format="json")
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["entries"], stats["evictions"]), (1, 1))
+        # the index survives a restart
+        self.assertEqual(AnimationCache(self.cache.cache_dir).stats()["entries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from py_audio2face.animation import load_animation
+from py_audio2face.animation_pipeline import (
+    AnimationPipeline, PipelineStage, Gain, Clamp, Smooth, Retarget, BlinkInjection
+)
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer, ARKIT_BLENDSHAPE_NAMES
+from py_audio2face.modules._animation_cache import AnimationCache
+from py_audio2face.settings import ASSETS_DIR
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+USD_EXPORT = os.path.join(ASSETS_DIR, "output_bsweight.usd")
+NAMES = ARKIT_BLENDSHAPE_NAMES
+
+try:
+    import pxr
+    usd_installed = True
+except ImportError:
+    usd_installed = False
+
+
+class TestPipelineStages(unittest.TestCase):
+
+    def setUp(self):
+        self.weights = np.random.default_rng(0).random((120, len(NAMES)), dtype=np.float32)
+
+    def column(self, weights, name):
+        return weights[:, NAMES.index(name)]
+
+    def test_gain_and_clamp(self):
+        result = AnimationPipeline(Gain({"jawOpen": 2.0}, default=0.5), Clamp(0.0, 1.0)).process(self.weights, NAMES, 60)
+        np.testing.assert_allclose(self.column(result, "jawOpen"), np.minimum(self.column(self.weights, "jawOpen") * 2, 1))
+        np.testing.assert_allclose(self.column(result, "mouthClose"), self.column(self.weights, "mouthClose") * 0.5)
+        # process doesn't touch the input unless asked to
+        self.assertFalse(np.shares_memory(result, self.weights))
+
+    def test_retarget(self):
+        retarget = Retarget({"mouthClose": {"jawOpen": 0.5}, "jawOpen": {"jawOpen": 0.8, "mouthFunnel": 0.1}})
+        result = AnimationPipeline(retarget).process(self.weights, NAMES, 60)
+        jaw, funnel = self.column(self.weights, "jawOpen"), self.column(self.weights, "mouthFunnel")
+        # all targets are computed from the input weights
+        np.testing.assert_allclose(self.column(result, "mouthClose"), 0.5 * jaw, atol=1e-6)
+        np.testing.assert_allclose(self.column(result, "jawOpen"), 0.8 * jaw + 0.1 * funnel, atol=1e-6)
+
+        added = AnimationPipeline(Retarget({"mouthClose": {"jawOpen": 0.5}}, mode="add")).process(self.weights, NAMES, 60)
+        np.testing.assert_allclose(
+            self.column(added, "mouthClose"), self.column(self.weights, "mouthClose") + 0.5 * jaw, atol=1e-6
+        )
+
+    def test_smooth_selected_shapes(self):
+        result = AnimationPipeline(Smooth(2.0, shapes=["jawOpen"])).process(self.weights, NAMES, 60)
+        np.testing.assert_array_equal(self.column(result, "mouthClose"), self.column(self.weights, "mouthClose"))
+        self.assertLess(np.abs(np.diff(self.column(result, "jawOpen"))).mean(),
+                        np.abs(np.diff(self.column(self.weights, "jawOpen"))).mean())
+
+    def test_blink_injection(self):
+        weights = np.zeros((60 * 20, len(NAMES)), dtype=np.float32)
+        blinks = BlinkInjection(interval=4.0, jitter=1.0, duration=0.2)
+        result = AnimationPipeline(blinks).process(weights, NAMES, 60, out=weights)
+        self.assertIs(result, weights)
+
+        left = self.column(result, "eyeBlinkLeft")
+        np.testing.assert_array_equal(left, self.column(result, "eyeBlinkRight"))
+        peaks = np.flatnonzero((left[1:-1] > left[:-2]) & (left[1:-1] >= left[2:]))
+        self.assertTrue(3 <= len(peaks) <= 7)
+        self.assertAlmostEqual(left.max(), 1.0, places=2)
+        self.assertEqual(self.column(result, "jawOpen").max(), 0.0)
+
+    def test_stages_must_implement_apply(self):
+        class Incomplete(PipelineStage):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_throughput(self):
+        pipeline = AnimationPipeline(
+            Gain({"jawOpen": 0.8}), Retarget({"mouthClose": {"jawOpen": 0.2}}, mode="add"),
+            Smooth(1.5), BlinkInjection(), Clamp()
+        )
+        clip = np.random.default_rng(1).random((300, len(NAMES)), dtype=np.float32)  # 5 s at 60 fps
+        out = np.empty_like(clip)
+        start = time.perf_counter()
+        for _ in range(500):
+            pipeline.process(clip, NAMES, 60, out=out)
+        # thousands of clips per minute: 500 clips in well under 10 s
+        self.assertLess(time.perf_counter() - start, 10.0)
+
+
+class TestPipelineExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.a2f.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_single_export(self):
+        output = os.path.join(self.tmp.name, "anim")
+        self.a2f.audio2face_single(SAMPLE_AUDIO, output, format="json", emotion_auto_detect=False)
+        raw = load_animation(output + "_bsweight.json", cache=False)
+
+        pipeline = AnimationPipeline(Gain(0.5))
+        self.a2f.audio2face_single(SAMPLE_AUDIO, output, format="json", emotion_auto_detect=False, postprocess=pipeline)
+        processed = load_animation(output + "_bsweight.json", cache=False)
+        np.testing.assert_allclose(processed.weights, raw.weights * 0.5, atol=1e-6)
+
+    def test_cache_hit_and_miss_return_the_same_path(self):
+        self.a2f.cache = AnimationCache(os.path.join(self.tmp.name, "cache"))
+        pipeline = AnimationPipeline(Gain(0.5))
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            miss = self.a2f.audio2face_single(SAMPLE_AUDIO, "anim", format="json", postprocess=pipeline)
+            hit = self.a2f.audio2face_single(SAMPLE_AUDIO, "anim", format="json", postprocess=pipeline)
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(self.a2f.cache.stats()["hits"], 1)
+        self.assertEqual(hit, miss)
+        self.assertTrue(os.path.isabs(hit))
+        self.assertTrue(os.path.isfile(hit + "_bsweight.json"))
+
+    def test_folder_manifest_tracks_the_pipeline(self):
+        input_folder = os.path.join(self.tmp.name, "in")
+        output_folder = os.path.join(self.tmp.name, "out")
+        os.makedirs(input_folder)
+        for i in range(2):
+            shutil.copy(SAMPLE_AUDIO, os.path.join(input_folder, f"line_{i}.wav"))
+
+        def run(pipeline):
+            self.server.reset()
+            self.a2f.invalidate_state()
+            self.a2f.audio2face_folder(input_folder, output_folder, format="json", postprocess=pipeline)
+            return self.server.requests.get("A2F/Exporter/ExportBlendshapes", 0)
+
+        self.assertEqual(run(AnimationPipeline(Clamp(0.0, 0.1))), 2)
+        animation = load_animation(os.path.join(output_folder, "line_0_a2f_animation_bsweight.json"), cache=False)
+        self.assertLessEqual(animation.weights.max(), 0.1)
+        self.assertEqual(run(AnimationPipeline(Clamp(0.0, 0.1))), 0)
+        self.assertEqual(run(AnimationPipeline(Clamp(0.0, 0.2))), 2)
+
+    @unittest.skipUnless(usd_installed, "usd-core is not installed")
+    def test_usd_in_place_keeps_the_rest_of_the_export(self):
+        path = shutil.copy(USD_EXPORT, self.tmp.name)
+        raw = load_animation(path, cache=False)
+        AnimationPipeline(Gain(0.5)).process_file(path)
+
+        processed = load_animation(path, cache=False)
+        np.testing.assert_allclose(processed.weights, raw.weights * 0.5, atol=1e-6)
+        stage = pxr.Usd.Stage.Open(path)
+        self.assertTrue(stage.GetPrimAtPath("/World/anim_output").GetAttribute("custom:mh_curveNames").HasValue())
+
+        copy = AnimationPipeline(Clamp(0.0, 0.1)).process_file(path, os.path.join(self.tmp.name, "clamped_bsweight.json"))
+        self.assertLessEqual(load_animation(copy, cache=False).weights.max(), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
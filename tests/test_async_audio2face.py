@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+import unittest
+
+import httpx
+
+from py_audio2face.async_audio2face import AsyncAudio2Face
+from py_audio2face.settings import ASSETS_DIR
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+
+
+class TestAsyncAudio2Face(unittest.TestCase):
+
+    def setUp(self):
+        self.routes = []
+
+        async def handler(request: httpx.Request):
+            route = request.url.path.lstrip("/")
+            self.routes.append(route)
+            await asyncio.sleep(0.01)  # let the other coroutine run if it is able to
+            if route == "status":
+                return httpx.Response(200, json="OK")
+            if route == "A2F/GetInstances":
+                return httpx.Response(200, json={"status": "OK", "result": {}})
+            if request.content:
+                json.loads(request.content)
+            return httpx.Response(200, json={"status": "OK", "result": True, "message": ""})
+
+        self.a2f = AsyncAudio2Face(a2f_install_path="/no/install")
+        self.a2f.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def test_audio2face_single(self):
+        async def run():
+            async with self.a2f:
+                return await self.a2f.audio2face_single(SAMPLE_AUDIO, "/tmp/a2f_async/out", emotion_auto_detect=True)
+
+        output = asyncio.run(run())
+        self.assertEqual(output, "/tmp/a2f_async/out")
+        self.assertEqual(self.routes, [
+            "status", "A2F/GetInstances", "A2F/USD/Load", "A2F/Player/SetRootPath", "A2F/Player/SetTrack",
+            "A2F/A2E/GenerateKeys", "A2F/Exporter/ExportBlendshapes"
+        ])
+
+    def test_concurrent_calls_do_not_interleave_on_player(self):
+        async def run():
+            async with self.a2f:
+                await asyncio.gather(*[
+                    self.a2f.audio2face_single(SAMPLE_AUDIO, f"/tmp/a2f_async/out_{i}", emotion_auto_detect=False)
+                    for i in range(3)
+                ])
+
+        asyncio.run(run())
+        player_routes = [r for r in self.routes if r in ("A2F/Player/SetTrack", "A2F/Exporter/ExportBlendshapes")]
+        self.assertEqual(player_routes, ["A2F/Player/SetTrack", "A2F/Exporter/ExportBlendshapes"] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from py_audio2face.audio2face_pool import Audio2FacePool
+from py_audio2face import utils
+
+
+class _StubClient:
+    """ Mimics the parts of Audio2Face used by the pool. Dies after `die_after` exports if set. """
+    def __init__(self, api_url: str, delay: float = 0.0, die_after: int = None):
+        self.api_url = api_url
+        self.delay = delay
+        self.die_after = die_after
+        self.exported = []
+        self.track = None
+        self.lock = threading.Lock()
+
+    @property
+    def dead(self):
+        return self.die_after is not None and len(self.exported) >= self.die_after
+
+    def is_ready(self):
+        return not self.dead
+
+    def init_a2f(self):
+        pass
+
+    def set_root_path(self, folder):
+        pass
+
+    def set_track(self, audio_file):
+        self.track = audio_file
+
+    def generate_emotion_keys(self):
+        pass
+
+    def export_blend_shape(self, output_path, fps, format):
+        if self.dead:
+            return "connection refused"
+        time.sleep(self.delay)
+        self.exported.append(self.track)
+        return {"status": "OK", "result": True}
+
+
+class TestAudio2FacePool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.tmp.name, "in")
+        os.makedirs(self.input_folder)
+        self.names = [f"clip_{i:02d}" for i in range(20)]
+        for name in self.names:
+            open(os.path.join(self.input_folder, f"{name}.wav"), "wb").close()
+        self.output_folder = os.path.join(self.tmp.name, "out")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _expected_outputs(self):
+        files = utils.get_files_in_dir(self.input_folder, [".wav", ".mp3"])
+        return [
+            os.path.join(os.path.abspath(self.output_folder), os.path.basename(f).rsplit(".", 1)[0] + "_a2f_animation")
+            for f in files
+        ]
+
+    def test_results_in_input_order_and_work_is_stolen(self):
+        fast, slow = _StubClient("fast"), _StubClient("slow", delay=0.02)
+        pool = Audio2FacePool(clients=[fast, slow])
+        results = pool.audio2face_folder(self.input_folder, self.output_folder)
+
+        self.assertEqual(results, self._expected_outputs())
+        self.assertEqual(len(fast.exported) + len(slow.exported), 20)
+        self.assertGreater(len(fast.exported), len(slow.exported))
+
+    def test_server_dying_mid_batch(self):
+        healthy, dying = _StubClient("healthy", delay=0.001), _StubClient("dying", delay=0.001, die_after=3)
+        pool = Audio2FacePool(clients=[healthy, dying])
+        results = pool.audio2face_folder(self.input_folder, self.output_folder)
+
+        self.assertNotIn(None, results)
+        self.assertEqual(len(healthy.exported) + len(dying.exported), 20)
+        self.assertEqual(pool.alive, [True, False])
+
+    def test_all_servers_down(self):
+        pool = Audio2FacePool(clients=[_StubClient("a", die_after=0)])
+        results = pool.audio2face_folder(self.input_folder, self.output_folder)
+        self.assertEqual(results, [None] * 20)
+
+    def test_dead_server_is_detected_without_retries(self):
+        pool = Audio2FacePool(api_urls=["http://127.0.0.1:9"], a2f_install_path=self.tmp.name)
+        start = time.perf_counter()
+        self.assertFalse(pool.is_server_alive(0))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(pool.clients[0].get_request_stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.settings import ASSETS_DIR
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+
+
+class _NoBatchServer(FakeAudio2FaceServer):
+    """ a server (version) which can't export batches """
+    def _route_A2F_Exporter_ExportBlendshapes(self, payload):
+        if payload.get("batch"):
+            return {"status": "Error", "message": "batch export failed"}
+        return super()._route_A2F_Exporter_ExportBlendshapes(payload)
+
+
+class TestBatchExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.tmp.name, "in")
+        self.output_folder = os.path.join(self.tmp.name, "out")
+        os.makedirs(self.input_folder)
+        # line_1 and line_10 check that similar names are mapped to the right animation
+        for name in ["line_1", "line_10", "line_2"]:
+            shutil.copy(SAMPLE_AUDIO, os.path.join(self.input_folder, f"{name}.wav"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _expected_files(self):
+        return sorted(f"{name}_a2f_animation_bsweight.usd" for name in ["line_1", "line_10", "line_2"])
+
+    def test_batch_uses_single_export_request(self):
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            a2f.audio2face_folder(self.input_folder, self.output_folder, batch=True, incremental=False)
+
+            self.assertEqual(server.requests.get("A2F/Exporter/ExportBlendshapes"), 1)
+            self.assertNotIn("A2F/Player/SetTrack", server.requests)
+
+        files = sorted(f for f in os.listdir(self.output_folder) if f.endswith(".usd"))
+        self.assertEqual(files, self._expected_files())
+        self.assertFalse(os.path.exists(os.path.join(self.output_folder, ".a2f_batch")))
+
+    def test_failed_batch_falls_back_to_single_exports(self):
+        with _NoBatchServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            a2f.audio2face_folder(self.input_folder, self.output_folder, batch=True, incremental=False)
+
+            # the failed batch + one export per file
+            self.assertEqual(server.requests.get("A2F/Exporter/ExportBlendshapes"), 4)
+
+        files = sorted(f for f in os.listdir(self.output_folder) if f.endswith(".usd"))
+        self.assertEqual(files, self._expected_files())
+
+    def test_names_containing_the_batch_prefix(self):
+        folder = os.path.join(self.tmp.name, "prefix")
+        os.makedirs(folder)
+        names = ["a2f", "batch", "x"]
+        for name in names:
+            shutil.copy(SAMPLE_AUDIO, os.path.join(folder, f"{name}.wav"))
+
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            a2f.audio2face_folder(folder, self.output_folder, batch=True, incremental=False)
+            self.assertEqual(server.requests.get("A2F/Exporter/ExportBlendshapes"), 1)
+
+        files = sorted(f for f in os.listdir(self.output_folder) if f.endswith(".usd"))
+        self.assertEqual(files, sorted(f"{name}_a2f_animation_bsweight.usd" for name in names))
+
+    def test_files_with_the_same_export_name_are_not_mapped(self):
+        shutil.copy(SAMPLE_AUDIO, os.path.join(self.input_folder, "line_1.mp3"))
+        audio_files = [os.path.join(self.input_folder, f) for f in ["line_1.wav", "line_1.mp3", "line_2.wav"]]
+
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            a2f.set_root_path(self.input_folder)
+            exported = a2f.export_batch(audio_files, self.output_folder)
+
+        self.assertEqual(list(exported), [audio_files[2]])
+        self.assertEqual(os.path.basename(exported[audio_files[2]]), "a2f_batch_line_2_bsweight.usd")
+
+
+if __name__ == '__main__':
+    unittest.main()
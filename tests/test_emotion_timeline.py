@@ -0,0 +1,91 @@
+import asyncio
+import math
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.async_audio2face import AsyncAudio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer, EMOTION_NAMES
+from py_audio2face.settings import ASSETS_DIR
+from py_audio2face import utils
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+
+
+def expected_emotions(frame: int) -> list:
+    """ the GetEmotion curve of the fake server """
+    return [round(0.5 + 0.5 * math.sin(0.05 * frame + i), 4) for i in range(len(EMOTION_NAMES))]
+
+
+class TestEmotionTimeline(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAudio2FaceServer(latency={"A2F/A2E/GetEmotion": 0.01}).start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.a2f.close()
+        self.server.stop()
+
+    def test_frames_are_fetched_concurrently(self):
+        start = time.perf_counter()
+        emotions, names = self.a2f.get_emotion_timeline(start=10, end=110, step=2)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(names, EMOTION_NAMES)
+        self.assertEqual((emotions.shape, emotions.dtype), ((50, len(EMOTION_NAMES)), np.float32))
+        np.testing.assert_allclose(emotions[0], expected_emotions(10), atol=1e-6)
+        np.testing.assert_allclose(emotions[-1], expected_emotions(108), atol=1e-6)
+        self.assertEqual(self.server.requests["A2F/A2E/GetEmotion"], 50)
+        # 50 sequential requests would take at least 0.5 s
+        self.assertLess(elapsed, 0.4)
+
+    def test_keyframes_of_current_track(self):
+        self.a2f.init_a2f()
+        self.a2f.set_root_path(SAMPLE_AUDIO)
+        self.a2f.set_track(SAMPLE_AUDIO)
+        self.a2f.a2e_settings["a2e_stride"] = 0.5
+        emotions, _ = self.a2f.get_emotion_timeline(fps=30, keyframes=True)
+
+        # one keyframe every 15 frames over the whole track
+        n_frames = int(self.server.track_duration() * 30) + 1
+        self.assertEqual(len(emotions), len(range(0, n_frames, 15)))
+        np.testing.assert_allclose(emotions[1], expected_emotions(15), atol=1e-6)
+
+    def test_duration_of_mp3_track_comes_from_the_server(self):
+        with tempfile.TemporaryDirectory() as folder:
+            # the fake server reads the duration from the wav header, the name is what matters for the client
+            track = os.path.join(folder, "voice.mp3")
+            shutil.copy(SAMPLE_AUDIO, track)
+            self.a2f.set_root_path(track)
+            self.a2f.set_track(track)
+            emotions, _ = self.a2f.get_emotion_timeline(fps=30, step=10)
+
+        n_frames = int(utils.get_wav_duration(SAMPLE_AUDIO) * 30) + 1
+        self.assertEqual(len(emotions), len(range(0, n_frames, 10)))
+        self.assertEqual(self.server.requests["A2F/Player/GetRange"], 1)
+
+    def test_failed_frames_are_nan(self):
+        self.server.failure_rate = 1.0
+        self.server.failing_routes = {"A2F/A2E/GetEmotion"}
+        emotions, names = self.a2f.get_emotion_timeline(start=0, end=3)
+        self.assertEqual(emotions.shape, (3, len(EMOTION_NAMES)))
+        self.assertTrue(np.isnan(emotions).all())
+
+    def test_async(self):
+        async def run():
+            async with AsyncAudio2Face(api_url=self.server.api_url, a2f_install_path="unused") as client:
+                return await client.get_emotion_timeline(0, 20, max_concurrency=5)
+
+        emotions, names = asyncio.run(run())
+        self.assertEqual(names, EMOTION_NAMES)
+        np.testing.assert_allclose(emotions[7], expected_emotions(7), atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
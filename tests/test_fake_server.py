@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer, ARKIT_BLENDSHAPE_NAMES
+from py_audio2face.settings import ASSETS_DIR
+from py_audio2face import utils
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+
+
+class TestFakeServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_audio2face_single_writes_export(self):
+        output = os.path.join(self.tmp.name, "anim")
+        self.a2f.audio2face_single(SAMPLE_AUDIO, output, fps=30, format="json")
+
+        with open(output + "_bsweight.json") as f:
+            export = json.load(f)
+        self.assertEqual(export["facsNames"], ARKIT_BLENDSHAPE_NAMES)
+        self.assertEqual(export["numFrames"], round(utils.get_wav_duration(SAMPLE_AUDIO) * 30) + 1)
+        self.assertEqual(self.server.requests["A2F/Exporter/ExportBlendshapes"], 1)
+
+    def test_processing_time_proportional_to_audio(self):
+        self.server.processing_factor = 0.02
+        start = time.perf_counter()
+        self.a2f.audio2face_single(SAMPLE_AUDIO, os.path.join(self.tmp.name, "anim"), emotion_auto_detect=False)
+        # ~9.4s of audio
+        self.assertGreater(time.perf_counter() - start, 0.18)
+
+    def test_injected_failures(self):
+        self.server.failure_rate = 1.0
+        self.server.failing_routes = {"A2F/Exporter/ExportBlendshapes"}
+        self.a2f.init_a2f()
+        self.a2f.set_root_path(SAMPLE_AUDIO)
+        self.a2f.set_track(SAMPLE_AUDIO)
+        response = self.a2f.export_blend_shape(os.path.join(self.tmp.name, "anim"))
+        self.assertFalse(utils.is_ok_response(response))
+
+    def test_stream_audio(self):
+        audio = np.zeros(44100, dtype=np.float32)
+        chunks = (audio[i:i + 4410] for i in range(0, len(audio), 4410))
+        success = self.a2f.stream_audio(chunks, samplerate=44100, grpc_port=self.server.grpc_port)
+
+        self.assertTrue(success)
+        self.assertEqual(self.server.streams[-1]["samples"], 44100)
+        self.assertEqual(self.server.streams[-1]["chunks"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
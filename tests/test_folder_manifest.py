@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules._animation_cache import AnimationCache
+from py_audio2face.modules._manifest import FolderManifest
+from py_audio2face.settings import ASSETS_DIR
+from py_audio2face import utils
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+
+
+class TestFolderManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.tmp.name, "in")
+        self.output_folder = os.path.join(self.tmp.name, "out")
+        os.makedirs(self.input_folder)
+        self.files = [shutil.copy(SAMPLE_AUDIO, os.path.join(self.input_folder, f"line_{i}.wav")) for i in range(3)]
+
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def _run(self, **kwargs) -> int:
+        """ runs the folder and returns the number of exports sent to the server """
+        self.server.reset()
+        self.a2f.invalidate_state()
+        self.a2f.audio2face_folder(self.input_folder, self.output_folder, **kwargs)
+        return self.server.requests.get("A2F/Exporter/ExportBlendshapes", 0)
+
+    def test_unchanged_inputs_are_skipped(self):
+        self.assertEqual(self._run(), 3)
+        self.assertEqual(self._run(), 0)
+
+        # new mtime but same content
+        st = os.stat(self.files[0])
+        os.utime(self.files[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self._run(), 0)
+
+        # new content
+        with open(self.files[1], "ab") as f:
+            f.write(b"\0\0\0\0")
+        self.assertEqual(self._run(), 1)
+
+    def test_changed_settings_and_missing_outputs_are_exported(self):
+        self._run()
+        self.assertEqual(self._run(fps=30), 3)
+        os.remove(os.path.join(self.output_folder, "line_2_a2f_animation_bsweight.usd"))
+        self.assertEqual(self._run(fps=30), 1)
+
+    def test_resume_after_crash(self):
+        original = Audio2Face._animate_track
+        calls = []
+
+        def crash_on_second_file(a2f, *args, **kwargs):
+            calls.append(args[0])
+            if len(calls) == 2:
+                raise KeyboardInterrupt()
+            return original(a2f, *args, **kwargs)
+
+        with patch.object(Audio2Face, "_animate_track", crash_on_second_file):
+            with self.assertRaises(KeyboardInterrupt):
+                self._run()
+
+        self.assertEqual(self._run(), 2)
+        self.assertEqual(len(FolderManifest(self.output_folder).entries), 3)
+
+    def test_not_incremental(self):
+        self._run()
+        self.assertEqual(self._run(incremental=False), 3)
+
+    def test_audio_is_hashed_once_with_cache(self):
+        self.a2f.cache = AnimationCache(os.path.join(self.tmp.name, "cache"))
+        with patch("py_audio2face.utils.hash_file", wraps=utils.hash_file) as hash_file:
+            self._run()
+        # one hash per file, shared by the cache key and the manifest
+        self.assertEqual(hash_file.call_count, 3)
+        self.assertEqual(
+            {e["sha256"] for e in FolderManifest(self.output_folder).entries.values()}, {utils.hash_file(SAMPLE_AUDIO)}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import socket
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.async_audio2face import AsyncAudio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules.clients._grpc_channel_pool import GrpcChannelPool
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestGrpcChannelPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.a2f.close()
+        self.server.stop()
+
+    def _stream(self):
+        chunks = (np.zeros(4410, dtype=np.float32) for _ in range(3))
+        return self.a2f.stream_audio(chunks, samplerate=44100, grpc_port=self.server.grpc_port)
+
+    def test_channel_is_reused_between_streams(self):
+        self.assertTrue(self.a2f.warm_up_streaming(grpc_port=self.server.grpc_port))
+        for _ in range(3):
+            self.assertTrue(self._stream())
+
+        self.assertEqual(self.a2f.grpc_channels.connects, 1)
+        self.assertEqual(len(self.server.streams), 3)
+
+    def test_close_keeps_a_shared_pool_open(self):
+        pool = GrpcChannelPool()
+        try:
+            with Audio2Face(api_url=self.server.api_url, a2f_install_path="unused", grpc_channels=pool) as other:
+                other.stream_audio(iter([np.zeros(4410, dtype=np.float32)]), samplerate=44100,
+                                   grpc_port=self.server.grpc_port)
+            self.assertEqual(len(pool._channels), 1)
+        finally:
+            pool.close()
+
+    def test_invalidated_channel_is_reopened(self):
+        self._stream()
+        self.a2f.grpc_channels.invalidate(f"localhost:{self.server.grpc_port}")
+        self.assertTrue(self._stream())
+        self.assertEqual(self.a2f.grpc_channels.connects, 2)
+
+    def test_warm_up_of_missing_server_times_out(self):
+        pool = GrpcChannelPool()
+        try:
+            self.assertFalse(pool.warm_up(f"localhost:{free_port()}", timeout=0.2))
+        finally:
+            pool.close()
+
+    def test_async_client_reuses_its_channel(self):
+        async def run():
+            async with AsyncAudio2Face(api_url=self.server.api_url, a2f_install_path="unused") as a2f:
+                self.assertTrue(await a2f.warm_up_streaming(grpc_port=self.server.grpc_port))
+                for _ in range(3):
+                    chunks = (np.zeros(4410, dtype=np.float32) for _ in range(3))
+                    self.assertTrue(await a2f.stream_audio(chunks, samplerate=44100, grpc_port=self.server.grpc_port))
+                pool = a2f.grpc_channels
+            return pool
+
+        pool = asyncio.run(run())
+        self.assertEqual(pool.connects, 1)
+        self.assertEqual(pool._channels, {})
+        self.assertEqual(len(self.server.streams), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from py_audio2face.modules.clients._transport import A2FTransport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self._reply(200, "OK")
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.fail_next > 0:
+            self.server.fail_next -= 1
+            return self._reply(503, {"status": "ERROR"})
+        self._reply(200, {"status": "OK"})
+
+
+class TestA2FTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.connections = set()
+        self.server.fail_next = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.transport = A2FTransport(backoff=0.0)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        for _ in range(20):
+            self.transport.post(self.url, "A2F/Player/SetTrack", payload={"file_name": "a.wav"})
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_idempotent_route_is_retried(self):
+        self.server.fail_next = 2
+        response = self.transport.post(self.url, "A2F/Player/SetTrack", payload={})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.transport.stats.summary()["A2F/Player/SetTrack"]["retries"], 2)
+
+    def test_non_idempotent_route_is_not_retried(self):
+        self.server.fail_next = 1
+        response = self.transport.post(self.url, "A2F/Exporter/ExportBlendshapes", payload={})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.transport.stats.summary()["A2F/Exporter/ExportBlendshapes"]["errors"], 1)
+
+    def test_latency_is_reported(self):
+        calls = []
+        self.transport.on_request = lambda *args: calls.append(args)
+        self.transport.get(self.url, "status")
+        method, route, latency, status_code = calls[0]
+        self.assertEqual((method, route, status_code), ("GET", "status", 200))
+        self.assertGreater(latency, 0)
+        self.assertEqual(self.transport.stats.summary()["status"]["count"], 1)
+
+    def test_connection_error_raises_after_retries(self):
+        transport = A2FTransport(retries=1, backoff=0.0)
+        with self.assertRaises(requests.ConnectionError):
+            transport.get("http://127.0.0.1:1", "status")
+        self.assertEqual(transport.stats.summary()["status"]["retries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
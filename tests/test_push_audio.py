@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules._stream_processing import AudioNormalizer
+
+
+class TestPushAudio(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+        self.port = self.server.grpc_port
+
+    def tearDown(self):
+        self.a2f.close()
+        self.server.stop()
+
+    def test_push_audio_is_unary(self):
+        self.assertTrue(self.a2f.push_audio(np.zeros(16000, dtype=np.float64), 16000, grpc_port=self.port))
+        stream = self.server.streams[-1]
+        self.assertEqual((stream["rpc"], stream["samples"]), ("PushAudio", 16000))
+
+    def test_auto_mode_picks_unary_for_short_clips(self):
+        self.a2f.send_audio(np.zeros(16000, dtype=np.float32), 16000, grpc_port=self.port)
+        self.assertEqual(self.server.streams[-1]["rpc"], "PushAudio")
+
+        self.a2f.send_audio(np.zeros(16000 * 3, dtype=np.float32), 16000, grpc_port=self.port)
+        self.assertEqual(self.server.streams[-1]["rpc"], "PushAudioStream")
+
+        chunks = (np.zeros(1600, dtype=np.float32) for _ in range(2))
+        self.a2f.send_audio(chunks, 16000, grpc_port=self.port)
+        self.assertEqual(self.server.streams[-1]["rpc"], "PushAudioStream")
+
+    def test_threshold_respects_the_input_format(self):
+        # 3 s of int16 pcm. Counted as float32 bytes it would be 1.5 s long.
+        pcm = np.zeros(3 * 16000, dtype=np.int16).tobytes()
+        normalizer = AudioNormalizer(16000, dtype="int16")
+        self.a2f.send_audio(pcm, 16000, unary_max_seconds=2.0, grpc_port=self.port, normalizer=normalizer)
+        stream = self.server.streams[-1]
+        self.assertEqual((stream["rpc"], stream["samples"]), ("PushAudioStream", 3 * 16000))
+
+    def test_unary_mode_joins_generators(self):
+        chunks = (np.zeros(1600, dtype=np.float32) for _ in range(3))
+        self.a2f.send_audio(chunks, 16000, mode="unary", grpc_port=self.port)
+        stream = self.server.streams[-1]
+        self.assertEqual((stream["rpc"], stream["samples"]), ("PushAudio", 4800))
+
+    def test_unary_generator_is_normalized_like_a_stream(self):
+        pcm = (np.sin(np.arange(4800) * 0.05) * 20000).astype(np.int16)
+        sent = []
+        for mode in ("unary", "stream"):
+            chunks = (pcm[i:i + 1000] for i in range(0, len(pcm), 1000))
+            normalizer = AudioNormalizer(24000, dtype="int16", target_samplerate=16000)
+            self.assertTrue(self.a2f.send_audio(chunks, 24000, mode=mode, grpc_port=self.port, normalizer=normalizer))
+            stream = self.server.streams[-1]
+            sent.append((stream["samplerate"], stream["samples"], stream["sha256"]))
+
+        self.assertEqual(sent[0], sent[1])
+        self.assertEqual(sent[0][:2], (16000, 3200))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.settings import ASSETS_DIR
+
+SAMPLE_AUDIO = os.path.join(ASSETS_DIR, "voice_male_p3_neutral_441_float.wav")
+
+
+class TestServerStateMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audio_dir = os.path.join(self.tmp.name, "audio")
+        os.makedirs(self.audio_dir)
+        self.audio_files = []
+        for name in ("a.wav", "b.wav"):
+            self.audio_files.append(shutil.copy(SAMPLE_AUDIO, os.path.join(self.audio_dir, name)))
+
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def _single(self, audio_file: str):
+        self.a2f.audio2face_single(audio_file, os.path.join(self.tmp.name, "out", "anim"), emotion_auto_detect=False)
+
+    def test_repeated_single_skips_unchanged_state(self):
+        for _ in range(3):
+            self._single(self.audio_files[0])
+        self._single(self.audio_files[1])
+
+        self.assertEqual(self.server.requests["A2F/USD/Load"], 1)
+        self.assertEqual(self.server.requests["A2F/GetInstances"], 1)
+        self.assertEqual(self.server.requests["A2F/Player/SetRootPath"], 1)
+        self.assertEqual(self.server.requests["A2F/Player/SetTrack"], 2)
+        self.assertEqual(self.server.requests["A2F/Exporter/ExportBlendshapes"], 4)
+
+    def test_rewritten_track_is_sent_again(self):
+        self._single(self.audio_files[0])
+        st = os.stat(self.audio_files[0])
+        os.utime(self.audio_files[0], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self._single(self.audio_files[0])
+        self.assertEqual(self.server.requests["A2F/Player/SetTrack"], 2)
+
+    def test_unchanged_emotion_and_settings_are_skipped(self):
+        self.a2f.set_emotion(joy=0.5)
+        self.a2f.set_emotion(joy=0.5)
+        self.assertEqual(self.server.requests["A2F/A2E/SetEmotion"], 1)
+        self.assertEqual(self.server.requests["A2F/A2E/SetSettings"], 1)
+
+        self.a2f.a2e_set_settings(a2e_contrast=2.0, preferred_emotion=self.a2f.a2e_settings["preferred_emotion"])
+        self.assertEqual(self.server.requests["A2F/A2E/SetSettings"], 2)
+        self.assertEqual(self.server.a2e_settings["a2e_contrast"], 2.0)
+
+    def test_invalidate_state_resends(self):
+        self._single(self.audio_files[0])
+        self.a2f.set_emotion(joy=0.5)
+        self.a2f.invalidate_state()
+        self._single(self.audio_files[0])
+        self.a2f.set_emotion(joy=0.5)
+
+        self.assertEqual(self.server.requests["A2F/USD/Load"], 2)
+        self.assertEqual(self.server.requests["A2F/Player/SetRootPath"], 2)
+        self.assertEqual(self.server.requests["A2F/Player/SetTrack"], 2)
+        self.assertEqual(self.server.requests["A2F/A2E/SetEmotion"], 2)
+
+    def test_emotion_keys_are_reused_for_export_variants(self):
+        output = os.path.join(self.tmp.name, "out", "anim")
+        for fps, format in ((60, "usd"), (30, "usd"), (24, "json")):
+            self.a2f.audio2face_single(self.audio_files[0], output, fps=fps, format=format, emotion_auto_detect=True)
+        self.assertEqual(self.server.requests["A2F/A2E/GenerateKeys"], 1)
+        self.assertEqual(self.server.requests["A2F/Exporter/ExportBlendshapes"], 3)
+
+        # other settings or another track need new keys
+        self.a2f.a2e_set_settings(a2e_contrast=2.0, preferred_emotion=self.a2f.a2e_settings["preferred_emotion"])
+        self.a2f.audio2face_single(self.audio_files[0], output, emotion_auto_detect=True)
+        self.a2f.audio2face_single(self.audio_files[1], output, emotion_auto_detect=True)
+        self.a2f.audio2face_single(self.audio_files[0], output, emotion_auto_detect=True)
+        self.assertEqual(self.server.requests["A2F/A2E/GenerateKeys"], 4)
+
+        self.a2f.generate_emotion_keys(force=True)
+        self.assertEqual(self.server.requests["A2F/A2E/GenerateKeys"], 5)
+
+    def test_failed_request_is_not_mirrored(self):
+        self.server.failure_rate = 1.0
+        self.server.failing_routes = {"A2F/Player/SetTrack"}
+        self._single(self.audio_files[0])
+        self.server.failure_rate = 0.0
+        self._single(self.audio_files[0])
+        self.assertEqual(self.server.requests["A2F/Player/SetTrack"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+import time
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules._stream_processing import (
+    AudioReblocker, AudioNormalizer, VoiceActivityGate, RealtimePacer
+)
+
+
+class TestAudioReblocker(unittest.TestCase):
+
+    def test_coalesces_and_splits_into_frames(self):
+        audio = np.arange(1000, dtype=np.float32)
+        chunks = [audio[:10], audio[10:15], audio[15:700], audio[700:]]
+        frames = list(AudioReblocker(frame_size=256).process(chunks))
+
+        self.assertEqual([len(f) // 4 for f in frames], [256, 256, 256, 232])
+        np.testing.assert_array_equal(np.frombuffer(b"".join(frames), dtype=np.float32), audio)
+
+    def test_converts_other_dtypes_and_bytes(self):
+        audio = np.linspace(-1, 1, 300)
+        chunks = [audio[:100], audio[100:200].astype(np.float32).tobytes(), audio[200:][::-1][::-1]]
+        frames = list(AudioReblocker(frame_size=128).process(chunks))
+        np.testing.assert_allclose(np.frombuffer(b"".join(frames), dtype=np.float32), audio, rtol=1e-6)
+
+    def test_exact_frames_pass_through(self):
+        frame = np.ones(128, dtype=np.float32).tobytes()
+        reblocker = AudioReblocker(frame_size=128)
+        self.assertIs(next(reblocker.feed(frame)), frame)
+        self.assertEqual(list(reblocker.flush()), [])
+
+    def test_oversized_chunks_are_split_without_frame_size(self):
+        small = np.ones(10, dtype=np.float32).tobytes()
+        reblocker = AudioReblocker(max_message_bytes=1000)
+        self.assertIs(next(reblocker.feed(small)), small)
+
+        frames = list(reblocker.feed(np.zeros(1000, dtype=np.float32)))
+        self.assertEqual([len(f) for f in frames], [1000, 1000, 1000, 1000])
+
+
+class TestAudioNormalizer(unittest.TestCase):
+
+    def test_int16_bytes_split_mid_sample(self):
+        pcm = (np.sin(np.linspace(0, 20, 1001)) * 20000).astype(np.int16)
+        data = pcm.tobytes()
+        normalizer = AudioNormalizer(samplerate=16000, dtype="int16")
+        # odd split points cut samples in half
+        out = np.concatenate([normalizer.process(data[i:i + 301]).copy() for i in range(0, len(data), 301)])
+        np.testing.assert_allclose(out, pcm / 32768, atol=1e-7)
+        self.assertEqual(out.dtype, np.float32)
+
+    def test_downmix_gain_and_limit(self):
+        stereo = np.array([[0.2, 0.4], [0.8, 1.0], [-0.9, -0.7]], dtype=np.float64)
+        out = AudioNormalizer(samplerate=16000, channels=2, gain=2.0).process(stereo.reshape(-1))
+        np.testing.assert_allclose(out, [0.6, 1.0, -1.0], rtol=1e-6)
+
+    def test_float32_mono_is_not_copied(self):
+        audio = np.zeros(100, dtype=np.float32)
+        self.assertIs(AudioNormalizer(samplerate=16000).process(audio), audio)
+
+    def test_resampling_is_continuous_over_chunks(self):
+        t = np.arange(24000) / 24000
+        audio = np.sin(2 * np.pi * 200 * t).astype(np.float32)
+        normalizer = AudioNormalizer(samplerate=24000, target_samplerate=16000)
+        out = np.concatenate([normalizer.process(audio[i:i + 997]).copy() for i in range(0, len(audio), 997)])
+
+        self.assertLessEqual(abs(len(out) - 16000), 1)
+        expected = np.sin(2 * np.pi * 200 * np.arange(len(out)) / 16000)
+        np.testing.assert_allclose(out, expected, atol=2e-3)
+
+    def test_reset_forgets_the_previous_stream(self):
+        pcm = (np.arange(100) * 100).astype(np.int16)
+        normalizer = AudioNormalizer(samplerate=24000, target_samplerate=16000, dtype="int16")
+        first = normalizer.process(pcm.tobytes()[:-1]).copy()  # ends with half a sample
+        normalizer.reset()
+        second = normalizer.process(pcm.tobytes()[:-1]).copy()
+        np.testing.assert_array_equal(first, second)
+
+class TestVoiceActivityGate(unittest.TestCase):
+    samplerate = 16000
+
+    def _tone(self, seconds: float) -> np.ndarray:
+        return (0.5 * np.sin(np.arange(int(seconds * self.samplerate)) * 0.3)).astype(np.float32)
+
+    def _silence(self, seconds: float) -> np.ndarray:
+        return np.zeros(int(seconds * self.samplerate), dtype=np.float32)
+
+    def _run(self, gate: VoiceActivityGate, audio: np.ndarray, chunk: int = 1234) -> np.ndarray:
+        out = list(gate.stream(audio[i:i + chunk] for i in range(0, len(audio), chunk)))
+        return np.concatenate(out) if out else np.empty(0, dtype=np.float32)
+
+    def test_trims_and_compresses_pauses(self):
+        audio = np.concatenate([
+            self._silence(1.0), self._tone(0.5), self._silence(2.0), self._tone(0.5), self._silence(1.0)
+        ])
+        gate = VoiceActivityGate(self.samplerate, hangover_ms=100, max_pause_ms=300)
+        out = self._run(gate, audio)
+
+        # voice + hangover after both tones + the shortened pause
+        expected = int((0.5 + 0.1 + 0.2 + 0.5 + 0.1) * self.samplerate)
+        self.assertEqual(len(out), expected)
+        np.testing.assert_array_equal(out[:800], self._tone(0.05))  # the first tone starts right away
+        self.assertEqual(gate.stats()["dropped_samples"], len(audio) - expected)
+        self.assertEqual(gate.stats()["output_samples"], expected)
+
+    def test_without_trim_only_pauses_are_compressed(self):
+        audio = np.concatenate([self._silence(1.0), self._tone(0.5), self._silence(1.0)])
+        gate = VoiceActivityGate(self.samplerate, hangover_ms=100, max_pause_ms=300, trim=False)
+        out = self._run(gate, audio)
+        self.assertEqual(len(out), int((0.2 + 0.5 + 0.3) * self.samplerate))
+
+    def test_preroll_keeps_the_silence_before_the_first_voice(self):
+        audio = np.concatenate([self._silence(1.0), self._tone(0.5), self._silence(1.0)])
+        gate = VoiceActivityGate(self.samplerate, hangover_ms=100, max_pause_ms=300, preroll_ms=50)
+        out = self._run(gate, audio)
+
+        self.assertEqual(len(out), int((0.05 + 0.5 + 0.1) * self.samplerate))
+        np.testing.assert_array_equal(out[:800], 0.0)
+        np.testing.assert_array_equal(out[800:1600], self._tone(0.05))
+        self.assertEqual(gate.stats()["dropped_samples"], len(audio) - len(out))
+
+    def test_only_silence_is_dropped_completely(self):
+        gate = VoiceActivityGate(self.samplerate)
+        self.assertEqual(len(self._run(gate, self._silence(2.0))), 0)
+        self.assertAlmostEqual(gate.stats()["dropped_seconds"], 2.0)
+
+
+class TestRealtimePacer(unittest.TestCase):
+    samplerate = 1000
+
+    def test_fast_producer_is_paced_to_real_time(self):
+        pacer = RealtimePacer(self.samplerate, lead_time=0.05, prefill=0.0, max_buffered=0.1)
+        chunks = (np.zeros(50, dtype=np.float32) for _ in range(10))  # 0.5 s of audio at once
+
+        start = time.perf_counter()
+        out = list(pacer.stream(chunks))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(sum(len(c) for c in out), 500)
+        # the last chunk starts at 0.45 s and may be sent lead_time early
+        self.assertGreater(elapsed, 0.35)
+        self.assertGreater(pacer.stats()["overruns"], 0)
+        self.assertEqual(pacer.stats()["dropped_samples"], 0)
+
+    def test_slow_producer_underruns(self):
+        def producer():
+            for i in range(3):
+                yield np.zeros(20, dtype=np.float32)  # 20 ms of audio every 60 ms
+                time.sleep(0.06)
+
+        pacer = RealtimePacer(self.samplerate, lead_time=0.0, prefill=0.0)
+        out = list(pacer.stream(producer()))
+        self.assertEqual(len(out), 3)
+        self.assertEqual(pacer.stats()["underruns"], 2)
+
+    def test_drop_oldest_bounds_the_buffer(self):
+        pacer = RealtimePacer(self.samplerate, prefill=1.0, max_buffered=0.1, overflow="drop_oldest")
+        out = list(pacer.stream(np.full(50, i, dtype=np.float32) for i in range(10)))
+        # only the newest audio which fits into the buffer is left when the prefill never completes
+        self.assertEqual([int(c[0]) for c in out], [8, 9])
+        self.assertEqual(pacer.stats()["dropped_samples"], 400)
+
+
+class TestStreamFrameSize(unittest.TestCase):
+
+    def test_stream_audio_reblocks(self):
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            chunks = (np.zeros(441, dtype=np.float32) for _ in range(100))
+            success = a2f.stream_audio(chunks, samplerate=44100, grpc_port=server.grpc_port, frame_size=4410)
+
+            self.assertTrue(success)
+            self.assertEqual(server.streams[-1]["samples"], 44100)
+            self.assertEqual(server.streams[-1]["chunks"], 10)
+
+    def test_stream_audio_normalizes(self):
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            chunks = (np.zeros(2400, dtype=np.int16).tobytes() for _ in range(10))
+            normalizer = AudioNormalizer(samplerate=24000, target_samplerate=16000, dtype="int16")
+            self.assertTrue(a2f.stream_audio(chunks, samplerate=24000, grpc_port=server.grpc_port, normalizer=normalizer))
+
+            self.assertEqual(server.streams[-1]["samplerate"], 16000)
+            self.assertEqual(server.streams[-1]["samples"], 16000)
+
+    def test_normalizer_is_reused_for_the_next_stream(self):
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            normalizer = AudioNormalizer(samplerate=16000, dtype="int16")
+            # the first stream is cut in the middle of a sample
+            a2f.stream_audio([np.ones(1600, dtype=np.int16).tobytes()[:-1]], samplerate=16000,
+                             grpc_port=server.grpc_port, normalizer=normalizer)
+            a2f.stream_audio([np.ones(1600, dtype=np.int16).tobytes()], samplerate=16000,
+                             grpc_port=server.grpc_port, normalizer=normalizer)
+
+            self.assertEqual([stream["samples"] for stream in server.streams[-2:]], [1599, 1600])
+            # the half sample of the first stream didn't shift the samples of the second
+            self.assertEqual(normalizer._pending, b"")
+
+    def test_vad_samplerate_must_match_the_sent_audio(self):
+        a2f = Audio2Face(api_url="http://localhost:1", a2f_install_path="unused")
+        normalizer = AudioNormalizer(samplerate=24000, target_samplerate=16000, dtype="int16")
+        with self.assertRaises(ValueError):
+            a2f.stream_audio([], samplerate=24000, normalizer=normalizer, vad=VoiceActivityGate(samplerate=24000))
+
+    def test_stream_audio_gates_silence(self):
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            chunks = [np.zeros(1600, dtype=np.float32), np.full(1600, 0.5, dtype=np.float32)] * 5
+            vad = VoiceActivityGate(samplerate=16000, hangover_ms=0, max_pause_ms=0)
+            self.assertTrue(a2f.stream_audio(iter(chunks), samplerate=16000, grpc_port=server.grpc_port, vad=vad))
+
+            self.assertEqual(server.streams[-1]["samples"], 5 * 1600)
+            self.assertEqual(vad.stats()["dropped_samples"], 5 * 1600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.animation import load_animation
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules._stream_recorder import StreamRecorder
+
+
+class TestStreamRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.a2f.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def chunks(self, seconds: float, chunk_seconds: float = 0.05, samplerate: int = 16000):
+        for _ in range(round(seconds / chunk_seconds)):
+            time.sleep(chunk_seconds / 5)
+            yield np.zeros(int(chunk_seconds * samplerate), dtype=np.float32)
+
+    def test_segments_are_written_while_streaming(self):
+        seen = []
+        recorder = StreamRecorder(
+            self.a2f, segment_seconds=0.25, output_path=os.path.join(self.tmp.name, "live"), fps=60,
+            format="json", on_segment=lambda segment: seen.append((segment.index, time.perf_counter())),
+            wait_for_playback=False
+        )
+        success = self.a2f.stream_audio(
+            self.chunks(1.1), samplerate=16000, grpc_port=self.server.grpc_port, recorder=recorder
+        )
+        stream_end = time.perf_counter()
+
+        self.assertTrue(success)
+        self.assertEqual(recorder.errors, [])
+        self.assertEqual([s.index for s in recorder.segments], [0, 1, 2, 3, 4])
+        self.assertEqual([s.index for s in recorder.segments], [i for i, _ in seen])
+        # segments were emitted during the stream, not only after it
+        self.assertLess(seen[0][1], stream_end)
+
+        # the windows cover the whole animation without overlap: 1.1 s at 60 fps = 67 frames
+        self.assertEqual(sum(s.animation.n_frames for s in recorder.segments), 67)
+        self.assertEqual(recorder.segments[0].animation.n_frames, 15)
+        self.assertAlmostEqual(recorder.segments[-1].end, 1.1)
+        for segment in recorder.segments:
+            self.assertTrue(segment.file.endswith(f"live_{segment.index:04d}_bsweight.json"))
+            self.assertEqual(load_animation(segment.file, cache=False).n_frames, segment.animation.n_frames)
+        # the temporary full exports are removed
+        self.assertEqual(len(os.listdir(self.tmp.name)), 5)
+
+    def test_callback_only(self):
+        segments = []
+        recorder = StreamRecorder(
+            self.a2f, segment_seconds=0.5, format="json", on_segment=segments.append, wait_for_playback=False
+        )
+        session = self.a2f.open_stream(samplerate=16000, grpc_port=self.server.grpc_port, recorder=recorder)
+        for chunk in self.chunks(0.6):
+            session.push(chunk)
+        self.assertTrue(session.close())
+
+        self.assertEqual(len(segments), 2)
+        self.assertIsNone(segments[0].file)
+        self.assertFalse(os.path.exists(recorder._export_dir))
+        self.assertIsNone(self.a2f.last_export_response)
+        self.assertEqual(segments[0].animation.n_shapes, segments[1].animation.n_shapes)
+
+
+if __name__ == '__main__':
+    unittest.main()
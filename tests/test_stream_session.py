@@ -0,0 +1,74 @@
+import threading
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules._stream_session import StreamSession
+
+
+class _StalledClient:
+    """ consumes the stream only after release is set, like a server which stalls """
+    def __init__(self):
+        self.release = threading.Event()
+        self.received = []
+
+    def stream_audio(self, audio_stream, samplerate, **kwargs):
+        self.release.wait()
+        for chunk in audio_stream:
+            self.received.append(chunk)
+        return True
+
+
+class TestStreamSession(unittest.TestCase):
+
+    def test_block_applies_backpressure(self):
+        client = _StalledClient()
+        session = StreamSession(client, 16000, max_buffered_chunks=2, overflow="block")
+        self.assertTrue(session.push(b"a"))
+        self.assertTrue(session.push(b"b"))
+        self.assertFalse(session.push(b"c", timeout=0.05))
+
+        client.release.set()
+        self.assertTrue(session.push(b"c", timeout=1))
+        self.assertTrue(session.close())
+        self.assertEqual(client.received, [b"a", b"b", b"c"])
+        self.assertGreater(session.stats()["blocked_seconds"], 0.0)
+
+    def test_drop_oldest(self):
+        client = _StalledClient()
+        session = StreamSession(client, 16000, max_buffered_chunks=2, overflow="drop_oldest")
+        for chunk in [b"a", b"b", b"c", b"d"]:
+            session.push(chunk)
+
+        stats = session.stats()
+        self.assertEqual((stats["depth"], stats["dropped_chunks"], stats["buffered_bytes"]), (2, 2, 2))
+        client.release.set()
+        session.close()
+        self.assertEqual(client.received, [b"c", b"d"])
+
+    def test_push_after_close_fails(self):
+        client = _StalledClient()
+        client.release.set()
+        session = StreamSession(client, 16000)
+        session.close()
+        with self.assertRaises(RuntimeError):
+            session.push(b"a")
+
+    def test_stream_to_server(self):
+        with FakeAudio2FaceServer() as server:
+            a2f = Audio2Face(api_url=server.api_url, a2f_install_path="unused")
+            with a2f.open_stream(samplerate=16000, grpc_port=server.grpc_port) as session:
+                for _ in range(10):
+                    session.push(np.zeros(1600, dtype=np.float32))
+                self.assertTrue(session.flush(timeout=5))
+                self.assertEqual(session.stats()["sent_chunks"], 10)
+
+            self.assertTrue(session.success)
+            self.assertEqual(server.streams[-1]["samples"], 16000)
+            a2f.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.fake_server import FakeAudio2FaceServer
+from py_audio2face.modules._stream_stats import StreamStats
+
+
+class TestStreamStats(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAudio2FaceServer().start()
+        self.a2f = Audio2Face(api_url=self.server.api_url, a2f_install_path="unused")
+
+    def tearDown(self):
+        self.a2f.close()
+        self.server.stop()
+
+    def test_stream_audio_records_timings(self):
+        seen = []
+        stats = StreamStats(on_chunk=lambda i, timings: seen.append((i, timings["bytes"])))
+        chunks = (np.zeros(4410, dtype=np.float32) for _ in range(5))
+        self.a2f.stream_audio(chunks, samplerate=44100, grpc_port=self.server.grpc_port, stats=stats)
+
+        self.assertIs(self.a2f.last_stream_stats, stats)
+        summary = stats.summary()
+        self.assertTrue(summary["success"])
+        self.assertEqual((summary["chunks"], summary["bytes"], summary["samples"]), (5, 5 * 4410 * 4, 5 * 4410))
+        self.assertLessEqual(summary["start_marker_s"], summary["first_chunk_s"])
+        self.assertLessEqual(summary["last_chunk_s"], summary["finished_s"])
+        self.assertEqual(summary["send_s"]["count"], 5)
+        self.assertEqual(seen, [(i, 4410 * 4) for i in range(5)])
+
+        counts, edges = stats.histogram("serialize_s", bins=4)
+        self.assertEqual(counts.sum(), 5)
+
+    def test_session_records_queue_wait(self):
+        with self.a2f.open_stream(samplerate=16000, grpc_port=self.server.grpc_port) as session:
+            for _ in range(3):
+                session.push(np.zeros(1600, dtype=np.float32))
+
+        summary = session.stream_stats.summary()
+        self.assertEqual(summary["chunks"], 3)
+        self.assertEqual(summary["queue_wait_s"]["count"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import socket
+import sys
+import tempfile
+import time
+import unittest
+
+from py_audio2face.audio2face import Audio2Face
+from py_audio2face.modules.clients._supervisor import HeadlessServerSupervisor
+
+MARKER = "fake audio2face server running on"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestHeadlessServerSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        port = free_port()
+        self.api_url = f"http://127.0.0.1:{port}"
+        self.command = [
+            sys.executable, "-m", "py_audio2face.fake_server", "--port", str(port), "--grpc-port", str(free_port())
+        ]
+        self.restarted = []
+        self.supervisor = HeadlessServerSupervisor(
+            command=self.command, api_url=self.api_url, ready_markers=(MARKER,), startup_timeout=30,
+            log_file=os.path.join(self.tmp.name, "a2f.log"), on_restart=self.restarted.append
+        )
+
+    def tearDown(self):
+        self.supervisor.stop()
+        self.tmp.cleanup()
+
+    def test_start_captures_logs_and_stops(self):
+        self.assertTrue(self.supervisor.start())
+        self.assertTrue(self.supervisor.is_ready())
+        self.assertTrue(any(MARKER in line for line in self.supervisor.logs()))
+        with open(self.supervisor.log_file) as f:
+            self.assertIn(MARKER, f.read())
+
+        self.supervisor.stop()
+        self.assertFalse(self.supervisor.is_running())
+        self.assertFalse(self.supervisor.is_ready())
+        time.sleep(0.3)
+        self.assertEqual(self.restarted, [])
+
+    def test_crashed_server_is_restarted(self):
+        self.assertTrue(self.supervisor.start())
+        first = self.supervisor.process
+        first.kill()
+
+        deadline = time.time() + 30
+        while not self.restarted and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.restarted, [True])
+        self.assertEqual(self.supervisor.restarts, 1)
+        self.assertIsNot(self.supervisor.process, first)
+        self.assertTrue(self.supervisor.is_ready())
+
+    def test_timeout_and_missing_script(self):
+        supervisor = HeadlessServerSupervisor(
+            command=[sys.executable, "-c", "import time; print('booting', flush=True); time.sleep(30)"],
+            api_url=self.api_url, auto_restart=False
+        )
+        try:
+            start = time.perf_counter()
+            self.assertFalse(supervisor.start(timeout=0.5))
+            self.assertLess(time.perf_counter() - start, 2.0)
+            self.assertEqual(supervisor.logs(), ["booting"])
+        finally:
+            supervisor.stop()
+
+        with self.assertRaises(ValueError):
+            HeadlessServerSupervisor(a2f_install_path=self.tmp.name).start()
+
+    def test_client_starts_server_with_supervisor(self):
+        a2f = Audio2Face(api_url=self.api_url, a2f_install_path="unused", supervisor=self.supervisor)
+        self.assertEqual(a2f.start_headless_server(), "OK")
+        self.assertIs(a2f.process_audio2face, self.supervisor.process)
+        # the check for a running server doesn't go through the retrying transport
+        self.assertNotIn("status", a2f.transport.stats.summary())
+        self.assertEqual(a2f.start_headless_server(), "OK")
+        a2f.shutdown_a2f()
+        self.assertFalse(self.supervisor.is_running())
+
+
+if __name__ == '__main__':
+    unittest.main()